@@ -0,0 +1,218 @@
+"""Self-play actors running in worker processes.
+
+Every actor owns a CPU copy of the policy and plays complete episodes with
+SelfPlayTrainer.collect_episode. The learner publishes new weights into one
+shared-memory copy of the model; actors copy them into their own model before
+the next episode whenever the published version changed, so no weights are
+pickled per episode. Trajectories are sent back as the arrays of their
+RolloutBuffer, cut to the steps of the episode.
+"""
+
+import queue
+import random
+import traceback
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch import nn
+
+from .buffer import _FIELDS, RolloutBuffer
+from .policy import ThePolicy
+
+
+def pack_trajectory(trajectory: RolloutBuffer) -> dict[str, np.ndarray]:
+    """The arrays of a trajectory, cut to its steps."""
+    n = len(trajectory)
+    packed = {name: getattr(trajectory, name)[:n] for name in _FIELDS}
+    packed["episode_ends"] = np.array(trajectory.episode_ends)
+    return packed
+
+
+def unpack_trajectory(packed: dict[str, np.ndarray]) -> RolloutBuffer:
+    """Inverse of pack_trajectory, returns the trajectory as collect_episode does."""
+    n = len(packed["players"])
+    trajectory = RolloutBuffer(max(n, 1))
+    for name in _FIELDS:
+        getattr(trajectory, name)[:n] = packed[name]
+    trajectory.size = n
+    trajectory.episode_ends = packed["episode_ends"].tolist()
+    return trajectory
+
+
+def _actor_loop(
+    worker_id: int,
+    shared_model: nn.Module,
+    version,
+    lock,
+    tasks,
+    results,
+    torch_threads: int,
+    no_capture_limit: Optional[int],
+    seed: int,
+    tablebase: Optional[Path],
+):
+    """Plays episodes for (temperature, epsilon) tasks until it receives None."""
+    from .train import SelfPlayTrainer
+
+    torch.set_num_threads(torch_threads)
+    random.seed(seed + worker_id)
+    np.random.seed(seed + worker_id)
+    torch.manual_seed(seed + worker_id)
+
+    model = ThePolicy()
+    trainer = SelfPlayTrainer(
+        model,
+        no_capture_limit=no_capture_limit,
+        device=torch.device("cpu"),
+        tablebase=tablebase,
+    )
+    local_version = -1
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        temperature, epsilon = task
+        try:
+            if version.value != local_version:
+                with lock:
+                    model.load_state_dict(shared_model.state_dict())
+                    local_version = version.value
+            trajectory, winner = trainer.collect_episode(temperature, epsilon)
+            results.put((pack_trajectory(trajectory), winner))
+        except Exception:
+            results.put((None, traceback.format_exc()))
+
+
+class ActorPool:
+    """A pool of worker processes playing self-play episodes.
+
+    Example:
+        with ActorPool(model, num_workers=4) as pool:
+            pool.request(20, temperature=1.0, epsilon=0.2)
+            episodes = [pool.next_episode() for _ in range(20)]
+            ...  # update the model
+            pool.broadcast(model)
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        num_workers: int,
+        torch_threads: int = 1,
+        no_capture_limit: Optional[int] = 100,
+        seed: int = 0,
+        timeout: Optional[float] = None,
+        tablebase: str | Path | None = None,
+    ):
+        """Starts the workers with the current weights of model.
+
+        Args:
+            model: The policy whose weights the actors play with.
+            num_workers: Number of worker processes.
+            torch_threads: torch.set_num_threads of every worker. Keep
+                num_workers * torch_threads at or below the number of cores.
+            no_capture_limit: Passed to the SelfPlayTrainer of every worker.
+            seed: Worker i seeds random, NumPy and torch with seed + i.
+            timeout: Seconds next_episode waits for a result, None waits forever.
+            tablebase: Endgame table directory, passed to the SelfPlayTrainer
+                of every worker.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        ctx = mp.get_context("spawn")
+        self.num_workers = num_workers
+        self.timeout = timeout
+        self.pending = 0
+
+        self._shared = ThePolicy()
+        self._shared.load_state_dict(_cpu_state_dict(model))
+        self._shared.share_memory()
+        self._version = ctx.Value("l", 0)
+        self._lock = ctx.Lock()
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._workers = [
+            ctx.Process(
+                target=_actor_loop,
+                args=(
+                    worker_id,
+                    self._shared,
+                    self._version,
+                    self._lock,
+                    self._tasks,
+                    self._results,
+                    torch_threads,
+                    no_capture_limit,
+                    seed,
+                    None if tablebase is None else Path(tablebase),
+                ),
+                daemon=True,
+            )
+            for worker_id in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def broadcast(self, model: nn.Module):
+        """Publishes the weights of model to all actors.
+
+        Actors pick them up before their next episode. Episodes that are
+        already running finish with the previous weights.
+        """
+        state = _cpu_state_dict(model)
+        with self._lock:
+            with torch.no_grad():
+                for name, tensor in self._shared.state_dict().items():
+                    tensor.copy_(state[name])
+            self._version.value += 1
+
+    def request(self, count: int, temperature: float = 1.0, epsilon: float = 0.1):
+        """Queues count episodes with the given exploration settings."""
+        for _ in range(count):
+            self._tasks.put((temperature, epsilon))
+        self.pending += count
+
+    def next_episode(self) -> tuple[RolloutBuffer, int]:
+        """Waits for the next finished episode.
+
+        Returns:
+            A tuple (trajectory, winner) like SelfPlayTrainer.collect_episode.
+
+        Raises:
+            RuntimeError: If no episode is pending, an actor failed or the
+                timeout expired.
+        """
+        if self.pending == 0:
+            raise RuntimeError("No episode requested")
+        try:
+            packed, winner = self._results.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f"No episode finished within {self.timeout}s")
+        self.pending -= 1
+        if packed is None:
+            raise RuntimeError(f"Actor failed:\n{winner}")
+        return unpack_trajectory(packed), winner
+
+    def close(self):
+        """Stops the workers after their current episode."""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    def __enter__(self) -> "ActorPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _cpu_state_dict(model: nn.Module) -> dict[str, torch.Tensor]:
+    return {name: t.detach().cpu() for name, t in model.state_dict().items()}
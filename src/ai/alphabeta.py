@@ -0,0 +1,361 @@
+"""Iterative-deepening alpha-beta search over complete Muehle turns.
+
+Negamax with a transposition table (see ttable). The search unit is the
+complete (from_idx, to_idx, remove_idx) turn of Muehle.generate_turns, so one
+ply is one turn of one player. Turns are ordered by the table move, then
+removals, killer turns and the history heuristic. Near the root the policy
+logits of ThePolicy, or of an exported policy, replace the history order.
+
+    agent = AlphaBetaAgent(model, time_limit=2.0)
+    from_idx, to_idx, remove_idx = agent.get_complete_move(game)
+
+Analysing a position with a table file that is kept between runs:
+
+    python -m ai.alphabeta --key 0x66600200000013 --time 10 --table models/tt.bin
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+
+from muehle_game import Muehle
+from muehle_game.bitboard import FULL, MILL_MASKS, neighbours
+from muehle_game.game import REPETITION_LIMIT, Turn
+from muehle_game.tablebase import Tablebase
+
+from .book import OpeningBook
+from .export import PolicyBackend
+from .helper import allocate_encoding, encode_into
+from .policy import ThePolicy
+from .train import ActionMapper
+from .ttable import EXACT, LOWER, UPPER, TranspositionTable
+
+MATE = 10000
+"Score of a won position, reduced by the number of plies to the win."
+MATE_BOUND = MATE - 1000
+"Scores beyond this are wins or losses in a known number of plies."
+
+PIECE_WEIGHT = 100
+CLOSED_MILL_WEIGHT = 20
+OPEN_MILL_WEIGHT = 15
+MOBILITY_WEIGHT = 5
+
+
+def evaluate(game: Muehle) -> int:
+    """Heuristic score of a position from the view of the player to move.
+
+    Counts pieces on the board and still to place, closed mills, open mills
+    (two own pieces and an empty cell) and, in the moving phase, the empty
+    cells next to own pieces.
+    """
+    p = game.player
+    empty = FULL ^ (game.bits[1] | game.bits[-1])
+    score = 0
+    for player, sign in ((p, 1), (-p, -1)):
+        own = game.bits[player]
+        pieces = own.bit_count()
+        closed = open_ = 0
+        for mill in MILL_MASKS:
+            count = (own & mill).bit_count()
+            if count == 3:
+                closed += 1
+            elif count == 2 and empty & mill:
+                open_ += 1
+        value = (
+            PIECE_WEIGHT * (pieces + game.to_place[player])
+            + CLOSED_MILL_WEIGHT * closed
+            + OPEN_MILL_WEIGHT * open_
+        )
+        if game.to_place[player] == 0 and pieces > 3:
+            value += MOBILITY_WEIGHT * (neighbours(own) & empty).bit_count()
+        score += sign * value
+    return score
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up."""
+
+
+class AlphaBetaAgent:
+    """Plays the best complete turn of an iterative-deepening alpha-beta search.
+
+    A drop-in for SelfPlayAgent.get_complete_move. The search deepens one ply
+    at a time until time_limit seconds are used or max_depth is reached and
+    plays the best turn of the last finished depth.
+    """
+
+    def __init__(
+        self,
+        model: ThePolicy | PolicyBackend | None = None,
+        time_limit: Optional[float] = 1.0,
+        max_depth: int = 64,
+        table_size: int = 1 << 20,
+        policy_depth: int = 3,
+        table: Optional[TranspositionTable] = None,
+        first_depth: int = 1,
+        book: Optional[OpeningBook] = None,
+        tablebase: Optional[Tablebase] = None,
+    ):
+        """Initializes the AlphaBetaAgent.
+
+        Args:
+            model: Policy whose logits order the turns, None for no policy.
+            time_limit: Seconds per turn, None to always search max_depth.
+            max_depth: Deepest iteration in plies.
+            table_size: Slots of the transposition table.
+            policy_depth: The policy orders the turns of nodes with at least
+                this many plies left to search.
+            table: Transposition table to use instead of a new one of
+                table_size slots, it may be shared with other searches.
+            first_depth: Depth of the first iteration.
+            book: Opening book whose turns are played without a search.
+            tablebase: Endgame tables whose best turns are played without a
+                search.
+        """
+        if isinstance(model, ThePolicy):
+            model = model.cpu().eval().policy
+        self._policy = model
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.policy_depth = policy_depth
+        self.table = table if table is not None else TranspositionTable(table_size)
+        self.first_depth = first_depth
+        self.book = book
+        self.tablebase = tablebase
+        self._encoding = allocate_encoding(1)
+        self.history = np.zeros(ActionMapper.TOTAL_ACTIONS, dtype=np.int64)
+        self.killers: list[list[Optional[Turn]]] = []
+        self.nodes = 0
+        self._rule_draws = 0
+        "Repetition and no-capture draws met so far, they depend on the path."
+        self._root_best: Optional[Turn] = None
+        self._deadline: Optional[float] = None
+        self.stats: dict = {}
+        "Numbers of the last search: depth, score, nodes, seconds."
+
+    def get_complete_move(self, game: Muehle) -> Turn:
+        """Searches the position and returns the turn (from_idx, to_idx, remove_idx).
+
+        The game is left unchanged.
+        """
+        turns = list(game.generate_turns())
+        if len(turns) <= 1:
+            return turns[0] if turns else (None, None, None)
+        if self.book is not None:
+            turn = self.book.lookup(game)
+            if turn is not None:
+                return turn
+        if self.tablebase is not None:
+            turn = self.tablebase.best_turn(game)
+            if turn is not None:
+                return turn
+        return self.search(game)[0]
+
+    def search(self, game: Muehle) -> tuple[Turn, int]:
+        """Runs the iterative deepening and returns the best turn and its score."""
+        start = time.perf_counter()
+        self._deadline = None if self.time_limit is None else start + self.time_limit
+        self.nodes = 0
+        self.table.new_search()
+        self.history //= 8
+        self.killers = [[None, None] for _ in range(self.max_depth + 1)]
+
+        best, score, depth = None, 0, 0
+        for iteration in range(self.first_depth, self.max_depth + 1):
+            try:
+                score = self._negamax(game, iteration, -MATE, MATE, 0)
+            except SearchTimeout:
+                break
+            best, depth = self._root_best, iteration
+            if abs(score) > MATE_BOUND:
+                break
+        if best is None:
+            best = self._ordered(game, self.table.probe(game.hash), 0, 1)[0]
+        self.stats = {
+            "depth": depth,
+            "score": score,
+            "nodes": self.nodes,
+            "seconds": time.perf_counter() - start,
+        }
+        return best, score
+
+    def _negamax(
+        self, game: Muehle, depth: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        """Score of the non-terminal position of game, seen by the player to move."""
+        self.nodes += 1
+        if (
+            self._deadline is not None
+            and self.nodes & 1023 == 0
+            and time.perf_counter() > self._deadline
+        ):
+            raise SearchTimeout
+        if depth == 0:
+            return evaluate(game)
+
+        key = game.hash
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth and ply > 0:
+            score = _from_table(entry.score, ply)
+            if (
+                entry.bound == EXACT
+                or (entry.bound == LOWER and score >= beta)
+                or (entry.bound == UPPER and score <= alpha)
+            ):
+                return score
+
+        alpha_start = alpha
+        rule_draws = self._rule_draws
+        best_score, best_turn = -MATE, None
+        player = game.player
+        for turn in self._ordered(game, entry, ply, depth):
+            game.push(turn)
+            try:
+                if game.is_terminal():
+                    winner = game.done()
+                    score = 0 if winner == 0 else (MATE - ply - 1) * winner * player
+                    if winner == 0 and game.is_draw():
+                        self._rule_draws += 1
+                else:
+                    score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+
+            if score > best_score:
+                best_score, best_turn = score, turn
+                if ply == 0:
+                    self._root_best = turn
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if turn[2] is None:
+                            self._remember_cutoff(turn, ply, depth)
+                        break
+
+        if best_score <= alpha_start:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        # a score that saw a rule draw depends on the history of this game
+        if self._rule_draws == rule_draws:
+            self.table.store(key, depth, bound, _to_table(best_score, ply), best_turn)
+        return best_score
+
+    def _ordered(self, game: Muehle, entry, ply: int, depth: int) -> list[Turn]:
+        """The turns of game, most promising first."""
+        turns = list(game.generate_turns())
+        table_turn = entry.turn if entry is not None else None
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        if self._policy is not None and depth >= self.policy_depth:
+            order = self._policy_logits(game)
+        else:
+            order = self.history
+
+        def key(turn: Turn):
+            if turn == table_turn:
+                return (3, 0.0)
+            if turn[2] is not None:
+                return (2, float(order[_action(turn)]))
+            if turn in killers:
+                return (1, 0.0)
+            return (0, float(order[_action(turn)]))
+
+        turns.sort(key=key, reverse=True)
+        return turns
+
+    def _remember_cutoff(self, turn: Turn, ply: int, depth: int):
+        killers = self.killers[ply]
+        if turn != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = turn
+        self.history[_action(turn)] += depth * depth
+
+    def _policy_logits(self, game: Muehle) -> np.ndarray:
+        board_tensor, global_features = encode_into(
+            game, game.player, False, self._encoding
+        )
+        with torch.inference_mode():
+            return self._policy(board_tensor, global_features)[0].numpy()
+
+
+def _action(turn: Turn) -> int:
+    """Policy index of the move of a turn."""
+    source, target, _ = turn
+    return (ActionMapper.NUM_SOURCES - 1 if source is None else source) * 24 + target
+
+
+def _to_table(score: int, ply: int) -> int:
+    """Makes win and loss scores relative to the stored position."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _from_table(score: int, ply: int) -> int:
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Analyses a Muehle position with the alpha-beta search."
+    )
+    parser.add_argument(
+        "--key",
+        type=lambda value: int(value, 0),
+        default=None,
+        help="Position as Muehle.to_key() (decimal or 0x...). Defaults to the start position.",
+    )
+    parser.add_argument("--time", type=float, default=5.0, help="Seconds to search.")
+    parser.add_argument("--depth", type=int, default=64, help="Maximum depth.")
+    parser.add_argument(
+        "--table",
+        type=Path,
+        default=None,
+        help="Transposition table file, created if missing and kept for later runs.",
+    )
+    parser.add_argument(
+        "--model", type=Path, default=None, help="Policy to order the turns with."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None):
+    args = parse_args(argv)
+    game = (
+        Muehle(REPETITION_LIMIT)
+        if args.key is None
+        else Muehle.from_key(args.key, REPETITION_LIMIT)
+    )
+    model = None
+    if args.model is not None:
+        from .play import load_model
+
+        model = load_model(args.model).model
+    table = TranspositionTable.open(args.table) if args.table is not None else None
+    agent = AlphaBetaAgent(
+        model, time_limit=args.time, max_depth=args.depth, table=table
+    )
+    turn, score = agent.search(game)
+    stats = agent.stats
+    print(
+        f"turn {turn} | score {score} | depth {stats['depth']} | "
+        f"nodes {stats['nodes']} | {stats['seconds']:.2f}s | "
+        f"table {agent.table.usage():.0%} used"
+    )
+    agent.table.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+"""Round-robin arena with Elo ratings for agents and policy checkpoints.
+
+Every pair of agents plays the same number of games. The games come in pairs:
+both games start from the same random opening, and the agents swap colours
+between them. Games are spread over a process pool. The ratings are fitted
+with the Bradley-Terry model on the Elo scale, and their 95% intervals come
+from a bootstrap over the games.
+
+    python -m ai.arena models/policy_final.pth models/policy_final-4.pth random
+    python -m ai.arena models/*.pth random --games 40 --workers 4 --output ratings.csv
+
+An agent is given as a spec: a model file (see play.load_model), or the name
+of a registered agent, optionally followed by ``:argument``.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import combinations
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Optional, Protocol
+
+import numpy as np
+
+from muehle_game import Muehle
+from muehle_game.game import REPETITION_LIMIT, Turn
+
+
+class Agent(Protocol):
+    def get_complete_move(self, game: Muehle) -> Turn: ...
+
+
+AgentFactory = Callable[[Optional[str]], Agent]
+
+AGENTS: dict[str, AgentFactory] = {}
+"Registered agents by name, a factory gets the argument after the colon."
+
+
+def register_agent(name: str) -> Callable[[AgentFactory], AgentFactory]:
+    """Registers an agent factory under name, usable as spec ``name[:arg]``."""
+
+    def decorator(factory: AgentFactory) -> AgentFactory:
+        AGENTS[name] = factory
+        return factory
+
+    return decorator
+
+
+class RandomAgent:
+    """Plays a uniformly random complete turn."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def get_complete_move(self, game: Muehle) -> Turn:
+        turns = list(game.generate_turns())
+        if not turns:
+            return None, None, None
+        return self.rng.choice(turns)
+
+
+@register_agent("random")
+def _random_agent(arg: Optional[str]) -> Agent:
+    return RandomAgent(None if arg is None else int(arg))
+
+
+def _mcts_spec(arg: Optional[str]) -> tuple[Path, int]:
+    """The model file and simulations of ``mcts:model_path[,simulations]``.
+
+    Raises:
+        ValueError: If the model is missing or an exported policy, MCTS needs
+            the value head.
+    """
+    from .export import is_exported
+
+    if arg is None:
+        raise ValueError("mcts needs a model file, mcts:path[,simulations]")
+    path, _, simulations = arg.rpartition(",")
+    if not path or not simulations.isdigit():
+        path, simulations = arg, "200"
+    if is_exported(path):
+        raise ValueError(
+            f"mcts needs the value head, {path} is an exported policy without it"
+        )
+    return Path(path), int(simulations)
+
+
+@register_agent("mcts")
+def _mcts_agent(arg: Optional[str]) -> Agent:
+    """``mcts:model_path[,simulations]``, see ai.mcts."""
+    from .mcts import MCTSAgent
+    from .play import load_model
+
+    path, simulations = _mcts_spec(arg)
+    return MCTSAgent(load_model(path).model, simulations=simulations)
+
+
+@register_agent("alphabeta")
+def _alphabeta_agent(arg: Optional[str]) -> Agent:
+    """``alphabeta[:seconds]`` or ``alphabeta:model_path[,seconds]``, see ai.alphabeta."""
+    from .alphabeta import AlphaBetaAgent
+    from .play import load_model
+
+    path, seconds = arg or "", "1.0"
+    head, _, tail = path.rpartition(",")
+    if tail.replace(".", "", 1).isdigit():
+        path, seconds = head, tail
+    model = load_model(Path(path)).model if path else None
+    return AlphaBetaAgent(model, time_limit=float(seconds))
+
+
+def make_agent(spec: str) -> Agent:
+    """Creates the agent of a spec, see the module docstring."""
+    name, _, arg = spec.partition(":")
+    if name in AGENTS:
+        return AGENTS[name](arg or None)
+    if Path(spec).is_file():
+        from .play import load_model
+
+        return load_model(Path(spec))
+    raise ValueError(f"Unknown agent {spec!r}, registered: {sorted(AGENTS)}")
+
+
+@dataclass
+class ArenaConfig:
+    """Rules of the arena games."""
+
+    opening_turns: int = 4
+    "Random turns played before the agents take over."
+    repetition_limit: Optional[int] = REPETITION_LIMIT
+    "See Muehle."
+    no_capture_limit: Optional[int] = 50
+    "See Muehle."
+    max_turns: int = 400
+    "Games still running after this many turns are draws."
+
+
+def play_game(
+    white: Agent,
+    black: Agent,
+    config: ArenaConfig,
+    seed: int,
+) -> int:
+    """Plays one game from a random opening.
+
+    Args:
+        white: Agent of player 1, moves first after the opening.
+        black: Agent of player -1.
+        config: Rules of the game.
+        seed: Seed of the opening.
+
+    Returns:
+        1 if white wins, -1 if black wins and 0 for a draw. An agent that plays
+        an illegal turn loses.
+    """
+    game = Muehle(
+        repetition_limit=config.repetition_limit,
+        no_capture_limit=config.no_capture_limit,
+    )
+    rng = random.Random(seed)
+    for _ in range(config.opening_turns):
+        if game.is_terminal():
+            break
+        game.push(rng.choice(list(game.generate_turns())))
+    agents = {1: white, -1: black}
+
+    for _ in range(config.max_turns):
+        if game.is_terminal():
+            return game.done()
+        player = game.player
+        turn = agents[player].get_complete_move(game)
+        if turn not in set(game.generate_turns()):
+            return -player
+        game.push(turn)
+    return game.done() if game.is_terminal() else 0
+
+
+_agents: dict[str, Agent] = {}
+
+
+def _init_worker(threads: int):
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def _cached_agent(spec: str) -> Agent:
+    if spec not in _agents:
+        _agents[spec] = make_agent(spec)
+    return _agents[spec]
+
+
+def _play_pair(
+    spec_a: str, spec_b: str, config: ArenaConfig, seed: int
+) -> tuple[float, int, int]:
+    """Plays both colours from one opening, returns (score of a, wins a, wins b)."""
+    a = _cached_agent(spec_a)
+    b = _cached_agent(spec_b)
+    first = play_game(a, b, config, seed)
+    second = -play_game(b, a, config, seed)
+    score = (first + 1) / 2 + (second + 1) / 2
+    wins_a = (first == 1) + (second == 1)
+    wins_b = (first == -1) + (second == -1)
+    return score, wins_a, wins_b
+
+
+@dataclass
+class PairResult:
+    """Results of agent a against agent b."""
+
+    a: int
+    b: int
+    scores: list[float]
+    "Score of a in every game pair (0 to 2)."
+    wins: int = 0
+    losses: int = 0
+
+    @property
+    def games(self) -> int:
+        return 2 * len(self.scores)
+
+    @property
+    def draws(self) -> int:
+        return self.games - self.wins - self.losses
+
+
+def round_robin(
+    specs: list[str],
+    games: int = 20,
+    workers: int = 1,
+    config: Optional[ArenaConfig] = None,
+    seed: int = 0,
+    threads: int = 1,
+) -> list[PairResult]:
+    """Plays games games (rounded up to an even number) between every pair.
+
+    Args:
+        specs: Agent specs, see make_agent.
+        games: Games per pair, half of them with each colour.
+        workers: Worker processes, 1 plays in this process.
+        config: Rules of the games.
+        seed: Seed of the openings.
+        threads: torch threads per worker.
+
+    Returns:
+        One PairResult per pair of agents.
+    """
+    config = config or ArenaConfig()
+    pairs = list(combinations(range(len(specs)), 2))
+    rounds = (games + 1) // 2
+    tasks = [
+        (specs[i], specs[j], config, seed + r) for i, j in pairs for r in range(rounds)
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        ) as pool:
+            outcomes = list(
+                pool.map(_play_pair, *zip(*tasks), chunksize=max(1, rounds // 4))
+            )
+    else:
+        outcomes = [_play_pair(*task) for task in tasks]
+
+    results = []
+    for k, (i, j) in enumerate(pairs):
+        result = PairResult(i, j, [])
+        for score, wins, losses in outcomes[k * rounds : (k + 1) * rounds]:
+            result.scores.append(score)
+            result.wins += wins
+            result.losses += losses
+        results.append(result)
+    return results
+
+
+def fit_ratings(
+    num_agents: int,
+    results: list[PairResult],
+    anchor: Optional[int] = None,
+    prior_games: float = 1.0,
+) -> np.ndarray:
+    """Bradley-Terry ratings on the Elo scale, draws count as half a win.
+
+    Args:
+        num_agents: Number of agents.
+        results: Pair results, the scores of a pair are summed.
+        anchor: Agent whose rating is 0, the mean rating is 0 if None.
+        prior_games: Virtual drawn games between every pair, keeps ratings
+            finite for agents that won or lost everything.
+
+    Returns:
+        (num_agents,) ratings.
+    """
+    games = np.zeros((num_agents, num_agents))
+    score = np.zeros((num_agents, num_agents))
+    for result in results:
+        total = sum(result.scores)
+        games[result.a, result.b] += result.games
+        games[result.b, result.a] += result.games
+        score[result.a, result.b] += total
+        score[result.b, result.a] += result.games - total
+    off_diagonal = 1 - np.eye(num_agents)
+    games += prior_games * off_diagonal
+    score += prior_games / 2 * off_diagonal
+
+    # minorization-maximization (Hunter 2004) on gamma = 10 ** (rating / 400)
+    wins = score.sum(axis=1)
+    gamma = np.ones(num_agents)
+    for _ in range(10000):
+        new = wins / (games / (gamma[:, None] + gamma[None, :])).sum(axis=1)
+        new /= np.exp(np.log(new).mean())
+        if np.allclose(new, gamma, rtol=1e-10, atol=0):
+            gamma = new
+            break
+        gamma = new
+    ratings = 400 * np.log10(gamma)
+    return ratings - (ratings[anchor] if anchor is not None else ratings.mean())
+
+
+def bootstrap_intervals(
+    num_agents: int,
+    results: list[PairResult],
+    anchor: Optional[int] = None,
+    samples: int = 200,
+    seed: int = 0,
+) -> np.ndarray:
+    """95% bootstrap intervals of fit_ratings, resampling the game pairs.
+
+    Returns:
+        (num_agents, 2) lower and upper bounds.
+    """
+    rng = np.random.default_rng(seed)
+    fits = []
+    for _ in range(samples):
+        resampled = []
+        for result in results:
+            scores = np.asarray(result.scores)
+            picked = scores[rng.integers(len(scores), size=len(scores))]
+            resampled.append(PairResult(result.a, result.b, list(picked)))
+        fits.append(fit_ratings(num_agents, resampled, anchor))
+    return np.percentile(np.array(fits), [2.5, 97.5], axis=0).T
+
+
+def ratings_table(
+    specs: list[str],
+    results: list[PairResult],
+    anchor: Optional[int] = None,
+    samples: int = 200,
+) -> list[dict]:
+    """Rows of the ratings table, strongest agent first."""
+    ratings = fit_ratings(len(specs), results, anchor)
+    intervals = bootstrap_intervals(len(specs), results, anchor, samples)
+    rows = []
+    for k, spec in enumerate(specs):
+        own = [r for r in results if k in (r.a, r.b)]
+        wins = sum(r.wins if r.a == k else r.losses for r in own)
+        losses = sum(r.losses if r.a == k else r.wins for r in own)
+        games = sum(r.games for r in own)
+        rows.append(
+            {
+                "agent": spec,
+                "elo": round(float(ratings[k]), 1),
+                "ci_low": round(float(intervals[k, 0]), 1),
+                "ci_high": round(float(intervals[k, 1]), 1),
+                "games": games,
+                "wins": wins,
+                "draws": games - wins - losses,
+                "losses": losses,
+            }
+        )
+    return sorted(rows, key=lambda row: -row["elo"])
+
+
+def format_table(rows: list[dict]) -> str:
+    width = max(len("agent"), *(len(row["agent"]) for row in rows))
+    lines = [
+        f"{'agent':<{width}} {'elo':>8} {'95% interval':>19} "
+        f"{'games':>6} {'W':>5} {'D':>5} {'L':>5}"
+    ]
+    for row in rows:
+        interval = f"[{row['ci_low']:.0f}, {row['ci_high']:.0f}]"
+        lines.append(
+            f"{row['agent']:<{width}} {row['elo']:>8.1f} {interval:>19} "
+            f"{row['games']:>6} {row['wins']:>5} {row['draws']:>5} {row['losses']:>5}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Plays a round-robin between agents and rates them."
+    )
+    parser.add_argument(
+        "agents",
+        nargs="+",
+        help=f"Model files or registered agents ({', '.join(sorted(AGENTS))}), "
+        "optionally with :argument.",
+    )
+    parser.add_argument(
+        "--games", type=int, default=20, help="Games per pair of agents."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes.",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=1, help="torch threads per worker."
+    )
+    parser.add_argument(
+        "--opening-turns",
+        type=int,
+        default=ArenaConfig.opening_turns,
+        help="Random turns before the agents take over.",
+    )
+    parser.add_argument(
+        "--no-capture-limit",
+        type=int,
+        default=ArenaConfig.no_capture_limit,
+        help="Draw after this many turns without placement or removal.",
+    )
+    parser.add_argument(
+        "--max-turns",
+        type=int,
+        default=ArenaConfig.max_turns,
+        help="Draw after this many turns.",
+    )
+    parser.add_argument(
+        "--anchor",
+        default=None,
+        help="Agent rated 0 (default: random if present, else the mean is 0).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the openings.")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write the table as CSV."
+    )
+    args = parser.parse_args(argv)
+    if args.anchor is not None and args.anchor not in args.agents:
+        parser.error(
+            f"--anchor {args.anchor!r} is not one of the agents: "
+            + ", ".join(args.agents)
+        )
+    for spec in args.agents:
+        name, _, arg = spec.partition(":")
+        if name == "mcts":
+            try:
+                _mcts_spec(arg or None)
+            except ValueError as error:
+                parser.error(str(error))
+    return args
+
+
+def main(argv: Optional[list[str]] = None):
+    args = parse_args(argv)
+    specs = list(dict.fromkeys(args.agents))
+    if len(specs) < 2:
+        sys.exit("Need at least two different agents")
+    anchor_spec = args.anchor or ("random" if "random" in specs else None)
+    anchor = specs.index(anchor_spec) if anchor_spec is not None else None
+
+    config = ArenaConfig(
+        opening_turns=args.opening_turns,
+        no_capture_limit=args.no_capture_limit,
+        max_turns=args.max_turns,
+    )
+    start = time.perf_counter()
+    results = round_robin(
+        specs, args.games, args.workers, config, args.seed, args.threads
+    )
+    elapsed = time.perf_counter() - start
+    games = sum(result.games for result in results)
+    print(f"{games} games in {elapsed:.1f}s ({games / elapsed:.1f} games/s)")
+
+    rows = ratings_table(specs, results, anchor)
+    print(format_table(rows))
+    if args.output is not None:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
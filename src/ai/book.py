@@ -0,0 +1,295 @@
+"""Opening book for the placing phase.
+
+The book holds one turn for every position of the first plies of the game,
+keyed by the canonical key of the position (see muehle_game.symmetry), so
+symmetric positions share an entry and the turn is mapped back onto the
+board of the game. The builder walks all placing lines up to the given
+number of plies and scores every position with the alpha-beta search or
+with a self-play sample of every turn.
+
+    python -m ai.book --plies 4 --time 2.0 --output models/book.bin
+    python -m ai.book --plies 3 --self-play 64 --agent random --output models/book.bin
+
+A book file is a header, the sorted keys, the packed turns (see
+ttable.pack_turn) and the scores. OpeningBook maps it read-only, a lookup is
+a binary search over the keys.
+"""
+
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from muehle_game import Muehle
+from muehle_game.game import REPETITION_LIMIT, Turn
+from muehle_game.symmetry import INVERSE, canonical_key, transform_cell
+
+from .ttable import pack_turn, unpack_turn
+
+MAGIC = int.from_bytes(b"MUEHLEBK", "little")
+VERSION = 1
+"Format of book files, files of other versions are rejected."
+HEADER_WORDS = 4
+"uint64 words before the keys: magic, version, number of entries, plies."
+
+Scorer = Callable[[Muehle], tuple[Turn, int]]
+"Returns the best turn of a position and its score for the player to move."
+
+
+class BookEntry(NamedTuple):
+    turn: Turn
+    score: int
+
+
+class OpeningBook:
+    """Sorted book entries, usually mapped from a file by OpeningBook.open."""
+
+    def __init__(self, keys: np.ndarray, turns: np.ndarray, scores: np.ndarray):
+        self.keys = keys
+        self.turns = turns
+        self.scores = scores
+        self.plies = 0
+        "Number of plies the builder explored."
+
+    @classmethod
+    def open(cls, path: str | Path) -> "OpeningBook":
+        """Maps a book file written by write_book.
+
+        Raises:
+            ValueError: If the file is not a book file of this version.
+        """
+        path = Path(path)
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(data) < 8 * HEADER_WORDS:
+            raise ValueError(f"{path} is not an opening book file")
+        header = data[: 8 * HEADER_WORDS].view(np.uint64)
+        if int(header[0]) != MAGIC:
+            raise ValueError(f"{path} is not an opening book file")
+        if int(header[1]) != VERSION:
+            raise ValueError(
+                f"{path} has book version {int(header[1])}, expected {VERSION}"
+            )
+        count = int(header[2])
+        start = 8 * HEADER_WORDS
+        keys = data[start : start + 8 * count].view(np.uint64)
+        start += 8 * count
+        turns = data[start : start + 2 * count].view(np.uint16)
+        start += 2 * count
+        scores = data[start : start + 2 * count].view(np.int16)
+        if len(scores) != count:
+            raise ValueError(f"{path} is truncated")
+        book = cls(keys, turns, scores)
+        book.plies = int(header[3])
+        return book
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def probe(self, game: Muehle) -> Optional[BookEntry]:
+        """The book turn of the position of game and its score, if it is in the book."""
+        if game.to_place[game.player] == 0 or not len(self.keys):
+            return None
+        key, k = canonical_key(game)
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i == len(self.keys) or int(self.keys[i]) != key:
+            return None
+        inverse = int(INVERSE[k])
+        turn = tuple(
+            transform_cell(cell, inverse) for cell in unpack_turn(int(self.turns[i]))
+        )
+        return BookEntry(turn, int(self.scores[i]))
+
+    def lookup(self, game: Muehle) -> Optional[Turn]:
+        """The book turn of the position of game, None if it is not in the book."""
+        entry = self.probe(game)
+        return None if entry is None else entry.turn
+
+
+def write_book(path: str | Path, entries: dict[int, BookEntry], plies: int = 0):
+    """Writes entries by canonical key to a book file, replacing it atomically.
+
+    The turns must be given in the canonical orientation of their key.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    keys = np.array(sorted(entries), dtype=np.uint64)
+    turns = np.array([pack_turn(entries[key].turn) for key in keys.tolist()])
+    scores = np.array([entries[key].score for key in keys.tolist()])
+    header = np.array([MAGIC, VERSION, len(keys), plies], dtype=np.uint64)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header.tobytes())
+        f.write(keys.tobytes())
+        f.write(turns.astype(np.uint16).tobytes())
+        f.write(np.clip(scores, -0x8000, 0x7FFF).astype(np.int16).tobytes())
+    os.replace(tmp, path)
+
+
+def placing_positions(plies: int) -> list[list[int]]:
+    """Canonical keys of the placing positions after 0 .. plies - 1 turns."""
+    levels = [[canonical_key(Muehle())[0]]]
+    for _ in range(1, plies):
+        successors = set()
+        for key in levels[-1]:
+            game = Muehle.from_key(key)
+            for turn in game.generate_turns():
+                game.push(turn)
+                if not game.is_terminal() and game.to_place[game.player]:
+                    successors.add(canonical_key(game)[0])
+                game.pop()
+        levels.append(sorted(successors))
+    return levels
+
+
+def build_book(
+    path: str | Path,
+    plies: int,
+    scorer: Scorer,
+    log: Callable[[str], None] = lambda message: None,
+) -> OpeningBook:
+    """Scores every placing position of the first plies turns and writes the book.
+
+    Args:
+        path: Book file to write.
+        plies: Number of turns the book covers from the start position.
+        scorer: Picks the turn of a position, see SearchScorer and
+            SelfPlayScorer.
+        log: Receives progress messages.
+    """
+    entries: dict[int, BookEntry] = {}
+    for ply, keys in enumerate(placing_positions(plies)):
+        start = time.perf_counter()
+        for key in keys:
+            turn, score = scorer(Muehle.from_key(key))
+            entries[key] = BookEntry(turn, score)
+        log(f"ply {ply}: {len(keys)} positions in {time.perf_counter() - start:.1f}s")
+    write_book(path, entries, plies)
+    return OpeningBook.open(path)
+
+
+class SearchScorer:
+    """Scores a position with the alpha-beta search, see ai.alphabeta."""
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = 2.0,
+        max_depth: int = 64,
+        model=None,
+    ):
+        from .alphabeta import AlphaBetaAgent
+
+        self.agent = AlphaBetaAgent(model, time_limit=time_limit, max_depth=max_depth)
+
+    def __call__(self, game: Muehle) -> tuple[Turn, int]:
+        return self.agent.search(game)
+
+
+class SelfPlayScorer:
+    """Scores every turn by the results of games played on from it.
+
+    Both sides are played by the same agent, which picks a uniformly random
+    turn with probability epsilon so the games differ. The score of a turn is
+    the mean result for the player who made it, times 1000.
+    """
+
+    def __init__(
+        self,
+        agent,
+        games: int = 64,
+        epsilon: float = 0.2,
+        max_turns: int = 200,
+        no_capture_limit: Optional[int] = 50,
+        seed: int = 0,
+    ):
+        self.agent = agent
+        self.games = games
+        self.epsilon = epsilon
+        self.max_turns = max_turns
+        self.no_capture_limit = no_capture_limit
+        self.rng = random.Random(seed)
+
+    def __call__(self, game: Muehle) -> tuple[Turn, int]:
+        player = game.player
+        best, best_score = None, None
+        for turn in game.generate_turns():
+            after = Muehle.from_key(
+                game.to_key(), REPETITION_LIMIT, self.no_capture_limit
+            )
+            after.push(turn)
+            total = sum(self._play(after) for _ in range(self.games))
+            score = round(1000 * total * player / self.games)
+            if best_score is None or score > best_score:
+                best, best_score = turn, score
+        return best, best_score
+
+    def _play(self, start: Muehle) -> int:
+        game = start.clone()
+        for _ in range(self.max_turns):
+            if game.is_terminal():
+                return game.done()
+            turns = list(game.generate_turns())
+            if self.rng.random() < self.epsilon:
+                turn = self.rng.choice(turns)
+            else:
+                turn = self.agent.get_complete_move(game)
+            game.push(turn)
+        return game.done() if game.is_terminal() else 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Builds an opening book for the placing phase."
+    )
+    parser.add_argument(
+        "--plies", type=int, default=4, help="Turns the book covers from the start."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("models/book.bin"), help="Book file."
+    )
+    parser.add_argument(
+        "--time", type=float, default=2.0, help="Seconds of search per position."
+    )
+    parser.add_argument(
+        "--model", type=Path, default=None, help="Policy to order the search with."
+    )
+    parser.add_argument(
+        "--self-play",
+        type=int,
+        default=None,
+        help="Score every turn with this many self-play games instead of the search.",
+    )
+    parser.add_argument(
+        "--agent",
+        default="random",
+        help="Agent spec of the self-play games (see ai.arena).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None):
+    args = parse_args(argv)
+    if args.self_play is not None:
+        from .arena import make_agent
+
+        scorer: Scorer = SelfPlayScorer(make_agent(args.agent), games=args.self_play)
+    else:
+        model = None
+        if args.model is not None:
+            from .play import load_model
+
+            model = load_model(args.model).model
+        scorer = SearchScorer(args.time, model=model)
+    start = time.perf_counter()
+    book = build_book(args.output, args.plies, scorer, log=print)
+    print(
+        f"{len(book)} positions in {time.perf_counter() - start:.1f}s, "
+        f"written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Compact storage for self-play steps between two model updates.
+
+A step takes about 195 bytes: the (3, 24) board planes as uint8, the global
+features as float16 and the 600 action legal mask packed into 75 bytes.
+Self-play writes every step straight into these arrays with add_step,
+per-step dicts of tensors took over 4 KB, most of it for the unused policy
+logits and the unpacked mask.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+from muehle_game.batch import NUM_ACTIONS
+
+_MASK_BYTES = (NUM_ACTIONS + 7) // 8
+_BLOCK = 256
+_FIELDS = (
+    "players",
+    "boards",
+    "globals",
+    "actions",
+    "rewards",
+    "values",
+    "log_probs",
+    "temperatures",
+    "epsilons",
+    "legal_masks",
+)
+_DEFAULTS = {"temperatures": 1.0, "epsilons": 0.0}
+"Sampling settings of steps stored before they were recorded."
+
+
+class RolloutBuffer:
+    """Preallocated, growable arrays of complete self-play episodes.
+
+    Episodes are stored back to back, episode_ends holds the index after the
+    last step of every episode.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """Allocates room for capacity steps, more is allocated when needed."""
+        self.size = 0
+        self.episode_ends: List[int] = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        old = {name: getattr(self, name) for name in _FIELDS if hasattr(self, name)}
+        self.capacity = capacity
+        self.players = np.zeros(capacity, dtype=np.int8)
+        self.boards = np.zeros((capacity, 3, 24), dtype=np.uint8)
+        self.globals = np.zeros((capacity, 11), dtype=np.float16)
+        self.actions = np.zeros(capacity, dtype=np.int16)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.log_probs = np.zeros(capacity, dtype=np.float32)
+        self.temperatures = np.ones(capacity, dtype=np.float32)
+        self.epsilons = np.zeros(capacity, dtype=np.float32)
+        self.legal_masks = np.zeros((capacity, _MASK_BYTES), dtype=np.uint8)
+        for name, array in old.items():
+            getattr(self, name)[: self.size] = array[: self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def num_episodes(self) -> int:
+        return len(self.episode_ends)
+
+    def clear(self):
+        """Drops all episodes, the arrays are kept for reuse."""
+        self.size = 0
+        self.episode_ends.clear()
+
+    def state_dict(self) -> dict:
+        """The stored steps as tensors, for checkpoints."""
+        n = self.size
+        state = {name: torch.from_numpy(getattr(self, name)[:n]) for name in _FIELDS}
+        state["episode_ends"] = list(self.episode_ends)
+        return state
+
+    def load_state_dict(self, state: dict):
+        """Replaces the stored steps with a state_dict()."""
+        n = len(state["players"])
+        self.clear()
+        if n > self.capacity:
+            self._allocate(n)
+        for name in _FIELDS:
+            if name in state:
+                getattr(self, name)[:n] = state[name].numpy()
+            else:
+                getattr(self, name)[:n] = _DEFAULTS[name]
+        self.size = n
+        self.episode_ends = list(state["episode_ends"])
+
+    def add_episode(
+        self,
+        players: np.ndarray,
+        boards: np.ndarray,
+        global_features: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        values: np.ndarray,
+        legal_masks: np.ndarray,
+        log_probs: Optional[np.ndarray] = None,
+        temperature: float = 1.0,
+        epsilon: float = 0.0,
+    ):
+        """Appends one episode of T steps.
+
+        Args:
+            players: (T,) player to move.
+            boards: (T, 3, 24) encoded boards, see encode_data.
+            global_features: (T, 11) encoded global features.
+            actions: (T,) chosen action indices.
+            rewards: (T,) rewards.
+            values: (T,) or (T, 1) value estimates.
+            legal_masks: (T, 600) boolean legal action masks.
+            log_probs: (T,) log-probabilities of the actions under the policy
+                that chose them, NaN if None.
+            temperature: Temperature the actions were sampled with.
+            epsilon: Probability of the uniform pick the actions were
+                sampled with.
+        """
+        steps = len(players)
+        if steps == 0:
+            return
+        if self.size + steps > self.capacity:
+            self._allocate(max(2 * self.capacity, self.size + steps))
+        s = slice(self.size, self.size + steps)
+        self.players[s] = players
+        self.boards[s] = boards
+        self.globals[s] = global_features
+        self.actions[s] = actions
+        self.rewards[s] = rewards
+        self.values[s] = np.reshape(values, steps)
+        self.log_probs[s] = np.nan if log_probs is None else log_probs
+        self.temperatures[s] = temperature
+        self.epsilons[s] = epsilon
+        self.legal_masks[s] = np.packbits(legal_masks, axis=1)
+        self.size += steps
+        self.episode_ends.append(self.size)
+
+    def add_step(
+        self,
+        player: int,
+        board: np.ndarray,
+        global_features: np.ndarray,
+        action: int,
+        value: float,
+        legal_mask: np.ndarray,
+        log_prob: float = np.nan,
+        reward: float = 0.0,
+        temperature: float = 1.0,
+        epsilon: float = 0.0,
+    ) -> int:
+        """Appends one step to the open episode and returns its index.
+
+        The step belongs to no episode until end_episode is called.
+
+        Args:
+            player: Player to move.
+            board: (3, 24) encoded board, see encode_data.
+            global_features: (11,) encoded global features.
+            action: Chosen action index.
+            value: Value estimate.
+            legal_mask: (600,) boolean legal action mask.
+            log_prob: Log-probability of the action under the policy that
+                chose it.
+            reward: Reward, may be set later through rewards[index].
+            temperature: Temperature the action was sampled with.
+            epsilon: Probability of the uniform pick the action was sampled
+                with.
+        """
+        if self.size == self.capacity:
+            self._allocate(2 * self.capacity)
+        i = self.size
+        self.players[i] = player
+        self.boards[i] = board
+        self.globals[i] = global_features
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.values[i] = value
+        self.log_probs[i] = log_prob
+        self.temperatures[i] = temperature
+        self.epsilons[i] = epsilon
+        self.legal_masks[i] = np.packbits(legal_mask)
+        self.size += 1
+        return i
+
+    def end_episode(self):
+        """Closes the episode of the steps added since the last one."""
+        last = self.episode_ends[-1] if self.episode_ends else 0
+        if self.size > last:
+            self.episode_ends.append(self.size)
+
+    def extend(self, other: "RolloutBuffer"):
+        """Appends all complete episodes of other."""
+        steps = other.episode_ends[-1] if other.episode_ends else 0
+        if steps == 0:
+            return
+        if self.size + steps > self.capacity:
+            self._allocate(max(2 * self.capacity, self.size + steps))
+        for name in _FIELDS:
+            target = getattr(self, name)
+            target[self.size : self.size + steps] = getattr(other, name)[:steps]
+        self.episode_ends.extend(self.size + end for end in other.episode_ends)
+        self.size += steps
+
+    def tensors(self, device: Optional[torch.device] = None) -> dict[str, torch.Tensor]:
+        """The stored steps as float32 / long / bool tensors on device.
+
+        Returns:
+            A dict with board_tensor (N, 3, 24), global_features (N, 11),
+            action_idx (N,), legal_mask (N, 600), reward (N,), value (N,) and
+            log_prob (N,), temperature (N,) and epsilon (N,).
+        """
+        n = self.size
+        masks = np.unpackbits(self.legal_masks[:n], axis=1, count=NUM_ACTIONS)
+        arrays = {
+            "board_tensor": self.boards[:n].astype(np.float32),
+            "global_features": self.globals[:n].astype(np.float32),
+            "action_idx": self.actions[:n].astype(np.int64),
+            "legal_mask": masks.view(bool),
+            "reward": self.rewards[:n],
+            "value": self.values[:n],
+            "log_prob": self.log_probs[:n],
+            "temperature": self.temperatures[:n],
+            "epsilon": self.epsilons[:n],
+        }
+        return {
+            key: torch.from_numpy(np.ascontiguousarray(value)).to(device)
+            for key, value in arrays.items()
+        }
+
+    def compute_advantages(
+        self, gamma: float, gae_lambda: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Generalized Advantage Estimation for all stored episodes at once.
+
+        The value after the last step of an episode is 0. Advantages are not
+        normalized.
+
+        Returns:
+            A tuple (advantages, returns) of (N,) float32 arrays.
+        """
+        n = self.size
+        if n == 0:
+            return np.zeros(0, np.float32), np.zeros(0, np.float32)
+        ends = np.asarray(self.episode_ends)
+        starts = np.concatenate([[0], ends[:-1]])
+        lengths = ends - starts
+        episode = np.repeat(np.arange(len(ends)), lengths)
+        t = np.arange(n) - starts[episode]
+
+        rewards = self.rewards[:n].astype(np.float64)
+        values = self.values[:n].astype(np.float64)
+        next_values = np.zeros(n)
+        next_values[:-1] = values[1:]
+        next_values[ends - 1] = 0.0
+        deltas = np.zeros((len(ends), lengths.max()))
+        deltas[episode, t] = rewards + gamma * next_values - values
+
+        advantages = discounted_suffix_sums(deltas, gamma * gae_lambda)[episode, t]
+        returns = advantages + values
+        return advantages.astype(np.float32), returns.astype(np.float32)
+
+
+def discounted_suffix_sums(x: np.ndarray, discount: float) -> np.ndarray:
+    """out[:, t] = sum over k >= t of discount ** (k - t) * x[:, k].
+
+    Every block of columns is solved in closed form with a reversed cumsum,
+    so there is one Python iteration per block instead of one per step.
+    """
+    if discount == 0:
+        return x.copy()
+    # keep discount ** block far from underflow
+    block = _BLOCK
+    if discount < 1:
+        block = int(min(_BLOCK, max(1, 100 / -np.log10(discount))))
+    out = np.empty_like(x)
+    carry = np.zeros(len(x))
+    width = x.shape[1]
+    for end in range(width, 0, -block):
+        start = max(0, end - block)
+        powers = discount ** np.arange(end - start)
+        sums = np.cumsum((x[:, start:end] * powers)[:, ::-1], axis=1)[:, ::-1]
+        sums = sums / powers
+        sums += carry[:, None] * (discount * powers[-1] / powers)
+        out[:, start:end] = sums
+        carry = sums[:, 0]
+    return out
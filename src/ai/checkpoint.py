@@ -0,0 +1,194 @@
+"""Training checkpoints written by a background thread.
+
+A checkpoint for base path ``policy_checkpoint.pth`` at episode 500 is saved
+as ``policy_checkpoint-0000500.pth`` next to it. Every file is written to a
+temporary name first and then renamed, so a crash never leaves a truncated
+checkpoint behind. Only plain Python types and tensors are stored, so the
+files load with ``torch.load(..., weights_only=True)``.
+"""
+
+import copy
+import os
+import queue
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+
+
+def checkpoint_path(base: str | Path, episode: int) -> Path:
+    """Path of the checkpoint of episode for a base path."""
+    base = Path(base)
+    return base.with_name(f"{base.stem}-{episode:07d}{base.suffix}")
+
+
+def list_checkpoints(base: str | Path) -> list[tuple[int, Path]]:
+    """All checkpoints of a base path as (episode, path), oldest first."""
+    base = Path(base)
+    pattern = re.compile(rf"{re.escape(base.stem)}-(\d+){re.escape(base.suffix)}")
+    found = []
+    if base.parent.is_dir():
+        for path in base.parent.iterdir():
+            match = pattern.fullmatch(path.name)
+            if match:
+                found.append((int(match.group(1)), path))
+    return sorted(found)
+
+
+def latest_checkpoint(base: str | Path) -> Optional[Path]:
+    """The newest checkpoint of a base path, None if there is none."""
+    checkpoints = list_checkpoints(base)
+    return checkpoints[-1][1] if checkpoints else None
+
+
+def rng_state() -> dict:
+    """States of the random, NumPy and torch generators."""
+    name, keys, pos, has_gauss, cached = np.random.get_state()
+    state = {
+        "python": random.getstate(),
+        "numpy": (
+            name,
+            torch.from_numpy(keys.astype(np.int64)),
+            pos,
+            has_gauss,
+            cached,
+        ),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: dict):
+    """Restores the generators from rng_state()."""
+    random.setstate(state["python"])
+    name, keys, pos, has_gauss, cached = state["numpy"]
+    np.random.set_state((name, keys.numpy().astype(np.uint32), pos, has_gauss, cached))
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def load_checkpoint(path: str | Path, map_location="cpu") -> dict:
+    """Loads a checkpoint written by CheckpointWriter."""
+    return torch.load(path, map_location=map_location, weights_only=True)
+
+
+def snapshot(state: dict) -> dict:
+    """A deep copy of state with all tensors cloned to the CPU.
+
+    Training can continue to change the model and optimizer while the copy is
+    written.
+    """
+    if isinstance(state, dict):
+        return {key: snapshot(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(value) for value in state)
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    return copy.deepcopy(state)
+
+
+class CheckpointWriter:
+    """Writes checkpoints in a background thread and rotates old ones.
+
+    Example:
+        writer = CheckpointWriter("runs/policy_checkpoint.pth", keep_last=3)
+        writer.save(500, {"model_state_dict": model.state_dict()})
+        ...
+        writer.close()
+    """
+
+    def __init__(
+        self,
+        base: str | Path,
+        keep_last: int = 3,
+        keep_every: Optional[int] = None,
+        max_pending: int = 2,
+    ):
+        """Starts the writer thread.
+
+        Args:
+            base: Base path, see checkpoint_path.
+            keep_last: Number of most recent checkpoints to keep.
+            keep_every: Additionally keep every checkpoint whose episode is a
+                multiple of keep_every. None keeps no others.
+            max_pending: save() blocks while this many checkpoints wait to be
+                written.
+        """
+        if keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+        self.base = Path(base)
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="checkpoint-writer", daemon=True
+        )
+        self._thread.start()
+
+    def save(self, episode: int, state: dict):
+        """Queues a snapshot of state as the checkpoint of episode.
+
+        Raises:
+            RuntimeError: If writing an earlier checkpoint failed.
+        """
+        self._raise_error()
+        self._queue.put((episode, snapshot(state)))
+
+    def wait(self):
+        """Blocks until all queued checkpoints are written."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Writes the queued checkpoints and stops the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Writing a checkpoint failed") from error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                episode, state = item
+                self._write(episode, state)
+                self._rotate()
+            except BaseException as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _write(self, episode: int, state: dict):
+        path = checkpoint_path(self.base, episode)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        torch.save(state, tmp)
+        os.replace(tmp, path)
+
+    def _rotate(self):
+        checkpoints = list_checkpoints(self.base)
+        for episode, path in checkpoints[: -self.keep_last]:
+            if self.keep_every and episode % self.keep_every == 0:
+                continue
+            path.unlink(missing_ok=True)
@@ -0,0 +1,203 @@
+"""Exports the policy head of ThePolicy for CPU inference.
+
+The exported graph takes (board, global_features) like ThePolicy and returns
+only the (batch, 600) policy logits, the value head is left out. Linear layers
+can be quantized to int8 (dynamic quantization).
+
+    python -m ai.export models/policy_final.pth models/policy.pt --quantize
+    python -m ai.export models/policy_final.pth models/policy.onnx --quantize
+
+TorchScript (.pt, .ts) only needs torch. ONNX (.onnx) needs the onnx package
+to export and onnxruntime to run. TorchScript files are told apart from
+state dicts saved as .pt by their content, see is_exported.
+"""
+
+import argparse
+import warnings
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import torch
+from torch import nn
+
+from .policy import ThePolicy
+
+PolicyBackend = Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+"Maps (board, global_features) batches to policy logits."
+
+TORCHSCRIPT_SUFFIXES = (".pt", ".ts")
+ONNX_SUFFIXES = (".onnx",)
+EXPORT_SUFFIXES = TORCHSCRIPT_SUFFIXES + ONNX_SUFFIXES
+
+
+class PolicyOnly(nn.Module):
+    """ThePolicy without the value head, the module that gets exported."""
+
+    def __init__(self, model: ThePolicy):
+        super().__init__()
+        self.model = model
+
+    def forward(self, board: torch.Tensor, global_features: torch.Tensor):
+        return self.model.policy(board, global_features)
+
+
+def _example_inputs() -> tuple[torch.Tensor, torch.Tensor]:
+    return torch.zeros(1, 3, 24), torch.zeros(1, 11)
+
+
+def load_state_dict(path: str | Path) -> dict:
+    """Loads a model state dict from a bare state dict or a training checkpoint."""
+    state = torch.load(path, map_location="cpu")
+    if "model_state_dict" in state:
+        state = state["model_state_dict"]
+    return state
+
+
+def export_policy(model: ThePolicy, path: str | Path, quantize: bool = False) -> Path:
+    """Writes the policy of model as TorchScript or ONNX, chosen by the suffix.
+
+    Args:
+        model: The trained model.
+        path: Output file, .pt/.ts for TorchScript or .onnx for ONNX.
+        quantize: Quantize the linear layers to int8.
+
+    Returns:
+        The path written.
+    """
+    path = Path(path)
+    policy = PolicyOnly(model).cpu().eval()
+    if path.suffix in TORCHSCRIPT_SUFFIXES:
+        if quantize:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                policy = torch.ao.quantization.quantize_dynamic(
+                    policy, {nn.Linear}, dtype=torch.qint8
+                )
+        with torch.inference_mode():
+            traced = torch.jit.trace(policy, _example_inputs())
+        torch.jit.save(torch.jit.freeze(traced), str(path))
+    elif path.suffix in ONNX_SUFFIXES:
+        _export_onnx(policy, path, quantize)
+    else:
+        raise ValueError(
+            f"Unknown export format {path.suffix!r}, use one of {EXPORT_SUFFIXES}"
+        )
+    return path
+
+
+def _export_onnx(policy: nn.Module, path: Path, quantize: bool):
+    target = path.with_name(path.stem + ".fp32.onnx") if quantize else path
+    torch.onnx.export(
+        policy,
+        _example_inputs(),
+        str(target),
+        input_names=["board", "global_features"],
+        output_names=["policy_logits"],
+        dynamic_axes={
+            "board": {0: "batch"},
+            "global_features": {0: "batch"},
+            "policy_logits": {0: "batch"},
+        },
+        dynamo=False,
+    )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(target), str(path), weight_type=QuantType.QInt8)
+        target.unlink()
+
+
+class OnnxPolicy:
+    """Runs an exported ONNX policy with onnxruntime, see PolicyBackend."""
+
+    def __init__(self, path: str | Path, threads: int = 1):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("Running ONNX policies needs onnxruntime") from e
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+
+    def __call__(
+        self, board: torch.Tensor, global_features: torch.Tensor
+    ) -> torch.Tensor:
+        (logits,) = self.session.run(
+            None,
+            {
+                "board": np.ascontiguousarray(board.cpu().numpy(), dtype=np.float32),
+                "global_features": np.ascontiguousarray(
+                    global_features.cpu().numpy(), dtype=np.float32
+                ),
+            },
+        )
+        return torch.from_numpy(logits)
+
+
+def is_exported(path: str | Path) -> bool:
+    """Whether path holds an exported policy rather than weights of ThePolicy.
+
+    ONNX files are told by the suffix. TorchScript archives hold the code of
+    the module next to the tensors, which a state dict saved with torch.save
+    does not, whatever the suffix.
+    """
+    path = Path(path)
+    if path.suffix in ONNX_SUFFIXES:
+        return True
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as archive:
+        return any(name.split("/")[1:2] == ["code"] for name in archive.namelist())
+
+
+def load_policy(path: str | Path) -> PolicyBackend:
+    """Loads an exported policy, the backend is chosen by is_exported and the suffix.
+
+    Raises:
+        ValueError: If the file is no exported policy.
+    """
+    path = Path(path)
+    if not is_exported(path):
+        raise ValueError(f"{path} is not an exported policy")
+    if path.suffix in ONNX_SUFFIXES:
+        return OnnxPolicy(path)
+    module = torch.jit.load(str(path), map_location="cpu")
+    module.eval()
+    return module
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Exports the policy of a trained model for CPU inference."
+    )
+    parser.add_argument(
+        "model", type=Path, help="State dict or training checkpoint to export."
+    )
+    parser.add_argument(
+        "output",
+        type=Path,
+        help="Output file, .pt/.ts for TorchScript or .onnx for ONNX.",
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Quantize the linear layers to int8.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    model = ThePolicy()
+    model.load_state_dict(load_state_dict(args.model))
+    path = export_policy(model, args.output, quantize=args.quantize)
+    print(f"Exported policy to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import numpy as np
 import torch
 
 from muehle_game import Muehle
+from muehle_game.bitboard import FULL, to_bool
 
 
 def encode_data(
@@ -50,3 +51,108 @@ def encode_data(
     ).astype(np.float32)  # (11,)
 
     return board_tensor, torch.tensor(global_features, dtype=torch.float32)
+
+
+def encode_into(
+    env: Muehle,
+    player: Literal[1, -1],
+    removal_pending: bool,
+    out: tuple[torch.Tensor, torch.Tensor],
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Encodes one game state like encode_data, into reusable tensors.
+
+    Args:
+        env: The Muehle game environment.
+        player: The current player's perspective (1 or -1).
+        removal_pending: Whether a piece removal is pending for the current player.
+        out: Tensors from allocate_encoding(1) to write into.
+
+    Returns:
+        The (1, 3, 24) and (1, 11) tensors of out.
+    """
+    board_tensor, global_features = out
+    own = env.bits[player]
+    opp = env.bits[-player]
+    board_np = board_tensor.numpy()[0]
+    board_np[0] = to_bool(own)
+    board_np[1] = to_bool(opp)
+    board_np[2] = to_bool(FULL ^ (own | opp))
+
+    global_np = global_features.numpy()[0]
+    global_np[:] = 0.0
+    for offset, p in ((0, player), (3, -player)):
+        phase = env.phase(p).value
+        global_np[offset + phase] = 1.0
+        global_np[6 + offset // 3] = env.to_place[p] / 9.0
+        global_np[8 + offset // 3] = phase == 2
+    global_np[10] = removal_pending
+    return board_tensor, global_features
+
+
+def allocate_encoding(
+    capacity: int, pin_memory: bool = False
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Allocates reusable output tensors for encode_batch.
+
+    Args:
+        capacity: The maximum number of positions per batch.
+        pin_memory: Allocate page-locked memory for faster copies to the GPU.
+                    Ignored if CUDA is not available.
+
+    Returns:
+        A tuple of a (capacity, 3, 24) and a (capacity, 11) float32 tensor.
+    """
+    pin_memory = pin_memory and torch.cuda.is_available()
+    return (
+        torch.empty((capacity, 3, 24), dtype=torch.float32, pin_memory=pin_memory),
+        torch.empty((capacity, 11), dtype=torch.float32, pin_memory=pin_memory),
+    )
+
+
+def encode_batch(
+    boards: np.ndarray,
+    to_place: dict[int, np.ndarray],
+    players: np.ndarray,
+    removal_pending: np.ndarray,
+    out: tuple[torch.Tensor, torch.Tensor] | None = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Encodes a batch of game states, with the same features as encode_data.
+
+    Args:
+        boards: A (N, 24) int8 array of boards.
+        to_place: The (N,) pieces left to place for player 1 and -1.
+        players: The (N,) perspective of every position (1 or -1).
+        removal_pending: A (N,) boolean array, True if a removal is pending.
+        out: Tensors from allocate_encoding to write into. Allocated if None.
+
+    Returns:
+        A tuple containing:
+        - board_tensor: A (N, 3, 24) view of out[0].
+        - global_features: A (N, 11) view of out[1].
+    """
+    n = len(boards)
+    if out is None:
+        out = allocate_encoding(n)
+    board_tensor, global_features = out[0][:n], out[1][:n]
+    board_np = board_tensor.numpy()
+    global_np = global_features.numpy()
+
+    players = np.asarray(players).reshape(n, 1)
+    np.equal(boards, players, out=board_np[:, 0])
+    np.equal(boards, -players, out=board_np[:, 1])
+    np.equal(boards, 0, out=board_np[:, 2])
+
+    is_first = players[:, 0] == 1
+    counts = board_np[:, :2].sum(axis=2)
+    for offset, side in ((0, is_first), (3, ~is_first)):
+        left = np.where(side, to_place[1], to_place[-1])
+        placing = left > 0
+        jumping = ~placing & (counts[:, offset // 3] == 3)
+        global_np[:, offset] = placing
+        global_np[:, offset + 1] = ~placing & ~jumping
+        global_np[:, offset + 2] = jumping
+        global_np[:, 6 + offset // 3] = left / 9.0
+        global_np[:, 8 + offset // 3] = jumping
+    global_np[:, 10] = removal_pending
+
+    return board_tensor, global_features
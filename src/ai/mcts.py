@@ -0,0 +1,327 @@
+"""AlphaZero-style Monte Carlo tree search on top of ThePolicy.
+
+The tree follows the actions of the policy network: a turn that forms a mill
+is split into the move and a removal node where the same player picks the
+piece to remove. Priors are the softmax of the legal policy logits and leaves
+are scored by the value head, from the view of the player to move.
+
+Leaves are evaluated in batches. While a batch is collected, every edge on a
+selected path carries a virtual loss so the following selections spread out
+over the tree instead of queueing the same leaf again.
+
+    agent = MCTSAgent(model, simulations=400, time_limit=2.0)
+    from_idx, to_idx, remove_idx = agent.get_complete_move(game)
+"""
+
+import time
+from typing import Optional
+
+import numpy as np
+import torch
+
+from muehle_game import Muehle
+from muehle_game.game import Turn
+from muehle_game.tablebase import Tablebase
+
+from .book import OpeningBook
+from .helper import allocate_encoding, encode_into
+from .policy import ThePolicy
+from .train import ActionMapper
+
+PLACE_SOURCE = ActionMapper.NUM_SOURCES - 1
+
+
+class Node:
+    """A position in the search tree with the statistics of its edges.
+
+    The edge arrays are aligned with actions. value_sums are from the view of
+    the player of the node.
+    """
+
+    __slots__ = (
+        "player",
+        "removal",
+        "terminal",
+        "actions",
+        "priors",
+        "visits",
+        "value_sums",
+        "children",
+        "pending",
+    )
+
+    def __init__(self, player: int, removal: bool, terminal: Optional[float] = None):
+        self.player = player
+        self.removal = removal
+        self.terminal = terminal
+        "Game result from the view of player if the game is over."
+        self.actions: Optional[np.ndarray] = None
+        self.priors: Optional[np.ndarray] = None
+        self.visits: Optional[np.ndarray] = None
+        self.value_sums: Optional[np.ndarray] = None
+        self.children: list[Optional["Node"]] = []
+        self.pending = False
+        "Queued for evaluation in the current batch."
+
+    @property
+    def expanded(self) -> bool:
+        return self.actions is not None
+
+    def expand(self, actions: np.ndarray, logits: np.ndarray):
+        """Adds the edges of the legal actions with softmax priors of logits."""
+        logits = logits[actions].astype(np.float64)
+        priors = np.exp(logits - logits.max())
+        self.actions = actions
+        self.priors = priors / priors.sum()
+        self.visits = np.zeros(len(actions))
+        self.value_sums = np.zeros(len(actions))
+        self.children = [None] * len(actions)
+
+    def select(self, c_puct: float) -> int:
+        """Index of the edge with the highest PUCT score."""
+        visits = self.visits
+        q = np.divide(
+            self.value_sums, visits, out=np.zeros(len(visits)), where=visits > 0
+        )
+        u = c_puct * self.priors * (np.sqrt(max(visits.sum(), 1.0)) / (1.0 + visits))
+        return int(np.argmax(q + u))
+
+    def best(self) -> int:
+        """Index of the most visited edge, ties are broken by the prior."""
+        return int(np.lexsort((self.priors, self.visits))[-1])
+
+
+class MCTSAgent:
+    """Plays complete turns chosen by a PUCT search with ThePolicy.
+
+    A drop-in for SelfPlayAgent.get_complete_move. The search stops after
+    simulations leaf evaluations or after time_limit seconds, whichever comes
+    first.
+    """
+
+    def __init__(
+        self,
+        model: ThePolicy,
+        simulations: Optional[int] = 200,
+        time_limit: Optional[float] = None,
+        batch_size: int = 16,
+        c_puct: float = 1.5,
+        virtual_loss: float = 1.0,
+        device: torch.device | None = None,
+        book: Optional[OpeningBook] = None,
+        tablebase: Optional[Tablebase] = None,
+    ):
+        """Initializes the MCTSAgent.
+
+        Args:
+            model: The network, its value head scores the leaves.
+            simulations: Simulations per turn, None for no limit.
+            time_limit: Seconds per turn, None for no limit.
+            batch_size: Leaves evaluated per forward pass.
+            c_puct: Weight of the prior against the mean value.
+            virtual_loss: Loss added to the edges of a path while its leaf
+                waits for evaluation.
+            device: The torch device to run the model on, CPU by default.
+            book: Opening book whose turns are played without a search.
+            tablebase: Endgame tables whose best turns are played without a
+                search.
+        """
+        if not isinstance(model, ThePolicy):
+            raise TypeError(
+                "MCTS needs the value head of ThePolicy, exported policies "
+                "(see ai.export) have none"
+            )
+        if simulations is None and time_limit is None:
+            raise ValueError("Set simulations, time_limit or both")
+        self.device = device or torch.device("cpu")
+        self.model = model.to(self.device).eval()
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.book = book
+        self.tablebase = tablebase
+        self._encoding = allocate_encoding(batch_size)
+        self.stats: dict = {}
+        "Numbers of the last search: simulations, batches, collisions, seconds."
+
+    def get_complete_move(self, game: Muehle) -> Turn:
+        """Searches the position and returns the turn (from_idx, to_idx, remove_idx).
+
+        The game is left unchanged.
+        """
+        turns = list(game.generate_turns())
+        if len(turns) <= 1:
+            return turns[0] if turns else (None, None, None)
+        if self.book is not None:
+            turn = self.book.lookup(game)
+            if turn is not None:
+                return turn
+        if self.tablebase is not None:
+            turn = self.tablebase.best_turn(game)
+            if turn is not None:
+                return turn
+
+        root = self.search(game)
+        move = root.best()
+        source, target = ActionMapper.from_index(int(root.actions[move]))
+        from_idx = None if source == PLACE_SOURCE else source
+        child = root.children[move]
+        if child is None or not child.removal:
+            return from_idx, target, None
+
+        if not child.expanded:
+            game.push((from_idx, target, None))
+            try:
+                self._evaluate([(child, [], self._legal_actions(game, child))], [game])
+            finally:
+                game.pop()
+        _, remove_idx = ActionMapper.from_index(int(child.actions[child.best()]))
+        return from_idx, target, remove_idx
+
+    def search(self, game: Muehle) -> Node:
+        """Runs the search from the position of game and returns the root."""
+        start = time.perf_counter()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        root = Node(game.player, False)
+        self._evaluate([(root, [], self._legal_actions(game, root))], [game])
+
+        stats = {"simulations": 0, "batches": 0, "collisions": 0}
+        while self.simulations is None or stats["simulations"] < self.simulations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            room = self.batch_size
+            if self.simulations is not None:
+                room = min(room, self.simulations - stats["simulations"])
+            leaves = []
+            for _ in range(room):
+                leaf = self._descend(root, game, len(leaves))
+                if leaf is None:
+                    stats["collisions"] += 1
+                    break
+                if leaf[0].terminal is not None:
+                    node, path, _ = leaf
+                    self._backup(path, node.player, node.terminal, self.virtual_loss)
+                    stats["simulations"] += 1
+                else:
+                    leaves.append(leaf)
+            if leaves:
+                self._evaluate(leaves)
+                stats["simulations"] += len(leaves)
+                stats["batches"] += 1
+        stats["seconds"] = time.perf_counter() - start
+        self.stats = stats
+        return root
+
+    def _descend(self, root: Node, game: Muehle, row: int):
+        """Selects one leaf below root and encodes it into row of the batch.
+
+        Returns:
+            (leaf, path, legal actions) with the virtual loss applied along the
+            path of (node, edge) pairs, or None if the leaf is already queued.
+        """
+        node = root
+        path = []
+        pushed = 0
+        pending = None
+        try:
+            while node.expanded and node.terminal is None:
+                edge = node.select(self.c_puct)
+                node.visits[edge] += self.virtual_loss
+                node.value_sums[edge] -= self.virtual_loss
+                path.append((node, edge))
+                source, target = ActionMapper.from_index(int(node.actions[edge]))
+
+                if node.removal:
+                    game.pop()
+                    result = game.push((*pending, target))
+                    pending = None
+                else:
+                    pending = (None if source == PLACE_SOURCE else source, target)
+                    result = game.push((*pending, None))
+                    pushed += 1
+
+                child = node.children[edge]
+                if child is None:
+                    child = self._child(game, node, result)
+                    node.children[edge] = child
+                node = child
+
+            if node.terminal is not None:
+                return node, path, None
+            if node.pending:
+                self._revert(path)
+                return None
+            legal = self._legal_actions(game, node)
+            if len(legal) == 0:
+                node.terminal = 0.0
+                return node, path, None
+            node.pending = True
+            encode_into(
+                game,
+                node.player,
+                node.removal,
+                tuple(t[row : row + 1] for t in self._encoding),
+            )
+            return node, path, legal
+        finally:
+            for _ in range(pushed):
+                game.pop()
+
+    @staticmethod
+    def _child(game: Muehle, parent: Node, result: str) -> Node:
+        if result == "remove":
+            return Node(parent.player, True)
+        player = -parent.player
+        if not game.is_terminal():
+            return Node(player, False)
+        return Node(player, False, terminal=float(game.done() * player))
+
+    @staticmethod
+    def _legal_actions(game: Muehle, node: Node) -> np.ndarray:
+        return np.flatnonzero(
+            ActionMapper.get_legal_mask(game, node.player, node.removal)
+        )
+
+    def _evaluate(self, leaves: list, games: Optional[list[Muehle]] = None):
+        """Expands leaves with one forward pass and backs up their values.
+
+        Args:
+            leaves: (node, path, legal actions) from _descend.
+            games: Positions of the leaves to encode, if _descend did not.
+        """
+        n = len(leaves)
+        boards, global_features = self._encoding
+        for row, game in enumerate(games or []):
+            node = leaves[row][0]
+            encode_into(
+                game,
+                node.player,
+                node.removal,
+                (boards[row : row + 1], global_features[row : row + 1]),
+            )
+        with torch.inference_mode():
+            logits, values = self.model(
+                boards[:n].to(self.device), global_features[:n].to(self.device)
+            )
+        logits = logits.cpu().numpy()
+        values = values.cpu().numpy()[:, 0]
+        for (node, path, legal), node_logits, value in zip(leaves, logits, values):
+            node.expand(legal, node_logits)
+            node.pending = False
+            self._backup(path, node.player, float(value), self.virtual_loss)
+
+    @staticmethod
+    def _backup(path: list, player: int, value: float, virtual_loss: float = 0.0):
+        """Adds value, seen by player, to the edges of path and lifts the virtual loss."""
+        for node, edge in path:
+            node.visits[edge] += 1.0 - virtual_loss
+            node.value_sums[edge] += (
+                value if node.player == player else -value
+            ) + virtual_loss
+
+    def _revert(self, path: list):
+        for node, edge in path:
+            node.visits[edge] -= self.virtual_loss
+            node.value_sums[edge] += self.virtual_loss
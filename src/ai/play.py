@@ -6,6 +6,7 @@ import torch
 from muehle_game import Muehle, Phase
 from muhle_renderer import MUEHLE_INDEX_MAP, calc_coords_muhle
 
+from .export import is_exported, load_policy, load_state_dict
 from .policy import ThePolicy
 from .train import SelfPlayAgent
 
@@ -13,16 +14,26 @@ from .train import SelfPlayAgent
 def load_model(path: Path):
     """Loads a trained model for gameplay.
 
+    Exported policies (TorchScript or .onnx ONNX, see ai.export.is_exported)
+    run on the CPU without the value head, anything else, also a state dict
+    saved as .pt, is loaded into ThePolicy.
+    The agent is warmed up for inference before it is returned.
+
     Args:
-        path: The path to the saved model state dictionary.
+        path: The path to the saved model state dictionary, a training checkpoint
+              or an exported policy.
 
     Returns:
         A SelfPlayAgent initialized with the loaded model.
     """
-    model = ThePolicy()
-    state_dict = torch.load(path, map_location="cpu")
-    model.load_state_dict(state_dict)
-    return SelfPlayAgent(model)
+    if is_exported(path):
+        agent = SelfPlayAgent(load_policy(path), torch.device("cpu"))
+    else:
+        model = ThePolicy()
+        model.load_state_dict(load_state_dict(path))
+        agent = SelfPlayAgent(model)
+    agent.prepare_inference()
+    return agent
 
 
 def play_game():
@@ -43,6 +43,27 @@ class ThePolicy(nn.Module):
             - value: The predicted value of the current game state, between -1 and 1.
         """
 
+        x = self._trunk(board, global_features)
+
+        policy_logits = self.policy_head(x)
+        v = F.relu(self.value_fc(x))
+        value = torch.tanh(self.value_head(v))
+
+        return policy_logits, value
+
+    def policy(self, board, global_features):
+        """Computes only the policy logits, without the value head.
+
+        Args:
+            board: A tensor of shape (batch, 3, 24) representing the board state.
+            global_features: A tensor of shape (batch, 11) with global game features.
+
+        Returns:
+            The raw logits for each possible action.
+        """
+        return self.policy_head(self._trunk(board, global_features))
+
+    def _trunk(self, board, global_features):
         x_board = torch.flatten(board, start_dim=1)
         x_board = F.relu(self.in_board_fc(x_board))
 
@@ -51,13 +72,4 @@ class ThePolicy(nn.Module):
         x = torch.cat([x_board, x_global], dim=-1)
 
         x = F.relu(self.fc1(x))
-        x = F.relu(self.fc2(x))
-
-        policy_logits = self.policy_head(x)
-        if True:
-            v = F.relu(self.value_fc(x))
-            value = torch.tanh(self.value_head(v))
-
-            return policy_logits, value
-        else:
-            return policy_logits
+        return F.relu(self.fc2(x))
@@ -0,0 +1,212 @@
+"""Lazy-SMP alpha-beta search on several CPU cores.
+
+Helper processes run the same iterative-deepening search as the agent in
+the calling process, on the same position and with the same time budget. All
+searches read and write one transposition table in shared memory, so a
+helper that finishes a subtree first saves the others from searching it. Odd
+helpers start one ply deeper, which spreads the searches over different
+depths. The turn of the deepest finished iteration is played.
+
+    with ParallelAlphaBetaAgent(model, workers=3, time_limit=2.0) as agent:
+        from_idx, to_idx, remove_idx = agent.get_complete_move(game)
+
+Only the search in the calling process orders turns with the policy, the
+helpers use the killer and history heuristics. With a table_file all
+processes map the same table file, which then also keeps the results for
+later turns, games and runs.
+"""
+
+import multiprocessing as mp
+import traceback
+from pathlib import Path
+from typing import Optional
+
+from muehle_game import Muehle
+from muehle_game.game import Turn
+from muehle_game.tablebase import Tablebase
+
+from .alphabeta import AlphaBetaAgent
+from .book import OpeningBook
+from .export import PolicyBackend
+from .policy import ThePolicy
+from .ttable import TranspositionTable, table_bytes
+
+
+def _helper_loop(
+    conn,
+    table_file: Optional[Path],
+    buffer,
+    table_size: int,
+    first_depth: int,
+    max_depth: int,
+):
+    """Searches the (game, time_limit) tasks from conn until it receives None."""
+    if table_file is not None:
+        table = TranspositionTable.open(table_file)
+    else:
+        table = TranspositionTable(table_size, buffer)
+    agent = AlphaBetaAgent(
+        None, max_depth=max_depth, table=table, first_depth=first_depth
+    )
+    conn.send("ready")
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        game, time_limit = task
+        agent.time_limit = time_limit
+        try:
+            turn, score = agent.search(game)
+            conn.send((agent.stats["depth"], score, turn, agent.stats["nodes"]))
+        except Exception:
+            conn.send(RuntimeError(traceback.format_exc()))
+
+
+class ParallelAlphaBetaAgent:
+    """AlphaBetaAgent that searches with helper processes, see the module docstring.
+
+    A drop-in for SelfPlayAgent.get_complete_move. Call close() or use it as
+    a context manager to stop the helpers.
+    """
+
+    def __init__(
+        self,
+        model: ThePolicy | PolicyBackend | None = None,
+        workers: int = 3,
+        time_limit: float = 1.0,
+        max_depth: int = 64,
+        table_size: int = 1 << 20,
+        policy_depth: int = 3,
+        table_file: str | Path | None = None,
+        book: Optional[OpeningBook] = None,
+        tablebase: Optional[Tablebase] = None,
+    ):
+        """Initializes the agent and starts the helpers.
+
+        Args:
+            model: Policy whose logits order the turns, None for no policy.
+            workers: Number of helper processes.
+            time_limit: Seconds per turn.
+            max_depth: Deepest iteration in plies.
+            table_size: Slots of the shared transposition table.
+            policy_depth: See AlphaBetaAgent.
+            table_file: Keep the table in this file (see
+                TranspositionTable.open) instead of anonymous shared memory.
+            book: Opening book whose turns are played without a search.
+            tablebase: Endgame tables whose best turns are played without a
+                search.
+        """
+        ctx = mp.get_context("spawn")
+        if table_file is not None:
+            table_file = Path(table_file)
+            self._buffer = None
+            table = TranspositionTable.open(table_file, table_size)
+        else:
+            self._buffer = ctx.RawArray("B", table_bytes(table_size))
+            table = TranspositionTable(table_size, self._buffer)
+        self.agent = AlphaBetaAgent(
+            model,
+            time_limit=time_limit,
+            max_depth=max_depth,
+            policy_depth=policy_depth,
+            table=table,
+            book=book,
+            tablebase=tablebase,
+        )
+        self._conns = []
+        self._processes = []
+        for worker_id in range(workers):
+            conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_helper_loop,
+                args=(
+                    child_conn,
+                    table_file,
+                    self._buffer,
+                    table_size,
+                    1 + worker_id % 2,
+                    max_depth,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+        # the helpers import torch on start, wait so the first turn keeps its budget
+        for conn in self._conns:
+            conn.recv()
+        self.stats: dict = {}
+        "Numbers of the last search: depth, score, nodes, seconds, helper_depths."
+
+    @property
+    def time_limit(self) -> float:
+        return self.agent.time_limit
+
+    @time_limit.setter
+    def time_limit(self, value: float):
+        self.agent.time_limit = value
+
+    def get_complete_move(self, game: Muehle) -> Turn:
+        """Searches the position and returns the turn (from_idx, to_idx, remove_idx).
+
+        The game is left unchanged.
+        """
+        turns = list(game.generate_turns())
+        if len(turns) <= 1:
+            return turns[0] if turns else (None, None, None)
+        if self.agent.book is not None:
+            turn = self.agent.book.lookup(game)
+            if turn is not None:
+                return turn
+        if self.agent.tablebase is not None:
+            turn = self.agent.tablebase.best_turn(game)
+            if turn is not None:
+                return turn
+        return self.search(game)[0]
+
+    def search(self, game: Muehle) -> tuple[Turn, int]:
+        """Searches with all helpers and returns the best turn and its score."""
+        for conn in self._conns:
+            conn.send((game, self.agent.time_limit))
+        best, score = self.agent.search(game)
+        depth, nodes = self.agent.stats["depth"], self.agent.stats["nodes"]
+        helper_depths = []
+        for conn in self._conns:
+            result = conn.recv()
+            if isinstance(result, Exception):
+                raise result
+            helper_depth, helper_score, helper_turn, helper_nodes = result
+            helper_depths.append(helper_depth)
+            nodes += helper_nodes
+            if helper_depth > depth:
+                best, score, depth = helper_turn, helper_score, helper_depth
+        self.stats = dict(
+            self.agent.stats,
+            depth=depth,
+            score=score,
+            nodes=nodes,
+            helper_depths=helper_depths,
+        )
+        return best, score
+
+    def close(self):
+        """Stops the helper processes and flushes a table file."""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns = []
+        self._processes = []
+        self.agent.table.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
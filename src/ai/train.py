@@ -1,7 +1,7 @@
-import copy
 import random
 from collections import deque
-from typing import List, Optional, cast
+from pathlib import Path
+from typing import Generator, List, Optional, cast
 
 import numpy as np
 import torch
@@ -11,8 +11,29 @@ from torch.distributions import Categorical
 from typing_extensions import Literal
 
 from muehle_game import Muehle, Phase
-
-from .helper import encode_data
+from muehle_game.batch import (
+    EDGE_ACTIONS,
+    EDGE_SOURCES,
+    EDGE_TARGETS,
+    PLACE_ACTIONS,
+    legal_masks,
+)
+from muehle_game.bitboard import FULL, to_bool
+from muehle_game.game import REPETITION_LIMIT
+from muehle_game.tablebase import Tablebase
+
+from .actors import ActorPool
+from .book import OpeningBook
+from .buffer import RolloutBuffer
+from .checkpoint import (
+    CheckpointWriter,
+    latest_checkpoint,
+    load_checkpoint,
+    rng_state,
+    set_rng_state,
+)
+from .export import PolicyBackend
+from .helper import allocate_encoding, encode_data, encode_into
 from .policy import ThePolicy
 
 
@@ -64,54 +85,113 @@ class ActionMapper:
             A boolean numpy array of size TOTAL_ACTIONS, where True indicates a legal move.
         """
         mask = np.zeros(ActionMapper.TOTAL_ACTIONS, dtype=bool)
-        board = env.board
 
         if removal_pending:
-            for target in range(24):
-                if env.can_remove(target, player):
-                    idx = ActionMapper.to_index(24, target)
-                    mask[idx] = True
+            mask[PLACE_ACTIONS] = to_bool(env.removable(player))
             return mask
 
+        own = env.bits[player]
+        empty = FULL ^ (own | env.bits[-player])
         phase = env.phase(player)
 
         if phase == Phase.PLACING:
-            for target in range(24):
-                if board[target] == 0:
-                    idx = ActionMapper.to_index(24, target)
-                    mask[idx] = True
+            mask[PLACE_ACTIONS] = to_bool(empty)
         elif phase == Phase.MOVING:
-            for source in range(24):
-                if board[source] == player:
-                    for target in env.vm.get(source, []):
-                        if board[target] == 0:
-                            idx = ActionMapper.to_index(source, target)
-                            mask[idx] = True
+            own_cells = to_bool(own)
+            empty_cells = to_bool(empty)
+            mask[EDGE_ACTIONS] = own_cells[EDGE_SOURCES] & empty_cells[EDGE_TARGETS]
         elif phase == Phase.JUMPING:
-            for source in range(24):
-                if board[source] == player:
-                    for target in range(24):
-                        if board[target] == 0:
-                            idx = ActionMapper.to_index(source, target)
-                            mask[idx] = True
+            jumps = np.outer(to_bool(own), to_bool(empty))
+            num_moves = (ActionMapper.NUM_SOURCES - 1) * ActionMapper.NUM_TARGETS
+            mask[:num_moves] = jumps.ravel()
         return mask
 
+    @staticmethod
+    def get_legal_masks(
+        boards: np.ndarray,
+        to_place: dict[int, np.ndarray],
+        players: np.ndarray,
+        removal_pending: np.ndarray,
+    ) -> np.ndarray:
+        """Create the legal action masks of a batch of positions.
+
+        Args:
+            boards: A (N, 24) int8 array of boards.
+            to_place: The (N,) pieces left to place for player 1 and -1.
+            players: The (N,) players for whom to get the legal moves.
+            removal_pending: A (N,) boolean array, True if a piece removal is pending.
+
+        Returns:
+            A boolean numpy array of shape (N, TOTAL_ACTIONS), see get_legal_mask.
+        """
+        return legal_masks(
+            np.asarray(boards),
+            to_place,
+            np.asarray(players),
+            np.asarray(removal_pending, dtype=bool),
+        )
+
 
 class SelfPlayAgent:
     """Agent that plays using the policy network with exploration."""
 
-    def __init__(self, model: ThePolicy, device: torch.device | None = None):
+    def __init__(
+        self,
+        model: ThePolicy | PolicyBackend,
+        device: torch.device | None = None,
+        tablebase: Optional[Tablebase] = None,
+        book: Optional[OpeningBook] = None,
+    ):
         """Initializes the SelfPlayAgent.
 
         Args:
-            model: The policy network to use for action selection.
+            model: The policy network to use for action selection. An exported
+                   policy (see ai.export.load_policy) only supports next_move
+                   and get_complete_move.
             device: The torch device (CPU or CUDA) to run the model on.
+            tablebase: Endgame tables, get_complete_move plays their best turn
+                       in the positions they cover.
+            book: Opening book, get_complete_move plays its turns in the
+                  positions it holds.
         """
         self.model = model
+        self.tablebase = tablebase
+        self.book = book
         self.device = device or torch.device(
             "cuda" if torch.cuda.is_available() else "cpu"
         )
-        self.model.to(self.device)
+        if isinstance(model, torch.nn.Module):
+            self.model.to(self.device)
+        self._policy: Optional[PolicyBackend] = None
+        self._encoding = allocate_encoding(1)
+
+    def prepare_inference(self, warmup: int = 3):
+        """Switches the model to play-only inference and warms it up.
+
+        next_move calls this on first use. Call it at load time to move the
+        one-off cost of the first forward passes out of the first move.
+
+        Args:
+            warmup: Number of forward passes on the start position.
+        """
+        if isinstance(self.model, ThePolicy):
+            self.model.eval()
+            self._policy = self.model.policy
+        else:
+            self._policy = self.model
+        game = Muehle()
+        for _ in range(warmup):
+            self._policy_logits(game, False)
+
+    def _policy_logits(self, game: Muehle, removal_pending: bool) -> np.ndarray:
+        board_tensor, global_features = encode_into(
+            game, game.player, removal_pending, self._encoding
+        )
+        with torch.inference_mode():
+            policy_logits = self._policy(
+                board_tensor.to(self.device), global_features.to(self.device)
+            )
+        return policy_logits[0].cpu().numpy()
 
     def select_action(
         self,
@@ -163,12 +243,67 @@ class SelfPlayAgent:
 
         return action_idx, policy_logits.squeeze(0), value.squeeze(0)
 
+    def select_actions(
+        self,
+        board_batch: torch.Tensor,
+        global_batch: torch.Tensor,
+        legal_mask_batch: np.ndarray,
+        temperature: float = 1.0,
+        epsilon: float = 0.1,
+    ) -> tuple[list[int], torch.Tensor, torch.Tensor]:
+        """Batched select_action: one forward pass for N positions.
+
+        Every position independently picks a uniformly random legal action
+        with probability epsilon and otherwise samples from the masked softmax
+        scaled by temperature.
+
+        Args:
+            board_batch: (N, 3, 24) encoded boards.
+            global_batch: (N, 11) encoded global features.
+            legal_mask_batch: (N, 600) boolean masks of legal actions.
+            temperature: Controls the randomness of action selection.
+            epsilon: The probability of choosing a random action.
+
+        Returns:
+            A tuple containing:
+            - The N selected action indices.
+            - The (N, 600) raw policy logits, on the CPU.
+            - The (N, 1) predicted state values, on the CPU.
+        """
+        board_batch = board_batch.to(self.device)
+        global_batch = global_batch.to(self.device)
+
+        with torch.no_grad():
+            self.model.eval()
+            policy_logits, values = self.model(board_batch, global_batch)
+
+        legal = torch.from_numpy(np.asarray(legal_mask_batch, dtype=bool)).to(
+            self.device
+        )
+        if not legal.any(dim=1).all():
+            raise RuntimeError("No legal moves available for action selection.")
+
+        masked_logits = policy_logits.masked_fill(~legal, -1e9)
+        probs = F.softmax(masked_logits / temperature, dim=-1)
+        explore = torch.tensor(
+            [random.random() < epsilon for _ in range(len(legal))],
+            device=self.device,
+        )
+        # exploring rows sample uniformly, multinomial takes unnormalized weights
+        weights = torch.where(explore[:, None], legal.float(), probs)
+        actions = torch.multinomial(weights, 1).squeeze(1)
+
+        return actions.tolist(), policy_logits.cpu(), values.cpu()
+
     def next_move(
         self, game: Muehle, removal_pending: bool = False
     ) -> tuple[Optional[int], Optional[int], Optional[int]]:
         """
         Determines the next best move for the agent given the current game state.
 
+        Picks the legal action with the highest policy logit, the value head is
+        not evaluated and a forced action skips the network.
+
         Args:
             game: The current Muehle game instance.
             removal_pending: True if the current action is to remove an opponent's piece.
@@ -176,29 +311,19 @@ class SelfPlayAgent:
         Returns:
             A tuple (from_idx, to_idx, remove_idx) describing a single action.
         """
-        current_player = game.player
-        board_tensor, global_features = encode_data(
-            game, current_player, removal_pending
+        legal = np.flatnonzero(
+            ActionMapper.get_legal_mask(game, game.player, removal_pending)
         )
-        legal_mask = ActionMapper.get_legal_mask(game, current_player, removal_pending)
-
-        if not legal_mask.any():
+        if len(legal) == 0:
             return None, None, None
 
-        board_tensor_in = board_tensor.unsqueeze(0).to(self.device)
-        global_features_in = global_features.unsqueeze(0).to(self.device)
-
-        with torch.no_grad():
-            self.model.eval()
-            policy_logits, _ = self.model(board_tensor_in, global_features_in)
-
-        legal_mask_tensor = torch.tensor(
-            legal_mask, dtype=torch.bool, device=self.device
-        )
-        masked_logits = policy_logits.clone()
-        masked_logits[0, ~legal_mask_tensor] = -1e9
-
-        action_idx = torch.argmax(masked_logits).item()
+        if len(legal) == 1:
+            action_idx = int(legal[0])
+        else:
+            if self._policy is None:
+                self.prepare_inference(warmup=0)
+            policy_logits = self._policy_logits(game, removal_pending)
+            action_idx = int(legal[policy_logits[legal].argmax()])
         source, target = ActionMapper.from_index(action_idx)
 
         from_idx: Optional[int] = None
@@ -221,12 +346,24 @@ class SelfPlayAgent:
         """
         Computes a full turn, including a move and a subsequent removal if a mill is formed.
 
+        Positions in the opening book or covered by the tablebase are played
+        from them.
+
         Args:
             game: The current Muehle game instance.
 
         Returns:
             A tuple (from_idx, to_idx, remove_idx) for the complete turn.
         """
+        if self.book is not None:
+            turn = self.book.lookup(game)
+            if turn is not None:
+                return turn
+        if self.tablebase is not None:
+            turn = self.tablebase.best_turn(game)
+            if turn is not None:
+                return turn
+
         remove_idx: Optional[int] = None
 
         from_idx, to_idx, _ = self.next_move(game, removal_pending=False)
@@ -234,14 +371,16 @@ class SelfPlayAgent:
         if to_idx is None:
             return None, None, None
 
-        temp_game = copy.deepcopy(game)
         try:
-            result = temp_game.move(from_idx, to_idx)
+            result = game.push((from_idx, to_idx, None))
         except ValueError:
             return from_idx, to_idx, None
 
-        if result == "remove":
-            _, _, remove_idx = self.next_move(temp_game, removal_pending=True)
+        try:
+            if result == "remove":
+                _, _, remove_idx = self.next_move(game, removal_pending=True)
+        finally:
+            game.pop()
 
         return from_idx, to_idx, remove_idx
 
@@ -259,6 +398,13 @@ class SelfPlayTrainer:
         value_coef: float = 0.5,
         max_grad_norm: float = 0.5,
         device: torch.device | None = None,
+        no_capture_limit: int | None = 100,
+        algorithm: Literal["pg", "ppo"] = "pg",
+        ppo_epochs: int = 4,
+        minibatch_size: int = 256,
+        clip_range: float = 0.2,
+        target_kl: float | None = 0.02,
+        tablebase: str | Path | None = None,
     ):
         """Initializes the SelfPlayTrainer.
 
@@ -271,7 +417,21 @@ class SelfPlayTrainer:
             value_coef: The coefficient for the value loss in the loss function.
             max_grad_norm: The maximum norm for gradient clipping.
             device: The torch device (CPU or CUDA) to run the training on.
+            no_capture_limit: Self-play games are drawn after this many turns without
+                              a placement or removal, see Muehle.
+            algorithm: "pg" takes one policy gradient step over all collected steps,
+                       "ppo" runs several epochs of clipped PPO minibatch steps.
+            ppo_epochs: PPO passes over the collected steps per update.
+            minibatch_size: Steps per PPO optimizer step.
+            clip_range: PPO clips the probability ratio to [1 - clip_range, 1 + clip_range].
+            target_kl: PPO stops the update early once the approximate KL divergence
+                       to the collecting policy exceeds 1.5 * target_kl. None disables it.
+            tablebase: Directory of endgame tables (see muehle_game.tablebase).
+                       Self-play games that reach a covered position end with
+                       its result.
         """
+        if algorithm not in ("pg", "ppo"):
+            raise ValueError(f"Unknown algorithm {algorithm!r}")
         self.model = model
         self.device = device or torch.device(
             "cuda" if torch.cuda.is_available() else "cpu"
@@ -283,11 +443,20 @@ class SelfPlayTrainer:
         self.entropy_coef = entropy_coef
         self.value_coef = value_coef
         self.max_grad_norm = max_grad_norm
-        self.agent = SelfPlayAgent(model, self.device)
+        self.no_capture_limit = no_capture_limit
+        self.algorithm = algorithm
+        self.ppo_epochs = ppo_epochs
+        self.minibatch_size = minibatch_size
+        self.clip_range = clip_range
+        self.target_kl = target_kl
+        self.tablebase_dir = tablebase
+        self.tablebase = Tablebase(tablebase) if tablebase is not None else None
+        self.agent = SelfPlayAgent(model, self.device, self.tablebase)
+        self.buffer = RolloutBuffer()
 
     def collect_episode(
         self, temperature: float = 1.0, epsilon: float = 0.1
-    ) -> tuple[List[dict], int]:
+    ) -> tuple[RolloutBuffer, int]:
         """Play one full episode of self-play, collecting data for training.
 
         The agent plays against itself, and each step (state, action, reward, etc.)
@@ -299,11 +468,95 @@ class SelfPlayTrainer:
 
         Returns:
             A tuple containing:
-            - trajectory: A list of dictionaries, where each dictionary represents a step in the episode.
+            - trajectory: A RolloutBuffer holding the steps of the episode.
             - winner: The winner of the game (1, -1, or 0 for a draw).
         """
-        env = Muehle()
-        trajectory = []
+        episode = self._play_episode(temperature, epsilon)
+        try:
+            request = next(episode)
+            while True:
+                request = episode.send(
+                    self.agent.select_action(*request, temperature, epsilon)
+                )
+        except StopIteration as stop:
+            return stop.value
+
+    def collect_episodes(
+        self,
+        num_episodes: int,
+        num_games: int = 16,
+        temperature: float = 1.0,
+        epsilon: float = 0.1,
+    ) -> List[tuple[RolloutBuffer, int]]:
+        """Plays num_episodes episodes, num_games of them at the same time.
+
+        All games waiting for a move are evaluated in one forward pass, then
+        every game samples its action like collect_episode does. A new game
+        starts as soon as one ends, until num_episodes have been started.
+
+        Args:
+            num_episodes: Total number of episodes to play.
+            num_games: Maximum number of games played at the same time.
+            temperature: Controls the randomness of action selection.
+            epsilon: The probability of choosing a random action.
+
+        Returns:
+            A list of (trajectory, winner) tuples in the order the games ended.
+        """
+        finished = []
+        games = []
+        requests = []
+        started = 0
+
+        def start():
+            nonlocal started
+            while started < num_episodes and len(games) < num_games:
+                started += 1
+                episode = self._play_episode(temperature, epsilon)
+                games.append(episode)
+                requests.append(next(episode))
+
+        start()
+        while games:
+            boards, globals_, masks = zip(*requests)
+            actions, logits, values = self.agent.select_actions(
+                torch.stack(boards),
+                torch.stack(globals_),
+                np.stack(masks),
+                temperature,
+                epsilon,
+            )
+            running = []
+            requests = []
+            for g, episode in enumerate(games):
+                try:
+                    requests.append(episode.send((actions[g], logits[g], values[g])))
+                    running.append(episode)
+                except StopIteration as stop:
+                    finished.append(stop.value)
+            games = running
+            start()
+        return finished
+
+    def _play_episode(
+        self, temperature: float = 1.0, epsilon: float = 0.1
+    ) -> Generator[
+        tuple[torch.Tensor, torch.Tensor, np.ndarray],
+        tuple[int, torch.Tensor, torch.Tensor],
+        tuple[RolloutBuffer, int],
+    ]:
+        """The game loop of one episode as a coroutine.
+
+        Yields (board_tensor, global_features, legal_mask) whenever a move is
+        needed and expects the (action_idx, policy_logits, value) of
+        SelfPlayAgent.select_action back. Returns (trajectory, winner), every
+        step is written into the RolloutBuffer trajectory as it is played.
+
+        temperature and epsilon must be the ones the actions are sampled with,
+        the recorded log-probabilities are those of the sampling distribution.
+        """
+        env = Muehle(REPETITION_LIMIT, self.no_capture_limit)
+        trajectory = RolloutBuffer(256)
         removal_pending = False
         removal_player = None
         winner = 0
@@ -329,19 +582,25 @@ class SelfPlayTrainer:
                 env, current_player, removal_pending
             )
 
-            action_idx, policy_logits, value = self.agent.select_action(
-                board_tensor, global_features, legal_mask_np, temperature, epsilon
+            action_idx, policy_logits, value = yield (
+                board_tensor,
+                global_features,
+                legal_mask_np,
             )
 
-            step_data = {
-                "player": current_player,
-                "board_tensor": board_tensor.cpu(),
-                "global_features": global_features.cpu(),
-                "action_idx": action_idx,
-                "policy_logits": policy_logits.cpu(),
-                "value": value.cpu(),
-                "legal_mask": legal_mask_np,
-            }
+            step = trajectory.add_step(
+                current_player,
+                board_tensor.cpu().numpy(),
+                global_features.cpu().numpy(),
+                action_idx,
+                value.item(),
+                legal_mask_np,
+                _action_log_prob(
+                    policy_logits, legal_mask_np, action_idx, temperature, epsilon
+                ),
+                temperature=temperature,
+                epsilon=epsilon,
+            )
 
             try:
                 source, target = ActionMapper.from_index(action_idx)
@@ -384,89 +643,81 @@ class SelfPlayTrainer:
                         removal_pending = True
                         removal_player = current_player
 
-                step_data["reward"] = reward
-                trajectory.append(step_data)
+                trajectory.rewards[step] = reward
 
                 if env.is_terminal():
                     winner = env.done()
                     break
 
+                if self.tablebase is not None and not removal_pending:
+                    probe = self.tablebase.probe(env)
+                    if probe is not None:
+                        winner = probe.value * env.player
+                        break
+
             except ValueError:
                 winner = -current_player
-                step_data["reward"] = -5.0
-                trajectory.append(step_data)
+                trajectory.rewards[step] = -5.0
                 break
 
-        if trajectory:
+        if len(trajectory):
+            last = len(trajectory) - 1
             if winner != 0:
-                final_reward = 10.0 if trajectory[-1]["player"] == winner else -10.0
-                trajectory[-1]["reward"] += final_reward
+                final_reward = 10.0 if trajectory.players[last] == winner else -10.0
+                trajectory.rewards[last] += final_reward
             elif env._truce():
                 pass
+        trajectory.end_episode()
 
         return trajectory, winner
 
     def compute_advantages(
-        self, trajectory: List[dict]
+        self, trajectory: RolloutBuffer
     ) -> tuple[torch.Tensor, torch.Tensor]:
         """Computes the Generalized Advantage Estimation (GAE) and returns for a given trajectory.
 
         Args:
-            trajectory: A list of steps collected from an episode.
+            trajectory: A RolloutBuffer, GAE restarts at every episode boundary.
 
         Returns:
             A tuple containing:
             - advantages: A tensor of computed advantages for each step.
             - returns: A tensor of computed returns (discounted rewards) for each step.
         """
-        if not trajectory:
+        if len(trajectory) == 0:
             return torch.tensor([]), torch.tensor([])
 
-        rewards = torch.tensor(
-            [step["reward"] for step in trajectory], dtype=torch.float32
-        )
-        values = torch.stack([step["value"] for step in trajectory]).squeeze()
-
-        advantages = torch.zeros_like(rewards)
-        gae = 0
-        for t in reversed(range(len(rewards))):
-            next_value = values[t + 1] if t < len(rewards) - 1 else 0.0
-            delta = rewards[t] + self.gamma * next_value - values[t]
-            gae = delta + self.gamma * self.gae_lambda * gae
-            advantages[t] = gae
-
-        returns = advantages + values
+        advantages, returns = trajectory.compute_advantages(self.gamma, self.gae_lambda)
+        advantages = torch.from_numpy(advantages)
+        returns = torch.from_numpy(returns)
 
         advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
 
         return advantages, returns
 
-    def update_model(self, trajectory: List[dict]) -> dict:
+    def update_model(self, trajectory: RolloutBuffer) -> dict:
         """Updates the policy and value networks using the collected trajectory data.
 
-        This method computes the loss and performs a gradient descent step.
+        This method computes the loss and performs a gradient descent step, or
+        several PPO minibatch steps if the trainer uses the "ppo" algorithm.
 
         Args:
-            trajectory: A list of steps collected from one or more episodes.
+            trajectory: A RolloutBuffer with one or more episodes, such as
+                        the trajectory of collect_episode.
 
         Returns:
             A dictionary containing information about the losses (total, policy, value) and entropy.
         """
-        if not trajectory:
+        if len(trajectory) == 0:
             return {}
+        if self.algorithm == "ppo":
+            return self._ppo_update(trajectory)
 
-        board_batch = torch.stack([step["board_tensor"] for step in trajectory]).to(
-            self.device
-        )
-        global_batch = torch.stack([step["global_features"] for step in trajectory]).to(
-            self.device
-        )
-        actions = torch.tensor(
-            [step["action_idx"] for step in trajectory], dtype=torch.long
-        ).to(self.device)
-        legal_mask_batch = torch.stack(
-            [torch.tensor(step["legal_mask"], dtype=torch.bool) for step in trajectory]
-        ).to(self.device)
+        batch = trajectory.tensors(self.device)
+        board_batch = batch["board_tensor"]
+        global_batch = batch["global_features"]
+        actions = batch["action_idx"]
+        legal_mask_batch = batch["legal_mask"]
 
         advantages, returns = self.compute_advantages(trajectory)
         advantages = advantages.to(self.device)
@@ -501,6 +752,114 @@ class SelfPlayTrainer:
             "entropy": entropy.item(),
         }
 
+    def _ppo_update(self, buffer: RolloutBuffer) -> dict:
+        """Clipped PPO over ppo_epochs shuffled passes of minibatches.
+
+        The ratio is taken against the log-probabilities stored while the
+        steps were collected. Steps without one (NaN) use the model before
+        the update instead. Both log-probabilities are those of the sampling
+        distribution, with the temperature and epsilon of every step.
+        """
+        batch = buffer.tensors(self.device)
+        board_batch = batch["board_tensor"]
+        global_batch = batch["global_features"]
+        actions = batch["action_idx"]
+        legal_mask_batch = batch["legal_mask"]
+        old_log_probs = batch["log_prob"].clone()
+        temperatures = batch["temperature"]
+        epsilons = batch["epsilon"]
+
+        advantages, returns = self.compute_advantages(buffer)
+        advantages = advantages.to(self.device)
+        returns = returns.to(self.device)
+
+        missing = torch.isnan(old_log_probs)
+        if missing.any():
+            with torch.no_grad():
+                self.model.eval()
+                logits, _ = self.model(board_batch[missing], global_batch[missing])
+                logits = logits.masked_fill(~legal_mask_batch[missing], -1e9)
+                old_log_probs[missing] = _sampling_log_probs(
+                    logits,
+                    legal_mask_batch[missing],
+                    actions[missing],
+                    temperatures[missing],
+                    epsilons[missing],
+                )
+
+        self.model.train()
+        n = len(buffer)
+        stats = {
+            "total_loss": 0.0,
+            "policy_loss": 0.0,
+            "value_loss": 0.0,
+            "entropy": 0.0,
+            "approx_kl": 0.0,
+            "clip_fraction": 0.0,
+        }
+        updates = 0
+        epochs = 0
+        stop = False
+        for _ in range(self.ppo_epochs):
+            epochs += 1
+            order = torch.randperm(n, device=self.device)
+            for start in range(0, n, self.minibatch_size):
+                idx = order[start : start + self.minibatch_size]
+
+                policy_logits, values = self.model(board_batch[idx], global_batch[idx])
+                masked_logits = policy_logits.masked_fill(~legal_mask_batch[idx], -1e9)
+                log_probs = F.log_softmax(masked_logits, dim=-1)
+                action_log_probs = _sampling_log_probs(
+                    masked_logits,
+                    legal_mask_batch[idx],
+                    actions[idx],
+                    temperatures[idx],
+                    epsilons[idx],
+                )
+                log_ratio = action_log_probs - old_log_probs[idx]
+                ratio = log_ratio.exp()
+
+                adv = advantages[idx]
+                clipped = ratio.clamp(1 - self.clip_range, 1 + self.clip_range)
+                policy_loss = -torch.min(ratio * adv, clipped * adv).mean()
+                value_loss = F.mse_loss(values.squeeze(1), returns[idx])
+                entropy = -(log_probs.exp() * log_probs).sum(dim=-1).mean()
+                loss = (
+                    policy_loss
+                    + self.value_coef * value_loss
+                    - self.entropy_coef * entropy
+                )
+
+                self.optimizer.zero_grad()
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(
+                    self.model.parameters(), self.max_grad_norm
+                )
+                self.optimizer.step()
+
+                with torch.no_grad():
+                    approx_kl = ((ratio - 1) - log_ratio).mean().item()
+                    clip_fraction = ((ratio - 1).abs() > self.clip_range).float()
+                updates += 1
+                stats["total_loss"] += loss.item()
+                stats["policy_loss"] += policy_loss.item()
+                stats["value_loss"] += value_loss.item()
+                stats["entropy"] += entropy.item()
+                stats["approx_kl"] += approx_kl
+                stats["clip_fraction"] += clip_fraction.mean().item()
+
+                if self.target_kl is not None and approx_kl > 1.5 * self.target_kl:
+                    stop = True
+                    break
+            if stop:
+                break
+
+        info = {key: value / updates for key, value in stats.items()}
+        info["epochs"] = epochs
+        info["updates"] = updates
+        info["early_stop"] = stop
+        return info
+
     def train(
         self,
         num_episodes: int = 10000,
@@ -509,10 +868,22 @@ class SelfPlayTrainer:
         epsilon: float = 0.1,
         save_every: int = 100,
         save_path: str = "policy_checkpoint.pth",
+        num_actors: int = 0,
+        actor_threads: int = 1,
+        num_games: int = 1,
+        resume_from: str | Path | None = None,
+        keep_checkpoints: int = 3,
+        keep_every: int | None = None,
     ):
         """Runs the main training loop for a specified number of episodes.
 
         It collects self-play episodes, updates the model periodically, and saves checkpoints.
+        Checkpoints are written in the background as save_path with the episode
+        appended (policy_checkpoint-0000500.pth) and hold everything needed to
+        continue the run with resume_from.
+        With num_actors > 0 the episodes are played by an ActorPool of worker
+        processes, which receive the new weights after every update. Otherwise
+        num_games > 1 plays that many games at once with collect_episodes.
 
         Args:
             num_episodes: The total number of episodes to train for.
@@ -520,22 +891,105 @@ class SelfPlayTrainer:
             temperature: The exploration temperature for action selection.
             epsilon: The exploration epsilon for action selection.
             save_every: The interval (in episodes) for saving model checkpoints.
-            save_path: The path to save model checkpoints.
+            save_path: The base path of the model checkpoints.
+            num_actors: Number of self-play worker processes, 0 plays in this process.
+            actor_threads: torch threads of every worker process.
+            num_games: Games played at the same time without actors.
+            resume_from: A checkpoint file, or a base path whose newest checkpoint
+                         is loaded. Training continues after its episode.
+            keep_checkpoints: Number of most recent checkpoints to keep.
+            keep_every: Also keep the checkpoints of every multiple of this episode.
         """
         print(f"Starting training on {self.device}")
         print(f"Total parameters: {sum(p.numel() for p in self.model.parameters()):,}")
 
+        start_episode = 1
         win_loss_draw = deque(maxlen=100)
-        all_trajectories = []
+        self.buffer.clear()
+        if resume_from is not None:
+            path = Path(resume_from)
+            if not path.is_file():
+                path = latest_checkpoint(path)
+                if path is None:
+                    raise FileNotFoundError(f"No checkpoint found for {resume_from}")
+            checkpoint = load_checkpoint(path, map_location=self.device)
+            start_episode = self.load_state_dict(checkpoint) + 1
+            win_loss_draw.extend(checkpoint.get("win_loss_draw", []))
+            print(f"Resumed from {path} at episode {start_episode - 1}")
+
+        pool = None
+        if num_actors > 0:
+            pool = ActorPool(
+                self.model,
+                num_actors,
+                torch_threads=actor_threads,
+                no_capture_limit=self.no_capture_limit,
+                tablebase=self.tablebase_dir,
+            )
+            print(f"Self-play on {num_actors} actors")
+        writer = CheckpointWriter(
+            save_path, keep_last=keep_checkpoints, keep_every=keep_every
+        )
+        try:
+            self._train_loop(
+                pool,
+                writer,
+                start_episode,
+                win_loss_draw,
+                num_episodes,
+                episodes_per_update,
+                temperature,
+                epsilon,
+                save_every,
+                num_games,
+            )
+        finally:
+            if pool is not None:
+                pool.close()
+            writer.close()
+
+        torch.save(self.model.state_dict(), "policy_final.pth")
+        print("Training complete! Model saved as 'policy_final.pth'")
 
-        for episode in range(1, num_episodes + 1):
-            trajectory, winner = self.collect_episode(temperature, epsilon)
-            all_trajectories.extend(trajectory)
+    def _train_loop(
+        self,
+        pool: Optional[ActorPool],
+        writer: CheckpointWriter,
+        start_episode: int,
+        win_loss_draw: deque,
+        num_episodes: int,
+        episodes_per_update: int,
+        temperature: float,
+        epsilon: float,
+        save_every: int,
+        num_games: int,
+    ):
+        ready: List[tuple[RolloutBuffer, int]] = []
+
+        for episode in range(start_episode, num_episodes + 1):
+            # episodes left until the next update, also after resuming mid-way
+            window = episodes_per_update - (episode - 1) % episodes_per_update
+            count = min(window, num_episodes - episode + 1)
+            if pool is None and num_games == 1:
+                trajectory, winner = self.collect_episode(temperature, epsilon)
+            elif pool is None:
+                if not ready:
+                    ready = self.collect_episodes(
+                        count, num_games, temperature, epsilon
+                    )
+                trajectory, winner = ready.pop(0)
+            else:
+                if pool.pending == 0:
+                    pool.request(count, temperature, epsilon)
+                trajectory, winner = pool.next_episode()
+            self.buffer.extend(trajectory)
             win_loss_draw.append(winner)
 
             if episode % episodes_per_update == 0:
-                loss_info = self.update_model(all_trajectories)
-                all_trajectories.clear()
+                loss_info = self.update_model(self.buffer)
+                self.buffer.clear()
+                if pool is not None:
+                    pool.broadcast(self.model)
 
                 p1_wins = np.mean([1 if r == 1 else 0 for r in win_loss_draw])
                 p2_wins = np.mean([1 if r == -1 else 0 for r in win_loss_draw])
@@ -548,18 +1002,72 @@ class SelfPlayTrainer:
                 )
 
             if episode % save_every == 0:
-                torch.save(
-                    {
-                        "episode": episode,
-                        "model_state_dict": self.model.state_dict(),
-                        "optimizer_state_dict": self.optimizer.state_dict(),
-                    },
-                    save_path,
-                )
-                print(f"Checkpoint saved at episode {episode}")
+                state = self.state_dict(episode)
+                state["win_loss_draw"] = list(win_loss_draw)
+                writer.save(episode, state)
+                print(f"Checkpoint queued at episode {episode}")
 
-        torch.save(self.model.state_dict(), "policy_final.pth")
-        print("Training complete! Model saved as 'policy_final.pth'")
+    def state_dict(self, episode: int) -> dict:
+        """Everything needed to continue training after episode.
+
+        Holds the model, optimizer, RNG states and the steps collected since
+        the last update.
+        """
+        return {
+            "episode": episode,
+            "model_state_dict": self.model.state_dict(),
+            "optimizer_state_dict": self.optimizer.state_dict(),
+            "rng_state": rng_state(),
+            "buffer": self.buffer.state_dict(),
+        }
+
+    def load_state_dict(self, state: dict) -> int:
+        """Restores a state_dict() and returns its episode."""
+        self.model.load_state_dict(state["model_state_dict"])
+        self.optimizer.load_state_dict(state["optimizer_state_dict"])
+        if "rng_state" in state:
+            set_rng_state(state["rng_state"])
+        if "buffer" in state:
+            self.buffer.load_state_dict(state["buffer"])
+        return state["episode"]
+
+
+def _action_log_prob(
+    policy_logits: torch.Tensor,
+    legal_mask: np.ndarray,
+    action_idx: int,
+    temperature: float = 1.0,
+    epsilon: float = 0.0,
+) -> float:
+    """Log-probability of action_idx under the distribution select_action samples."""
+    mask = torch.from_numpy(legal_mask)[None]
+    return _sampling_log_probs(
+        policy_logits.cpu()[None].masked_fill(~mask, -1e9),
+        mask,
+        torch.tensor([action_idx]),
+        torch.tensor([temperature]),
+        torch.tensor([epsilon]),
+    ).item()
+
+
+def _sampling_log_probs(
+    masked_logits: torch.Tensor,
+    legal_mask: torch.Tensor,
+    actions: torch.Tensor,
+    temperature: torch.Tensor,
+    epsilon: torch.Tensor,
+) -> torch.Tensor:
+    """Log-probabilities of actions under the distribution they were sampled from.
+
+    That is the masked softmax of the logits / temperature, mixed with a
+    uniform pick among the legal actions with probability epsilon, as in
+    SelfPlayAgent.select_action. All arguments are batched along the first
+    dimension, masked_logits has -1e9 at the illegal actions.
+    """
+    log_probs = F.log_softmax(masked_logits / temperature[:, None], dim=-1)
+    log_probs = log_probs.gather(1, actions[:, None]).squeeze(1)
+    uniform = torch.log(epsilon / legal_mask.sum(dim=1))
+    return torch.logaddexp(torch.log1p(-epsilon) + log_probs, uniform)
 
 
 def main():
@@ -573,6 +1081,7 @@ def main():
         entropy_coef=0.01,
         value_coef=0.5,
         max_grad_norm=0.5,
+        algorithm="ppo",
     )
     trainer.train(
         num_episodes=50000,
@@ -0,0 +1,205 @@
+"""Transposition table for the alpha-beta search.
+
+A fixed number of slots, indexed by the low bits of the 64 bit Zobrist hash
+of a position (Muehle.hash). Each slot holds the full key and one packed
+entry with the search depth, the bound type, the score, the best turn and
+the generation (search) that stored it. Slots come in buckets of two.
+
+The slots live in one (size, 2) uint64 array, so the table can be placed in
+any buffer that numpy can view, like shared memory for searches in several
+processes or a memory-mapped file (TranspositionTable.open) that keeps the
+results across turns, games and restarts. The first word of a slot is the key
+XOR the entry: a slot that is torn by two processes writing at once no longer
+matches its key and reads as empty, so the table needs no locks.
+"""
+
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from muehle_game.game import Turn
+
+EXACT, LOWER, UPPER = 1, 2, 3
+"Bound types: the score is exact, a lower bound (fail high) or an upper bound."
+
+_NONE = 24
+"Stands for a missing from_idx or remove_idx in a packed turn."
+
+MAGIC = int.from_bytes(b"MUEHLETT", "little")
+VERSION = 1
+"Format of table files, files of other versions are rejected."
+HEADER_WORDS = 8
+"uint64 words before the slots in a table file: magic, version, size, generation."
+
+AGE_WEIGHT = 8
+"Plies of depth one generation of age is worth when choosing a slot to replace."
+
+
+def pack_turn(turn: Turn) -> int:
+    """Packs a complete turn into 15 bits."""
+    source, target, remove = turn
+    return (
+        (_NONE if source is None else source) * 625
+        + target * 25
+        + (_NONE if remove is None else remove)
+    )
+
+
+def unpack_turn(packed: int) -> Turn:
+    """Inverse of pack_turn."""
+    source, rest = divmod(packed, 625)
+    target, remove = divmod(rest, 25)
+    return (
+        None if source == _NONE else source,
+        target,
+        None if remove == _NONE else remove,
+    )
+
+
+def _slots(size: int) -> int:
+    return 1 << max(size, 2).bit_length() - 1
+
+
+def table_bytes(size: int) -> int:
+    """Bytes of the buffer of a TranspositionTable with size slots."""
+    return 16 * _slots(size)
+
+
+class Entry(NamedTuple):
+    depth: int
+    bound: int
+    score: int
+    turn: Optional[Turn]
+
+
+class TranspositionTable:
+    """Transposition table with two-slot buckets and aging.
+
+    A store updates the slot of its position unless that holds a deeper
+    result of the current search. Otherwise it takes the slot of the bucket
+    that is empty or worth the least, where a slot is worth its depth minus
+    AGE_WEIGHT plies per search since it was stored. Results of old turns and
+    games are so kept until newer searches need the room.
+    """
+
+    def __init__(self, size: int = 1 << 20, buffer=None):
+        """Initializes an empty table, or a table over an existing buffer.
+
+        Args:
+            size: Number of slots, rounded down to a power of two.
+            buffer: Memory of at least table_bytes(size) bytes to keep the
+                slots in, its contents are used as they are.
+        """
+        size = _slots(size)
+        if buffer is None:
+            self.table = np.zeros((size, 2), dtype=np.uint64)
+        else:
+            self.table = np.frombuffer(buffer, dtype=np.uint64, count=2 * size)
+            self.table = self.table.reshape(size, 2)
+        self.mask = size - 2
+        self.generation = 0
+        self._header: Optional[np.ndarray] = None
+
+    @classmethod
+    def open(cls, path: str | Path, size: int = 1 << 20) -> "TranspositionTable":
+        """Opens a table file, or creates it with size slots if it does not exist.
+
+        The file is memory-mapped, every store goes to the file and is seen by
+        all processes that have it open.
+
+        Raises:
+            ValueError: If the file is not a table file of this version.
+        """
+        path = Path(path)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            size = _slots(size)
+            words = np.memmap(
+                path, dtype=np.uint64, mode="w+", shape=(HEADER_WORDS + 2 * size,)
+            )
+            words[:4] = (MAGIC, VERSION, size, 0)
+            words.flush()
+            del words
+        words = np.memmap(path, dtype=np.uint64, mode="r+")
+        if len(words) < HEADER_WORDS or int(words[0]) != MAGIC:
+            raise ValueError(f"{path} is not a transposition table file")
+        if int(words[1]) != VERSION:
+            raise ValueError(
+                f"{path} has table version {int(words[1])}, expected {VERSION}"
+            )
+        size = int(words[2])
+        table = cls(size, words[HEADER_WORDS : HEADER_WORDS + 2 * size])
+        table._header = words[:HEADER_WORDS]
+        table.generation = int(words[3])
+        return table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def clear(self):
+        self.table[:] = 0
+
+    def new_search(self):
+        """Starts a new generation, entries of older ones are replaced first."""
+        self.generation = (self.generation + 1) & 0xFF
+        if self._header is not None:
+            self._header[3] = self.generation
+
+    def flush(self):
+        """Writes a file-backed table to disk."""
+        if self._header is not None:
+            self._header.flush()
+
+    def usage(self, sample: int = 4096) -> float:
+        """Fraction of used slots among the first sample slots."""
+        return float(np.count_nonzero(self.table[:sample, 1])) / min(sample, len(self))
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """Returns the entry of the position with hash key, if it is stored."""
+        index = key & self.mask
+        for slot in self.table[index : index + 2]:
+            data = int(slot[1])
+            if data and int(slot[0]) ^ data == key:
+                move = data & 0x7FFF
+                return Entry(
+                    depth=data >> 15 & 0xFF,
+                    bound=data >> 23 & 0x3,
+                    score=(data >> 25 & 0xFFFF) - 0x8000,
+                    turn=unpack_turn(move - 1) if move else None,
+                )
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, turn: Optional[Turn]):
+        """Stores a search result, see the class docstring for the replacement.
+
+        Args:
+            key: Hash of the position.
+            depth: Remaining depth of the search, 0-255.
+            bound: EXACT, LOWER or UPPER.
+            score: Score from the view of the player to move, fits in 16 bits.
+            turn: Best turn found, or None.
+        """
+        index = key & self.mask
+        victim, lowest = index, None
+        for i in (index, index + 1):
+            stored = int(self.table[i, 1])
+            stored_depth = stored >> 15 & 0xFF
+            age = (self.generation - (stored >> 41)) & 0xFF
+            if stored and int(self.table[i, 0]) ^ stored == key:
+                if age == 0 and stored_depth > depth and bound != EXACT:
+                    return
+                victim = i
+                break
+            worth = stored_depth - AGE_WEIGHT * age if stored else -AGE_WEIGHT << 8
+            if lowest is None or worth < lowest:
+                victim, lowest = i, worth
+        move = 0 if turn is None else pack_turn(turn) + 1
+        data = (
+            move
+            | depth << 15
+            | bound << 23
+            | (score + 0x8000) << 25
+            | self.generation << 41
+        )
+        self.table[victim] = (key ^ data, data)
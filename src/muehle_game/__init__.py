@@ -0,0 +1,4 @@
+from .batch import MuehleBatch
+from .game import Muehle, Phase
+
+__all__ = ["Muehle", "MuehleBatch", "Phase"]
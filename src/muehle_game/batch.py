@@ -0,0 +1,247 @@
+import numpy as np
+
+from .bitboard import CELLS, MILLS, VALID_MOVES
+from .packing import pack_boards
+
+NUM_ACTIONS = (CELLS + 1) * CELLS
+"Size of the action space, see ai.train.ActionMapper (index = source * 24 + target)."
+
+NO_SOURCE = CELLS
+"Source used for placing and removing a piece."
+
+
+def _adjacency() -> np.ndarray:
+    adjacency = np.zeros((CELLS, CELLS), dtype=bool)
+    for source, targets in VALID_MOVES.items():
+        adjacency[source, targets] = True
+    return adjacency
+
+
+ADJACENCY = _adjacency()
+"ADJACENCY[source, target] is True if a piece may move from source to target."
+
+MILL_CELLS = np.array(MILLS, dtype=np.intp)
+"(16, 3) cells of every mill."
+
+MILL_MEMBERS = np.zeros((len(MILLS), CELLS), dtype=np.uint8)
+MILL_MEMBERS[np.arange(len(MILLS))[:, None], MILL_CELLS] = 1
+"(16, 24) one-hot membership of the cells in every mill."
+
+MILLS_AT = np.array(
+    [[mill for mill in MILLS if cell in mill] for cell in range(CELLS)],
+    dtype=np.intp,
+)
+"(24, 2, 3) cells of the two mills through every cell."
+
+_ADJACENCY_U8 = ADJACENCY.astype(np.uint8)
+
+EDGE_SOURCES, EDGE_TARGETS = np.nonzero(ADJACENCY)
+"Source and target cell of every directed edge of the board."
+
+EDGE_ACTIONS = EDGE_SOURCES * CELLS + EDGE_TARGETS
+"Action index of moving along every edge."
+
+PLACE_ACTIONS = NO_SOURCE * CELLS + np.arange(CELLS)
+"Action index of placing (or removing) a piece on every cell."
+
+
+def removable(board: np.ndarray, player: np.ndarray) -> np.ndarray:
+    """(N, 24) pieces each player may remove from a (N, 24) board.
+
+    Pieces in a mill are only removable if all pieces are in mills.
+    """
+    opp = board == -player[:, None]
+    closed = opp[:, MILL_CELLS].all(axis=2)
+    in_mill = (closed.astype(np.uint8) @ MILL_MEMBERS) > 0
+    free = opp & ~in_mill
+    return np.where(free.any(axis=1, keepdims=True), free, opp)
+
+
+def legal_masks(
+    board: np.ndarray,
+    to_place: dict[int, np.ndarray],
+    player: np.ndarray,
+    removal_pending: np.ndarray,
+) -> np.ndarray:
+    """(N, 600) legal ActionMapper actions of N positions.
+
+    Args:
+        board: (N, 24) int8 boards.
+        to_place: (N,) pieces left to place for player 1 and -1.
+        player: (N,) player to move.
+        removal_pending: (N,) bool, player has to remove a piece.
+    """
+    n = len(board)
+    own = board == player[:, None]
+    empty = board == 0
+    placing = np.where(player == 1, to_place[1], to_place[-1]) > 0
+    moves = ~placing & ~removal_pending
+    jumping = moves & (own.sum(axis=1) == 3)
+
+    mask = np.zeros((n, NUM_ACTIONS), dtype=bool)
+    mask[:, EDGE_ACTIONS] = (
+        own[:, EDGE_SOURCES] & empty[:, EDGE_TARGETS] & (moves & ~jumping)[:, None]
+    )
+    if jumping.any():
+        jumps = own[jumping, :, None] & empty[jumping, None, :]
+        mask[jumping, : NO_SOURCE * CELLS] = jumps.reshape(-1, NO_SOURCE * CELLS)
+    mask[:, PLACE_ACTIONS] = np.where(
+        removal_pending[:, None],
+        removable(board, player),
+        empty & placing[:, None],
+    )
+    return mask
+
+
+class MuehleBatch:
+    """N games of Muehle played in lockstep with NumPy.
+
+    Follows the same rules as Muehle, with the action space of ActionMapper:
+    after a move forms a mill the same player has to play a removal action
+    (source 24) next. Finished games are reset automatically by step().
+    The draw rules of Muehle (repetition, no capture) are not applied.
+    """
+
+    board: np.ndarray
+    "(N, 24) int8, 1 and -1 for the players, 0 for empty"
+    to_place: dict[int, np.ndarray]
+    "(N,) int8 pieces left to place per player"
+    player: np.ndarray
+    "(N,) int8 player to move"
+    removal_pending: np.ndarray
+    "(N,) bool, player has to remove a piece"
+
+    def __init__(self, num_games: int):
+        """Initializes num_games games in their start position."""
+        self.num_games = num_games
+        self._rows = np.arange(num_games)
+        self.board = np.zeros((num_games, CELLS), dtype=np.int8)
+        self.to_place = {
+            1: np.zeros(num_games, dtype=np.int8),
+            -1: np.zeros(num_games, dtype=np.int8),
+        }
+        self.player = np.zeros(num_games, dtype=np.int8)
+        self.removal_pending = np.zeros(num_games, dtype=bool)
+        self.reset()
+
+    def reset(self, games: np.ndarray | None = None):
+        """Resets the selected games (bool mask or indices), all if None."""
+        if games is None:
+            games = slice(None)
+        self.board[games] = 0
+        self.to_place[1][games] = 9
+        self.to_place[-1][games] = 9
+        self.player[games] = 1
+        self.removal_pending[games] = False
+
+    def to_keys(self) -> np.ndarray:
+        """(N,) uint64 keys of the positions, see Muehle.to_key."""
+        return pack_boards(self.board, self.to_place, self.player)
+
+    def _own_to_place(self) -> np.ndarray:
+        return np.where(self.player == 1, self.to_place[1], self.to_place[-1])
+
+    def removable(self) -> np.ndarray:
+        """(N, 24) pieces the player to move may remove."""
+        return removable(self.board, self.player)
+
+    def legal_mask(self) -> np.ndarray:
+        """(N, 600) mask of the legal actions of the player to move."""
+        return legal_masks(self.board, self.to_place, self.player, self.removal_pending)
+
+    def _lost(self, player: int) -> np.ndarray:
+        """(N,) games lost by player: fewer than 3 pieces or blocked."""
+        own = self.board == player
+        empty = self.board == 0
+        count = own.sum(axis=1)
+        reachable = (own.astype(np.uint8) @ _ADJACENCY_U8) > 0
+        blocked = ~(reachable & empty).any(axis=1)
+        moving = self.to_place[player] == 0
+        return moving & ((count < 3) | ((count > 3) & blocked))
+
+    def winner(self) -> tuple[np.ndarray, np.ndarray]:
+        """Terminal state of every game, like Muehle.is_terminal and Muehle.done.
+
+        Returns:
+            A tuple containing:
+            - done: (N,) bool, True if the game has ended.
+            - winner: (N,) int8, 1 or -1 for the winner, 0 for ongoing or a truce.
+        """
+        lost_1 = self._lost(1)
+        lost_2 = self._lost(-1)
+        jumping = [
+            (self.to_place[p] == 0) & ((self.board == p).sum(axis=1) == 3)
+            for p in (1, -1)
+        ]
+        truce = jumping[0] & jumping[1]
+        winner = np.where(lost_1, -1, np.where(lost_2, 1, 0)).astype(np.int8)
+        return lost_1 | lost_2 | truce, winner
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Plays one action (ActionMapper index) in every game.
+
+        Games that end with this action are reset afterwards.
+
+        Args:
+            actions: (N,) action indices.
+
+        Returns:
+            A tuple containing:
+            - done: (N,) bool, True for games that ended with this action.
+            - winner: (N,) int8, the winner of the ended games (0 for a truce).
+
+        Raises:
+            ValueError: If an action is illegal. No game is changed.
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        rows = self._rows
+        source, target = np.divmod(actions, CELLS)
+        p = self.player
+        board = self.board
+
+        removing = self.removal_pending.copy()
+        placing = ~removing & (self._own_to_place() > 0)
+        moving = ~removing & ~placing
+
+        src = np.minimum(source, CELLS - 1)
+        own_count = (board == p[:, None]).sum(axis=1)
+        target_empty = board[rows, target] == 0
+        legal = np.where(
+            removing,
+            (source == NO_SOURCE) & self.removable()[rows, target],
+            np.where(
+                placing,
+                (source == NO_SOURCE) & target_empty,
+                (source >= 0)
+                & (source < NO_SOURCE)
+                & (board[rows, src] == p)
+                & target_empty
+                & ((own_count == 3) | ADJACENCY[src, target]),
+            ),
+        )
+        if not legal.all():
+            raise ValueError(f"Invalid action in games {np.flatnonzero(~legal)}")
+
+        r = rows[removing]
+        board[r, target[r]] = 0
+        self.removal_pending[r] = False
+
+        m = rows[moving]
+        board[m, source[m]] = 0
+
+        played = rows[~removing]
+        board[played, target[played]] = p[played]
+        for player in (1, -1):
+            self.to_place[player][placing & (p == player)] -= 1
+
+        lines = board[played[:, None, None], MILLS_AT[target[played]]]
+        mill = (lines == p[played, None, None]).all(axis=2).any(axis=1)
+        self.removal_pending[played[mill]] = True
+
+        self.player[~self.removal_pending] *= -1
+
+        done, winner = self.winner()
+        winner[~done] = 0
+        if done.any():
+            self.reset(done)
+        return done, winner
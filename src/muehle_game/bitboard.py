@@ -0,0 +1,158 @@
+"""Bitboard tables for the Muehle board.
+
+A position is stored as one 24 bit integer per player, bit ``i`` is set when
+the player has a piece on cell ``i``. All topology (neighbours, mills) is
+precomputed here once, so the game logic only needs integer operations.
+"""
+
+import numpy as np
+
+# It took longer to create the graphic than writing the code
+# 0 ---------------------- 1 --------------------- 2
+# |                        |                       |
+# |                        |                       |
+# |         3 ------------ 4 ----------- 5         |
+# |         |              |             |         |
+# |         |              |             |         |
+# |         |      6 ----- 7 ----- 8     |         |
+# |         |      |               |     |         |
+# |         |      |               |     |         |
+# 9 ------  10 --- 11             12 --- 13 ----- 14
+# |         |      |               |     |         |
+# |         |      |               |     |         |
+# |         |      15 ---- 16 ----17     |         |
+# |         |              |             |         |
+# |         |              |             |         |
+# |         18 ----------- 19 ---------- 20        |
+# |                        |                       |
+# |                        |                       |
+# 21 --------------------- 22 -------------------- 23
+
+VALID_MOVES: dict[int, list[int]] = {
+    0: [1, 9],
+    1: [0, 2, 4],
+    2: [1, 14],
+    3: [4, 10],
+    4: [1, 3, 5, 7],
+    5: [4, 13],
+    6: [7, 11],
+    7: [4, 6, 8],
+    8: [7, 12],
+    9: [0, 10, 21],
+    10: [3, 9, 11, 18],
+    11: [6, 10, 15],
+    12: [8, 13, 17],
+    13: [5, 12, 14, 20],
+    14: [2, 13, 23],
+    15: [11, 16],
+    16: [15, 17, 19],
+    17: [12, 16],
+    18: [10, 19],
+    19: [16, 18, 20, 22],
+    20: [13, 19],
+    21: [9, 22],
+    22: [19, 21, 23],
+    23: [14, 22],
+}
+"Graph of valid moves (adjacency list) between board positions."
+
+MILLS: list[list[int]] = [
+    [0, 1, 2],
+    [3, 4, 5],
+    [6, 7, 8],
+    [9, 10, 11],
+    [12, 13, 14],
+    [15, 16, 17],
+    [18, 19, 20],
+    [21, 22, 23],
+    [0, 9, 21],
+    [3, 10, 18],
+    [6, 11, 15],
+    [1, 4, 7],
+    [16, 19, 22],
+    [8, 12, 17],
+    [5, 13, 20],
+    [2, 14, 23],
+]
+"All 16 possible mill combinations."
+
+CELLS = 24
+FULL = (1 << CELLS) - 1
+
+BIT: tuple[int, ...] = tuple(1 << i for i in range(CELLS))
+"Single bit mask of every cell."
+
+ADJACENT: tuple[int, ...] = tuple(
+    sum(BIT[t] for t in VALID_MOVES[i]) for i in range(CELLS)
+)
+"Mask of the neighbours of every cell."
+
+MILL_MASKS: tuple[int, ...] = tuple(sum(BIT[p] for p in mill) for mill in MILLS)
+"Mask of every mill, in the order of MILLS."
+
+MILLS_AT: tuple[tuple[int, ...], ...] = tuple(
+    tuple(m for m in MILL_MASKS if m & BIT[i]) for i in range(CELLS)
+)
+"Masks of the (two) mills every cell belongs to."
+
+
+def _byte_neighbours(k: int, byte: int) -> int:
+    out = 0
+    for i in range(8):
+        if byte >> i & 1:
+            out |= ADJACENT[8 * k + i]
+    return out
+
+
+_NEIGHBOURS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(_byte_neighbours(k, byte) for byte in range(256)) for k in range(3)
+)
+"Union of the neighbours per byte value, for each of the three bytes of a mask."
+
+
+def iter_bits(mask: int):
+    """Yields the cell index of every set bit, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def from_cells(cells: np.ndarray, player: int) -> int:
+    """Builds the mask of all cells of an int8 board that equal player."""
+    mask = 0
+    for i in np.flatnonzero(cells == player):
+        mask |= BIT[i]
+    return mask
+
+
+def to_bool(mask: int) -> np.ndarray:
+    """Expands a mask to a boolean array of length 24."""
+    raw = np.frombuffer(mask.to_bytes(3, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little").view(bool)
+
+
+def neighbours(mask: int) -> int:
+    """Union of the neighbours of all cells in mask."""
+    return (
+        _NEIGHBOURS[0][mask & 0xFF]
+        | _NEIGHBOURS[1][mask >> 8 & 0xFF]
+        | _NEIGHBOURS[2][mask >> 16]
+    )
+
+
+def closed_mills(own: int) -> int:
+    """Mask of all pieces in own that are part of a closed mill."""
+    out = 0
+    for m in MILL_MASKS:
+        if own & m == m:
+            out |= m
+    return out
+
+
+def is_mill_at(own: int, pos: int) -> bool:
+    """Checks if own has a closed mill through pos."""
+    for m in MILLS_AT[pos]:
+        if own & m == m:
+            return True
+    return False
@@ -0,0 +1,534 @@
+from enum import Enum
+from typing import Iterator, Literal, Optional, cast
+
+import numpy as np
+
+from muhle_renderer import (
+    calc_coords_muhle,
+    load_board,
+    pieces,
+    state24_to_points,
+)
+from renderer import render
+
+from . import zobrist
+from .bitboard import (
+    ADJACENT,
+    BIT,
+    FULL,
+    MILL_MASKS,
+    MILLS,
+    VALID_MOVES,
+    closed_mills,
+    from_cells,
+    is_mill_at,
+    iter_bits,
+    neighbours,
+    to_bool,
+)
+from .packing import pack, unpack
+
+
+class Phase(Enum):
+    PLACING = 0
+    MOVING = 1
+    JUMPING = 2
+
+
+Turn = tuple[Optional[int], Optional[int], Optional[int]]
+"A complete turn (from_idx, to_idx, remove_idx) as returned by the agents."
+REPETITION_LIMIT = 3
+"Threefold repetition, the repetition_limit of self-play, the arena and the search."
+
+
+class _Board(np.ndarray):
+    """int8 view of the cells that keeps the bitboards of its game in sync.
+
+    Writing to the array (e.g. ``game.board[0:3] = 1``) reloads the bitboards,
+    so code that edits the board directly keeps working.
+    """
+
+    _game = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self._game is not None:
+            self._game._load_board()
+
+
+class Muehle:
+    """Implements the complete game logic for Muehle (Nine Men's Morris).
+
+    This class manages the game board, player turns, piece placement, movement,
+    mill detection, and win/loss conditions.
+
+    The position is stored as two 24 bit masks in ``bits`` (see ``bitboard``),
+    ``board`` is an int8 view of the same position kept in sync with them.
+    """
+
+    bits: dict[int, int]
+    to_place: dict[int, int]
+    "valid moves if empty"
+    vm: dict[int, list[int]]
+    mills: list[list[int]]
+    player: Literal[1, -1]
+    history: list[int]
+    "hash of every position since the start, one per turn"
+    quiet_turns: int
+    "turns since the last placement or removal"
+
+    """Nur klassenbasiert für dich Eugen"""
+
+    def __init__(
+        self,
+        repetition_limit: int | None = None,
+        no_capture_limit: int | None = None,
+    ):
+        """Initializes the game board and state.
+
+        Args:
+            repetition_limit: The game is drawn when a position occurs this often.
+                              None, the default, disables the rule, see
+                              REPETITION_LIMIT.
+            no_capture_limit: The game is drawn after this many turns in the
+                              moving phase without a removal. None disables the rule.
+        """
+        self.repetition_limit = repetition_limit
+        self.no_capture_limit = no_capture_limit
+        self.vm = self._make_vm()
+        self.mills = self._make_mills()
+        self.reset(reinit_board=True)
+
+    @property
+    def board(self) -> np.ndarray:
+        """The board as int8 array: 1 and -1 for the players, 0 for empty."""
+        return self._board
+
+    @board.setter
+    def board(self, value: np.ndarray):
+        self._attach(np.array(value, dtype=np.int8))
+        self._load_board()
+
+    def _attach(self, cells: np.ndarray):
+        """Makes cells the int8 board of this game."""
+        board = cells.view(_Board)
+        board._game = self
+        self._board = board
+        self._cells = cells
+
+    def _load_board(self):
+        """Rebuilds the bitboards and the board hash from the int8 board."""
+        self.bits = {1: from_cells(self._cells, 1), -1: from_cells(self._cells, -1)}
+        self._board_hash = zobrist.board_hash(self.bits)
+
+    @property
+    def hash(self) -> int:
+        """64 bit Zobrist hash of the position (board, to_place and player).
+
+        The board part is updated incrementally by move() and remove_piece().
+        """
+        return (
+            self._board_hash
+            ^ zobrist.TO_PLACE[1][self.to_place[1]]
+            ^ zobrist.TO_PLACE[-1][self.to_place[-1]]
+            ^ (zobrist.SIDE if self.player == -1 else 0)
+        )
+
+    def __getstate__(self):
+        return {
+            "board": self._cells.copy(),
+            "to_place": dict(self.to_place),
+            "player": self.player,
+            "undo": list(self._undo),
+            "history": list(self.history),
+            "quiet_turns": self.quiet_turns,
+            "repetition_limit": self.repetition_limit,
+            "no_capture_limit": self.no_capture_limit,
+        }
+
+    def __setstate__(self, state):
+        self.vm = self._make_vm()
+        self.mills = self._make_mills()
+        self.board = state["board"]
+        self.to_place = state["to_place"]
+        self.player = state["player"]
+        self._undo = state["undo"]
+        self.history = state["history"]
+        self.quiet_turns = state["quiet_turns"]
+        self.repetition_limit = state["repetition_limit"]
+        self.no_capture_limit = state["no_capture_limit"]
+
+    def clone(self) -> "Muehle":
+        """Returns an independent copy of the game.
+
+        Only the position and the undo stack are copied, the topology tables
+        (vm, mills) are shared with the original.
+        """
+        game = Muehle.__new__(Muehle)
+        game.vm = self.vm
+        game.mills = self.mills
+        game._attach(self._cells.copy())
+        game.bits = dict(self.bits)
+        game._board_hash = self._board_hash
+        game.to_place = dict(self.to_place)
+        game.player = self.player
+        game._undo = list(self._undo)
+        game.history = list(self.history)
+        game.quiet_turns = self.quiet_turns
+        game.repetition_limit = self.repetition_limit
+        game.no_capture_limit = self.no_capture_limit
+        return game
+
+    def to_key(self) -> int:
+        """Packs board, to_place and player into one 64 bit int (see packing)."""
+        return pack(
+            self.bits[1],
+            self.bits[-1],
+            self.to_place[1],
+            self.to_place[-1],
+            self.player,
+        )
+
+    @classmethod
+    def from_key(
+        cls,
+        key: int,
+        repetition_limit: int | None = None,
+        no_capture_limit: int | None = None,
+    ) -> "Muehle":
+        """Creates a game in the position of a key from to_key().
+
+        The history of the new game starts at this position.
+        """
+        white, black, to_place_1, to_place_2, player = unpack(key)
+        game = cls(repetition_limit, no_capture_limit)
+        game.board = to_bool(white).astype(np.int8) - to_bool(black)
+        game.to_place = {1: to_place_1, -1: to_place_2}
+        game.player = cast(Literal[1, -1], player)
+        game.history = [game.hash]
+        return game
+
+    def _is_jumping(self, player: Literal[1, -1]) -> bool:
+        """Checks if a player is in the jumping phase (has only 3 pieces left)."""
+        return self.to_place[player] == 0 and self.bits[player].bit_count() == 3
+
+    def _is_moving(self, player: Literal[1, -1]) -> bool:
+        """Checks if a player has placed all their pieces and is in the moving phase."""
+        return self.to_place[player] == 0
+
+    def _has_lost(self, player: Literal[1, -1]) -> bool:
+        """Checks if a player has lost the game.
+
+        A player loses if they have fewer than 3 pieces or have no legal moves.
+        """
+        if self.to_place[player] != 0:
+            return False
+        count = self.bits[player].bit_count()
+        if count < 3:
+            return True
+        if count == 3:
+            return False
+        own = self.bits[player]
+        empty = FULL ^ (own | self.bits[-player])
+        return not neighbours(own) & empty
+
+    def _truce(self):
+        """Checks for a draw condition (both players are in the jumping phase)."""
+        return self._is_jumping(1) and self._is_jumping(-1)
+
+    def done(self):
+        """Determines if the game is over and returns the winner.
+
+        Returns:
+            1 if player 1 has won, -1 if player -1 has won, or 0 if the game is ongoing.
+        """
+        if self._has_lost(1):
+            return -1
+        if self._has_lost(-1):
+            return 1
+        return 0
+
+    def is_draw(self) -> bool:
+        """Checks the repetition and no-capture draw rules."""
+        if (
+            self.no_capture_limit is not None
+            and self.quiet_turns >= self.no_capture_limit
+        ):
+            return True
+        if self.repetition_limit is not None:
+            # positions before the last placement or removal can not repeat
+            recent = self.history[-(self.quiet_turns + 1) :]
+            return recent.count(self.hash) >= self.repetition_limit
+        return False
+
+    def is_terminal(self):
+        """Checks if the game has ended."""
+        return self.done() != 0 or self._truce() or self.is_draw()
+
+    def phase(self, player: Literal[1, -1]) -> Phase:
+        """Gets the current game phase for a specific player."""
+        if self.to_place[player] != 0:
+            return Phase.PLACING
+        elif self.bits[player].bit_count() != 3:
+            return Phase.MOVING
+        else:
+            return Phase.JUMPING
+
+    def reset(self, reinit_board=False):
+        """Resets the game to its initial state."""
+        if reinit_board:
+            self.board = np.zeros(24, dtype=np.int8)
+        else:
+            self._cells[:] = 0
+            self.bits = {1: 0, -1: 0}
+            self._board_hash = 0
+        self.to_place = {1: 9, -1: 9}
+        self.player = 1
+        self._undo = []
+        self.history = [self.hash]
+        self.quiet_turns = 0
+
+    def legal_targets(self) -> int:
+        """Returns the mask of legal target positions for the current player."""
+        p = self.player
+        own = self.bits[p]
+        empty = FULL ^ (own | self.bits[-p])
+        if self.to_place[p] != 0 or own.bit_count() == 3:
+            return empty
+        return neighbours(own) & empty
+
+    def legal_actions_mask(self):
+        """Returns a boolean mask of legal target positions for the current player."""
+        return to_bool(self.legal_targets())
+
+    def move(self, source: int | None, target: int):
+        """Executes a game move.
+
+        Args:
+            source: The starting position index (0-23) of the piece to move.
+                    Should be None during the placing phase.
+            target: The target position index (0-23).
+
+        Returns:
+            'remove' if the move creates a mill, 'done' if the move ends the game,
+            'ok' otherwise.
+
+        Raises:
+            ValueError: If the move is illegal.
+        """
+        p = self.player
+        bits = self.bits
+        own = bits[p]
+        occupied = own | bits[-p]
+        target_bit = BIT[target]
+
+        if self.to_place[p] != 0:
+            if occupied & target_bit:
+                raise ValueError("Invalid move")
+            own |= target_bit
+            self.to_place[p] -= 1
+            self._board_hash ^= zobrist.PIECE[p][target]
+            self.quiet_turns = 0
+        else:
+            if source is None:
+                raise ValueError("Invalid source none")
+            if not own & BIT[source]:
+                raise ValueError("Invalid source not player id")
+            if own.bit_count() != 3 and not ADJACENT[source] & target_bit:
+                raise ValueError("Invalid target")
+            if occupied & target_bit:
+                raise ValueError("Invalid target")
+
+            own ^= BIT[source] | target_bit
+            self._cells[source] = 0
+            keys = zobrist.PIECE[p]
+            self._board_hash ^= keys[source] ^ keys[target]
+            self.quiet_turns += 1
+
+        bits[p] = own
+        self._cells[target] = p
+        if is_mill_at(own, target):
+            return "remove"
+
+        if self.done() != 0:
+            return "done"
+        self.player = cast(Literal[-1, 1], self.player * -1)
+        self.history.append(self.hash)
+        return "ok"
+
+    def remove_piece(self, pos: int):
+        """Removes an opponent's piece after a mill has been formed.
+
+        Args:
+            pos: The position of the piece to remove.
+
+        Returns:
+            The winner of the game (1 or -1) if the removal ends the game, otherwise 0.
+
+        Raises:
+            ValueError: If the removal is illegal (e.g., trying to remove a piece from a mill
+                        when other pieces are available).
+        """
+        if not self.can_remove(pos, self.player):
+            raise ValueError("Cannot remove piece from mill")
+        self.player = cast(Literal[-1, 1], self.player * -1)
+        self.bits[self.player] ^= BIT[pos]
+        self._cells[pos] = 0
+        self._board_hash ^= zobrist.PIECE[self.player][pos]
+        self.quiet_turns = 0
+        self.history.append(self.hash)
+        return self.done()
+
+    def push(self, turn: Turn) -> str:
+        """Plays a complete turn and remembers how to take it back with pop().
+
+        Args:
+            turn: (from_idx, to_idx, remove_idx). to_idx may be None to only
+                  remove a piece after a mill formed by an earlier push.
+
+        Returns:
+            'remove' if a mill was formed but no piece was removed, 'done' if the
+            turn ends the game, 'ok' otherwise.
+
+        Raises:
+            ValueError: If the turn is illegal. The game is left unchanged.
+        """
+        source, target, remove = turn
+        p = self.player
+        record = (
+            turn,
+            p,
+            self.to_place[p],
+            self.bits[1],
+            self.bits[-1],
+            self._board_hash,
+            self.quiet_turns,
+            len(self.history),
+        )
+
+        result = "ok"
+        if target is not None:
+            result = self.move(source, target)
+        if remove is not None:
+            if target is not None and result != "remove":
+                self._restore(record)
+                raise ValueError("Invalid removal without mill")
+            try:
+                result = "done" if self.remove_piece(remove) != 0 else "ok"
+            except ValueError:
+                self._restore(record)
+                raise
+        self._undo.append(record)
+        return result
+
+    def pop(self) -> Turn:
+        """Takes back the last turn played with push() and returns it."""
+        record = self._undo.pop()
+        self._restore(record)
+        return record[0]
+
+    def _restore(self, record):
+        """Restores the position from before the turn of an undo record."""
+        (source, target, remove), p, to_place, bits_1, bits_2 = record[:5]
+        self._board_hash, self.quiet_turns, history_len = record[5:]
+        del self.history[history_len:]
+        if target is not None:
+            self._cells[target] = 0
+            if source is not None:
+                self._cells[source] = p
+        if remove is not None:
+            self._cells[remove] = -p
+        self.bits[1] = bits_1
+        self.bits[-1] = bits_2
+        self.to_place[p] = to_place
+        self.player = p
+
+    def is_mill(self, pos: int, player: Literal[1, -1]) -> bool:
+        """Checks if a piece at a given position completes a mill for the specified player."""
+        return is_mill_at(self.bits[player], pos)
+
+    def count_almost_mills(self, player: Literal[1, -1]) -> int:
+        """Counts how many almost mills a player has."""
+        own = self.bits[player]
+        empty = FULL ^ (own | self.bits[-player])
+        count = 0
+        for m in MILL_MASKS:
+            if (own & m).bit_count() == 2 and empty & m:
+                count += 1
+        return count
+
+    def _make_mills(self):
+        """Defines all 16 possible mill combinations."""
+        return MILLS
+
+    def removable(self, remover: Literal[1, -1]) -> int:
+        """Returns the mask of opponent pieces the remover may take.
+
+        Pieces in a mill are only removable if all pieces are in mills.
+        """
+        opp = self.bits[-remover]
+        free = opp & ~closed_mills(opp)
+        return free if free else opp
+
+    def can_remove(self, pos: int, remover: Literal[1, -1]) -> bool:
+        """Check if a piece at pos can be removed."""
+        return bool(self.removable(remover) & BIT[pos])
+
+    def generate_turns(self) -> Iterator[Turn]:
+        """Yields all complete turns (from_idx, to_idx, remove_idx) of the player.
+
+        A move that forms a mill is yielded once per removable piece. The own
+        move never changes the opponent's pieces, so the removable set is only
+        computed once.
+        """
+        p = self.player
+        own = self.bits[p]
+        empty = FULL ^ (own | self.bits[-p])
+        removals = list(iter_bits(self.removable(p))) or [None]
+
+        if self.to_place[p] != 0:
+            for target in iter_bits(empty):
+                if is_mill_at(own | BIT[target], target):
+                    for remove in removals:
+                        yield None, target, remove
+                else:
+                    yield None, target, None
+            return
+
+        jumping = own.bit_count() == 3
+        for source in iter_bits(own):
+            rest = own ^ BIT[source]
+            targets = empty if jumping else ADJACENT[source] & empty
+            for target in iter_bits(targets):
+                if is_mill_at(rest | BIT[target], target):
+                    for remove in removals:
+                        yield source, target, remove
+                else:
+                    yield source, target, None
+
+    def render(self):
+        """Renders the current board state into a PIL Image."""
+        state = np.where(self._cells == -1, 2, self._cells).astype(np.int8)
+
+        points = state24_to_points(state)
+
+        result = render(
+            img=load_board(),
+            pieces=pieces,
+            points=points,
+            calc_coords=calc_coords_muhle,
+        )
+        return result
+
+    def _make_vm(self):
+        """Defines the graph of valid moves (adjacency list) between board positions."""
+        return VALID_MOVES
+
+
+if __name__ == "__main__":
+    game = Muehle()
+    game.move(None, 0)
+    game.move(None, 23)
+
+    result = game.render()
+    result.save("muehle.png")
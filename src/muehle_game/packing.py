@@ -0,0 +1,83 @@
+"""Lossless 64 bit encoding of Muehle positions.
+
+Layout of a key, lowest bit first:
+
+- bits 0-23: pieces of player 1
+- bits 24-47: pieces of player -1
+- bits 48-51: to_place[1]
+- bits 52-55: to_place[-1]
+- bit 56: set if player -1 is to move
+"""
+
+import numpy as np
+
+from .bitboard import CELLS, FULL
+
+TO_PLACE_SHIFT = {1: 48, -1: 52}
+SIDE_SHIFT = 56
+
+_WEIGHTS = np.uint64(1) << np.arange(CELLS, dtype=np.uint64)
+
+
+def pack(white: int, black: int, to_place_1: int, to_place_2: int, player: int) -> int:
+    """Packs the bitboards of player 1 and -1, to_place and player into a key."""
+    return (
+        white
+        | black << 24
+        | to_place_1 << 48
+        | to_place_2 << 52
+        | (1 << SIDE_SHIFT if player == -1 else 0)
+    )
+
+
+def unpack(key: int) -> tuple[int, int, int, int, int]:
+    """Inverse of pack, returns (white, black, to_place_1, to_place_2, player)."""
+    return (
+        key & FULL,
+        key >> 24 & FULL,
+        key >> 48 & 0xF,
+        key >> 52 & 0xF,
+        -1 if key >> SIDE_SHIFT & 1 else 1,
+    )
+
+
+def pack_boards(
+    boards: np.ndarray, to_place: dict[int, np.ndarray], player: np.ndarray
+) -> np.ndarray:
+    """Packs N positions into a (N,) uint64 array of keys.
+
+    Args:
+        boards: (N, 24) int8 boards.
+        to_place: (N,) pieces left to place for player 1 and -1.
+        player: (N,) player to move.
+    """
+    white = (boards == 1).astype(np.uint64) @ _WEIGHTS
+    black = (boards == -1).astype(np.uint64) @ _WEIGHTS
+    keys = white | black << np.uint64(24)
+    for p, shift in TO_PLACE_SHIFT.items():
+        keys |= np.asarray(to_place[p]).astype(np.uint64) << np.uint64(shift)
+    keys |= (np.asarray(player) == -1).astype(np.uint64) << np.uint64(SIDE_SHIFT)
+    return keys
+
+
+def unpack_keys(
+    keys: np.ndarray,
+) -> tuple[np.ndarray, dict[int, np.ndarray], np.ndarray]:
+    """Inverse of pack_boards.
+
+    Returns:
+        A tuple (boards, to_place, player) with (N, 24) int8 boards, (N,) int8
+        to_place for player 1 and -1 and the (N,) int8 player to move.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    cells = np.arange(CELLS, dtype=np.uint64)
+    white = (keys[:, None] >> cells) & np.uint64(1)
+    black = (keys[:, None] >> (cells + np.uint64(24))) & np.uint64(1)
+    boards = white.astype(np.int8) - black.astype(np.int8)
+    to_place = {
+        p: ((keys >> np.uint64(shift)) & np.uint64(0xF)).astype(np.int8)
+        for p, shift in TO_PLACE_SHIFT.items()
+    }
+    side = (keys >> np.uint64(SIDE_SHIFT)) & np.uint64(1)
+    player = np.where(side == 1, -1, 1).astype(np.int8)
+    return boards, to_place, player
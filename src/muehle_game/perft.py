@@ -0,0 +1,123 @@
+"""Perft: counts the complete turns reachable from a position.
+
+Used as a rule-exact oracle for move generation. A turn is a complete
+(from_idx, to_idx, remove_idx) triple, so every removal choice after a mill
+counts as its own turn.
+
+    python -m muehle_game.perft --depth 4
+    python -m muehle_game.perft --depth 3 --key 0x66600200000013
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+
+from .game import Muehle, Phase, Turn
+
+TurnGenerator = Callable[[Muehle], list[Turn]]
+
+
+def reference_turns(game: Muehle) -> list[Turn]:
+    """All complete turns of the player to move.
+
+    Built only from legal_actions_mask, move and can_remove, this is the
+    reference the optimized generators are checked against.
+    """
+    p = game.player
+    phase = game.phase(p)
+    turns: list[Turn] = []
+    for target in np.flatnonzero(game.legal_actions_mask()):
+        target = int(target)
+        if phase == Phase.PLACING:
+            sources = [None]
+        else:
+            sources = [
+                s
+                for s in range(24)
+                if game.board[s] == p
+                and (phase == Phase.JUMPING or target in game.vm[s])
+            ]
+        for source in sources:
+            if game.push((source, target, None)) == "remove":
+                removals = [r for r in range(24) if game.can_remove(r, p)]
+                turns.extend((source, target, r) for r in removals or [None])
+            else:
+                turns.append((source, target, None))
+            game.pop()
+    return turns
+
+
+def fast_turns(game: Muehle) -> list[Turn]:
+    """All complete turns of the player to move, from Muehle.generate_turns."""
+    return list(game.generate_turns())
+
+
+def perft(game: Muehle, depth: int, generator: TurnGenerator = fast_turns) -> int:
+    """Counts the leaf positions after depth complete turns.
+
+    Args:
+        game: The position to start from. It is restored before returning.
+        depth: Number of turns to play.
+        generator: Function listing the complete turns of a position.
+
+    Returns:
+        The number of turn sequences of length depth. Sequences stop early
+        at terminal positions and are then not counted.
+    """
+    if depth == 0:
+        return 1
+    if game.is_terminal():
+        return 0
+    turns = generator(game)
+    if depth == 1:
+        return len(turns)
+    nodes = 0
+    for turn in turns:
+        game.push(turn)
+        nodes += perft(game, depth - 1, generator)
+        game.pop()
+    return nodes
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Counts the complete turns reachable from a Muehle position."
+    )
+    parser.add_argument("--depth", type=int, default=3, help="Maximum depth.")
+    parser.add_argument(
+        "--key",
+        type=lambda value: int(value, 0),
+        default=None,
+        help="Position as Muehle.to_key() (decimal or 0x...). Defaults to the start position.",
+    )
+    parser.add_argument(
+        "--reference",
+        action="store_true",
+        help="Use the slow reference generator instead of Muehle.generate_turns.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.key is None:
+        game = Muehle(repetition_limit=None)
+    else:
+        game = Muehle.from_key(args.key, repetition_limit=None)
+
+    generator = reference_turns if args.reference else fast_turns
+    for depth in range(1, args.depth + 1):
+        start = time.perf_counter()
+        nodes = perft(game, depth, generator)
+        elapsed = time.perf_counter() - start
+        rate = nodes / elapsed if elapsed > 0 else float("inf")
+        print(
+            f"depth {depth:2d} | nodes {nodes:12d} | "
+            f"{elapsed:8.3f}s | {rate:12,.0f} nodes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
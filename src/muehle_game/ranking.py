@@ -0,0 +1,297 @@
+"""Combinatorial ranking of sets of cells and of positions.
+
+A k-subset of the 24 cells is ranked in colexicographic order: the cells
+c_1 < ... < c_k get the rank C(c_1, 1) + ... + C(c_k, k), a bijection onto
+0 .. C(24, k) - 1. A set can also be ranked among the free cells of a mask
+only (compress), which is how the pieces of the second player are numbered
+once the first player's cells are taken.
+
+Positions (keys of Muehle.to_key) are ranked within their PositionClass, the
+piece counts, to_place and the player to move: the index of w white and b
+black pieces is rank(white) * C(24 - w, b) + rank(black among the free
+cells), a bijection onto 0 .. class_size - 1. The symmetric variant gives
+the 16 symmetric images of a position (see symmetry) one index: the white
+set is numbered among the canonical white sets, the black set takes its
+smallest rank over the symmetries that map white onto its canonical set.
+That index space is up to 16 times smaller. It has holes where the white
+set is symmetric itself, fewer the more pieces there are.
+
+Every function comes in two flavours: on Python ints for single positions
+and on NumPy arrays of masks or keys for batches.
+"""
+
+from functools import lru_cache
+from math import comb
+from typing import NamedTuple
+
+import numpy as np
+
+from .bitboard import CELLS, FULL
+from .packing import SIDE_SHIFT, pack, unpack
+from .symmetry import NUM_SYMMETRIES, transform_mask, transform_masks
+
+BINOM = np.array(
+    [[comb(n, k) for k in range(CELLS + 1)] for n in range(CELLS + 1)], dtype=np.int64
+)
+"BINOM[n, k] is C(n, k)."
+
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+def _byte_ranks() -> np.ndarray:
+    """Colex rank of every byte of the mask, per byte position and offset."""
+    table = np.zeros((3, 256, 17), dtype=np.int64)
+    for position in range(3):
+        for byte in range(256):
+            cells = [8 * position + i for i in range(8) if byte >> i & 1]
+            for offset in range(17):
+                table[position, byte, offset] = sum(
+                    comb(cell, offset + i + 1) for i, cell in enumerate(cells)
+                )
+    return table
+
+
+_BYTE_RANKS = _byte_ranks()
+
+
+def rank_subset(mask: int) -> int:
+    """Colex rank of a set of cells among the sets of the same size."""
+    rank, i = 0, 0
+    while mask:
+        low = mask & -mask
+        i += 1
+        rank += comb(low.bit_length() - 1, i)
+        mask ^= low
+    return rank
+
+
+def unrank_subset(rank: int, k: int) -> int:
+    """The set of k cells with colex rank rank, inverse of rank_subset."""
+    mask = 0
+    for i in range(k, 0, -1):
+        cell = i - 1
+        while comb(cell + 1, i) <= rank:
+            cell += 1
+        rank -= comb(cell, i)
+        mask |= 1 << cell
+    return mask
+
+
+def compress(mask: int, free: int) -> int:
+    """Renumbers the cells of mask, which must lie in free, to 0 .. |free| - 1."""
+    out, position = 0, 0
+    while free:
+        low = free & -free
+        if mask & low:
+            out |= 1 << position
+        position += 1
+        free ^= low
+    return out
+
+
+def expand(compressed: int, free: int) -> int:
+    """Inverse of compress."""
+    out, position = 0, 0
+    while free:
+        low = free & -free
+        if compressed >> position & 1:
+            out |= low
+        position += 1
+        free ^= low
+    return out
+
+
+def popcounts(masks: np.ndarray) -> np.ndarray:
+    """Number of set bits of every 24 bit mask."""
+    masks = np.asarray(masks, dtype=np.int64)
+    return (
+        _POPCOUNT[masks & 0xFF]
+        + _POPCOUNT[masks >> 8 & 0xFF]
+        + _POPCOUNT[masks >> 16 & 0xFF]
+    )
+
+
+def rank_subsets(masks: np.ndarray) -> np.ndarray:
+    """Batched rank_subset, the masks may have different sizes."""
+    masks = np.asarray(masks, dtype=np.int64)
+    b0, b1, b2 = masks & 0xFF, masks >> 8 & 0xFF, masks >> 16 & 0xFF
+    k0 = _POPCOUNT[b0]
+    return (
+        _BYTE_RANKS[0, b0, 0]
+        + _BYTE_RANKS[1, b1, k0]
+        + _BYTE_RANKS[2, b2, k0 + _POPCOUNT[b1]]
+    )
+
+
+def unrank_subsets(ranks: np.ndarray, k: int) -> np.ndarray:
+    """Batched unrank_subset for sets of k cells."""
+    ranks = np.array(ranks, dtype=np.int64)
+    masks = np.zeros(len(ranks), dtype=np.int64)
+    for i in range(k, 0, -1):
+        cells = np.searchsorted(BINOM[:, i], ranks, side="right") - 1
+        ranks -= BINOM[cells, i]
+        masks |= np.int64(1) << cells
+    return masks
+
+
+def compress_batch(masks: np.ndarray, free: np.ndarray) -> np.ndarray:
+    """Batched compress."""
+    masks = np.asarray(masks, dtype=np.int64)
+    free = np.asarray(free, dtype=np.int64)
+    out = np.zeros(np.broadcast(masks, free).shape, dtype=np.int64)
+    position = np.zeros_like(out)
+    for cell in range(CELLS):
+        is_free = free >> cell & 1
+        out |= (masks >> cell & is_free) << position
+        position += is_free
+    return out
+
+
+def expand_batch(compressed: np.ndarray, free: np.ndarray) -> np.ndarray:
+    """Batched expand."""
+    compressed = np.asarray(compressed, dtype=np.int64)
+    free = np.asarray(free, dtype=np.int64)
+    out = np.zeros(np.broadcast(compressed, free).shape, dtype=np.int64)
+    position = np.zeros_like(out)
+    for cell in range(CELLS):
+        is_free = free >> cell & 1
+        out |= (compressed >> position & is_free) << cell
+        position += is_free
+    return out
+
+
+class PositionClass(NamedTuple):
+    """The part of a position that ranking keeps fixed."""
+
+    pieces_1: int
+    pieces_2: int
+    to_place_1: int
+    to_place_2: int
+    player: int
+
+
+def position_class(key: int) -> PositionClass:
+    """The class of the position of a key."""
+    white, black, to_place_1, to_place_2, player = unpack(key)
+    return PositionClass(
+        white.bit_count(), black.bit_count(), to_place_1, to_place_2, player
+    )
+
+
+def position_classes(keys: np.ndarray) -> np.ndarray:
+    """Batched position_class as an (N, 5) array in the order of PositionClass."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    fields = [
+        popcounts((keys & np.uint64(FULL)).astype(np.int64)),
+        popcounts((keys >> np.uint64(24) & np.uint64(FULL)).astype(np.int64)),
+        (keys >> np.uint64(48) & np.uint64(0xF)).astype(np.int64),
+        (keys >> np.uint64(52) & np.uint64(0xF)).astype(np.int64),
+        1 - 2 * (keys >> np.uint64(SIDE_SHIFT) & np.uint64(1)).astype(np.int64),
+    ]
+    return np.stack(fields, axis=1)
+
+
+@lru_cache(maxsize=None)
+def _white_classes(k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Canonical sets of k cells, sorted, and the canonical index of every rank."""
+    masks = unrank_subsets(np.arange(comb(CELLS, k)), k)
+    canonical = masks
+    for t in range(1, NUM_SYMMETRIES):
+        canonical = np.minimum(canonical, transform_masks(masks, t))
+    representatives, classes = np.unique(canonical, return_inverse=True)
+    return representatives, classes.astype(np.int32)
+
+
+def class_size(cls: PositionClass, symmetric: bool = False) -> int:
+    """Number of indices of a class."""
+    whites = (
+        len(_white_classes(cls.pieces_1)[0]) if symmetric else comb(CELLS, cls.pieces_1)
+    )
+    return whites * comb(CELLS - cls.pieces_1, cls.pieces_2)
+
+
+def rank_key(key: int, symmetric: bool = False) -> tuple[PositionClass, int]:
+    """The class of a position and its index in the class."""
+    cls = position_class(key)
+    white, black = key & FULL, key >> 24 & FULL
+    blacks = comb(CELLS - cls.pieces_1, cls.pieces_2)
+    if not symmetric:
+        return cls, rank_subset(white) * blacks + rank_subset(
+            compress(black, FULL ^ white)
+        )
+    representatives, classes = _white_classes(cls.pieces_1)
+    c = int(classes[rank_subset(white)])
+    canonical = int(representatives[c])
+    best = None
+    for t in range(NUM_SYMMETRIES):
+        if transform_mask(white, t) == canonical:
+            rank = rank_subset(compress(transform_mask(black, t), FULL ^ canonical))
+            best = rank if best is None else min(best, rank)
+    return cls, c * blacks + best
+
+
+def unrank_key(cls: PositionClass, index: int, symmetric: bool = False) -> int:
+    """The key of the position with an index in a class, inverse of rank_key.
+
+    With symmetric, one of the symmetric positions of the index is returned.
+    """
+    block, inner = divmod(index, comb(CELLS - cls.pieces_1, cls.pieces_2))
+    if symmetric:
+        white = int(_white_classes(cls.pieces_1)[0][block])
+    else:
+        white = unrank_subset(block, cls.pieces_1)
+    black = expand(unrank_subset(inner, cls.pieces_2), FULL ^ white)
+    return pack(white, black, cls.to_place_1, cls.to_place_2, cls.player)
+
+
+def rank_keys(keys: np.ndarray, symmetric: bool = False) -> np.ndarray:
+    """Batched rank_key, the index of every key in its class.
+
+    The keys may belong to different classes, see position_classes.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    white = (keys & np.uint64(FULL)).astype(np.int64)
+    black = (keys >> np.uint64(24) & np.uint64(FULL)).astype(np.int64)
+    pieces_1, pieces_2 = popcounts(white), popcounts(black)
+    blacks = BINOM[CELLS - pieces_1, pieces_2]
+    if not symmetric:
+        return rank_subsets(white) * blacks + rank_subsets(
+            compress_batch(black, FULL ^ white)
+        )
+    indices = np.empty(len(keys), dtype=np.int64)
+    white_ranks = rank_subsets(white)
+    for k in np.unique(pieces_1):
+        rows = np.flatnonzero(pieces_1 == k)
+        representatives, classes = _white_classes(int(k))
+        c = classes[white_ranks[rows]].astype(np.int64)
+        canonical = representatives[c]
+        best = np.full(len(rows), np.iinfo(np.int64).max)
+        for t in range(NUM_SYMMETRIES):
+            match = transform_masks(white[rows], t) == canonical
+            ranks = rank_subsets(
+                compress_batch(transform_masks(black[rows], t), FULL ^ canonical)
+            )
+            best = np.where(match, np.minimum(best, ranks), best)
+        indices[rows] = c * blacks[rows] + best
+    return indices
+
+
+def unrank_keys(
+    cls: PositionClass, indices: np.ndarray, symmetric: bool = False
+) -> np.ndarray:
+    """Batched unrank_key for indices of one class."""
+    blocks, inner = np.divmod(
+        np.asarray(indices, dtype=np.int64),
+        comb(CELLS - cls.pieces_1, cls.pieces_2),
+    )
+    if symmetric:
+        white = _white_classes(cls.pieces_1)[0][blocks]
+    else:
+        white = unrank_subsets(blocks, cls.pieces_1)
+    black = expand_batch(unrank_subsets(inner, cls.pieces_2), FULL ^ white)
+    extra = pack(0, 0, cls.to_place_1, cls.to_place_2, cls.player)
+    return (
+        white.astype(np.uint64)
+        | black.astype(np.uint64) << np.uint64(24)
+        | np.uint64(extra)
+    )
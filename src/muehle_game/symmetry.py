@@ -0,0 +1,150 @@
+"""The 16 symmetries of the Muehle board.
+
+Every symmetry is a rotation by a multiple of 90 degrees, optionally followed
+by a mirror and optionally by swapping the inner and outer ring. Transform
+``k = 8 * swap + 4 * mirror + rotation``, transform 0 is the identity.
+
+CELL_PERMS[k, i] is the cell that cell i is mapped to, ACTION_PERMS[k, a] the
+ActionMapper index that action a is mapped to (source 24 stays 24).
+"""
+
+import numpy as np
+
+from .batch import NO_SOURCE, NUM_ACTIONS
+from .bitboard import BIT, CELLS
+from .packing import pack
+
+# (ring, x, y) of every cell, ring 0 is the outer ring
+# fmt: off
+_COORDS = [
+    (0, -1, 1), (0, 0, 1), (0, 1, 1),
+    (1, -1, 1), (1, 0, 1), (1, 1, 1),
+    (2, -1, 1), (2, 0, 1), (2, 1, 1),
+    (0, -1, 0), (1, -1, 0), (2, -1, 0), (2, 1, 0), (1, 1, 0), (0, 1, 0),
+    (2, -1, -1), (2, 0, -1), (2, 1, -1),
+    (1, -1, -1), (1, 0, -1), (1, 1, -1),
+    (0, -1, -1), (0, 0, -1), (0, 1, -1),
+]
+# fmt: on
+
+NUM_SYMMETRIES = 16
+
+
+def _transform(k: int, ring: int, x: int, y: int) -> tuple[int, int, int]:
+    for _ in range(k % 4):
+        x, y = y, -x
+    if k // 4 % 2:
+        x = -x
+    if k // 8:
+        ring = 2 - ring
+    return ring, x, y
+
+
+def _cell_perms() -> np.ndarray:
+    index = {coords: cell for cell, coords in enumerate(_COORDS)}
+    return np.array(
+        [
+            [index[_transform(k, *coords)] for coords in _COORDS]
+            for k in range(NUM_SYMMETRIES)
+        ],
+        dtype=np.intp,
+    )
+
+
+CELL_PERMS = _cell_perms()
+"(16, 24) image of every cell under every transform."
+
+CELL_INVERSE_PERMS = np.argsort(CELL_PERMS, axis=1)
+"(16, 24) inverse of CELL_PERMS, board[CELL_INVERSE_PERMS[k]] is the transformed board."
+
+INVERSE = np.array(
+    [
+        next(j for j in range(NUM_SYMMETRIES) if (CELL_PERMS[j] == inv).all())
+        for inv in CELL_INVERSE_PERMS
+    ],
+    dtype=np.intp,
+)
+"Index of the inverse of every transform."
+
+
+def _action_perms() -> np.ndarray:
+    sources = np.concatenate(
+        [CELL_PERMS, np.full((NUM_SYMMETRIES, 1), NO_SOURCE)], axis=1
+    )
+    perms = sources[:, :, None] * CELLS + CELL_PERMS[:, None, :]
+    return perms.reshape(NUM_SYMMETRIES, NUM_ACTIONS)
+
+
+ACTION_PERMS = _action_perms()
+"(16, 600) image of every action index under every transform."
+
+ACTION_INVERSE_PERMS = np.argsort(ACTION_PERMS, axis=1)
+"(16, 600) inverse of ACTION_PERMS, mask[ACTION_INVERSE_PERMS[k]] is the transformed mask."
+
+
+def _byte_tables(perm: np.ndarray) -> tuple[tuple[int, ...], ...]:
+    tables = []
+    for k in range(3):
+        table = []
+        for byte in range(256):
+            mask = 0
+            for i in range(8):
+                if byte >> i & 1:
+                    mask |= BIT[perm[8 * k + i]]
+            table.append(mask)
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+_BYTE_TABLES = tuple(_byte_tables(perm) for perm in CELL_PERMS)
+_BYTE_ARRAYS = np.array(_BYTE_TABLES, dtype=np.int64)
+
+
+def transform_mask(mask: int, k: int) -> int:
+    """Applies transform k to a 24 bit mask."""
+    t0, t1, t2 = _BYTE_TABLES[k]
+    return t0[mask & 0xFF] | t1[mask >> 8 & 0xFF] | t2[mask >> 16]
+
+
+def transform_masks(masks: np.ndarray, k: int) -> np.ndarray:
+    """Batched transform_mask for an array of 24 bit masks."""
+    masks = np.asarray(masks, dtype=np.int64)
+    t0, t1, t2 = _BYTE_ARRAYS[k]
+    return t0[masks & 0xFF] | t1[masks >> 8 & 0xFF] | t2[masks >> 16 & 0xFF]
+
+
+def transform_cell(cell: int | None, k: int) -> int | None:
+    """Applies transform k to a cell index, None stays None."""
+    return None if cell is None else int(CELL_PERMS[k, cell])
+
+
+def transform_board(board: np.ndarray, k: int) -> np.ndarray:
+    """Applies transform k to a (..., 24) board array."""
+    return board[..., CELL_INVERSE_PERMS[k]]
+
+
+def canonical_key(game) -> tuple[int, int]:
+    """Returns the canonical key of a position and the transform producing it.
+
+    The key is the smallest Muehle.to_key() over all 16 symmetries, so
+    symmetric positions share the same key.
+
+    Returns:
+        A tuple (key, k) where transform k maps the game to the canonical form.
+    """
+    white = game.bits[1]
+    black = game.bits[-1]
+    best = -1
+    best_k = 0
+    for k, (t0, t1, t2) in enumerate(_BYTE_TABLES):
+        board = (
+            (t0[black & 0xFF] | t1[black >> 8 & 0xFF] | t2[black >> 16]) << 24
+            | t0[white & 0xFF]
+            | t1[white >> 8 & 0xFF]
+            | t2[white >> 16]
+        )
+        if best < 0 or board < best:
+            best = board
+            best_k = k
+    extra = pack(0, 0, game.to_place[1], game.to_place[-1], game.player)
+    return best | extra, best_k
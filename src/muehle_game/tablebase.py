@@ -0,0 +1,476 @@
+"""Endgame tablebases for the moving and jumping phase.
+
+The tables are solved by retrograde analysis and hold the game-theoretic
+result of every position where both players have placed all pieces, with 3
+to max_pieces pieces each, together with the distance to the end of the
+game in turns (plies) under optimal play: the winner takes the shortest
+way, the loser the longest. Repetition and no-capture draws are not part of
+the tables.
+
+A table holds the positions with m pieces of the player to move and o
+pieces of the opponent, one byte per position (see encode), at a dense
+index: the rank of the opponent's cells, then the rank of the own cells
+among the remaining free cells (see ranking). The tables are plain files
+that Tablebase maps into memory, so a probe is one index computation and
+one byte read.
+
+    python -m muehle_game.tablebase --pieces 4 --output tablebases
+
+3 against 3 is always a truce (see Muehle), larger tables are solved in
+order of the number of pieces, since a removal leads into a smaller table.
+"""
+
+import argparse
+import os
+import time
+from math import comb
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from .bitboard import ADJACENT, CELLS, FULL, MILL_MASKS, MILLS, MILLS_AT
+from .game import Muehle, Turn
+from .ranking import (
+    compress,
+    compress_batch,
+    expand_batch,
+    popcounts,
+    rank_subset,
+    rank_subsets,
+    unrank_subsets,
+)
+
+WIN, DRAW, LOSS = 1, 0, -1
+"Results from the view of the player to move."
+
+LOSS_BASE = 128
+"Byte of a loss in 0 turns, a win in d turns is stored as 1 + d."
+MAX_DISTANCE = 126
+
+_UNSOLVABLE = 255
+"Remaining moves of a position that can not be lost, it can draw by a removal."
+
+_EDGES = [(s, t) for s in range(CELLS) for t in range(CELLS) if ADJACENT[s] >> t & 1]
+"(from, to) of every move along a line."
+
+
+class Probe(NamedTuple):
+    value: int
+    "WIN, DRAW or LOSS for the player to move."
+    distance: int
+    "Turns until the game ends, 0 for draws."
+
+
+def encode(value: int, distance: int) -> int:
+    """Byte of a result, see LOSS_BASE."""
+    if value == WIN:
+        return 1 + distance
+    if value == LOSS:
+        return LOSS_BASE + distance
+    return 0
+
+
+def decode(code: int) -> Probe:
+    """Inverse of encode."""
+    if code == 0:
+        return Probe(DRAW, 0)
+    if code < LOSS_BASE:
+        return Probe(WIN, code - 1)
+    return Probe(LOSS, code - LOSS_BASE)
+
+
+def table_size(m: int, o: int) -> int:
+    """Positions with m pieces of the player to move and o of the opponent."""
+    return comb(CELLS, o) * comb(CELLS - o, m)
+
+
+def table_path(directory: str | Path, m: int, o: int) -> Path:
+    return Path(directory) / f"endgame_{m}_{o}.bin"
+
+
+def position_index(own: int, opp: int) -> int:
+    """Index of a position in its table, see the module docstring."""
+    m, o = own.bit_count(), opp.bit_count()
+    return rank_subset(opp) * comb(CELLS - o, m) + rank_subset(
+        compress(own, FULL ^ opp)
+    )
+
+
+def position_indices(own: np.ndarray, opp: np.ndarray, m: int, o: int) -> np.ndarray:
+    """Batched position_index for positions of one table."""
+    return rank_subsets(opp) * comb(CELLS - o, m) + rank_subsets(
+        compress_batch(own, FULL ^ np.asarray(opp, dtype=np.int64))
+    )
+
+
+def positions(indices: np.ndarray, m: int, o: int) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse of position_indices, returns the own and the opponent's masks."""
+    block, inner = np.divmod(np.asarray(indices, dtype=np.int64), comb(CELLS - o, m))
+    opp = unrank_subsets(block, o)
+    return expand_batch(unrank_subsets(inner, m), FULL ^ opp), opp
+
+
+_NEIGHBOURS = np.array(
+    [
+        [
+            (
+                np.bitwise_or.reduce(
+                    [ADJACENT[8 * k + i] for i in range(8) if b >> i & 1]
+                )
+                if b
+                else 0
+            )
+            for b in range(256)
+        ]
+        for k in range(3)
+    ],
+    dtype=np.int64,
+)
+
+
+def _neighbours(masks: np.ndarray) -> np.ndarray:
+    return (
+        _NEIGHBOURS[0, masks & 0xFF]
+        | _NEIGHBOURS[1, masks >> 8 & 0xFF]
+        | _NEIGHBOURS[2, masks >> 16]
+    )
+
+
+def _closed_mills(masks: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(masks)
+    for mill in MILL_MASKS:
+        out |= np.where(masks & mill == mill, mill, 0)
+    return out
+
+
+def _bit(masks: np.ndarray, cell) -> np.ndarray:
+    return (masks >> cell & 1).astype(bool)
+
+
+def _initialize(
+    m: int,
+    o: int,
+    indices: np.ndarray,
+    solved: dict[tuple[int, int], np.ndarray],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Terminal positions, removals and the number of other moves of a chunk.
+
+    Returns:
+        The result bytes (0 where still open), the number of moves without a
+        removal (_UNSOLVABLE if a removal draws) and the least distance of a
+        loss, from removals that lose.
+    """
+    own, opp = positions(indices, m, o)
+    n = len(indices)
+    empty = FULL ^ (own | opp)
+    result = np.zeros(n, dtype=np.uint8)
+    if m > 3:
+        result[_neighbours(own) & empty == 0] = encode(LOSS, 0)
+    if o > 3:
+        result[(result == 0) & (_neighbours(opp) & empty == 0)] = encode(WIN, 0)
+    open_ = result == 0
+
+    # moves without a removal are counted, moves that close a mill collected
+    rows, mills = [], []
+    if m == 3:
+        moves = 3 * popcounts(empty)
+        for mill in MILLS:
+            for t in mill:
+                pair = sum(1 << c for c in mill if c != t)
+                closing = open_ & (own & pair == pair) & _bit(empty, t)
+                moves -= closing
+                rows.append(np.flatnonzero(closing))
+                mills.append(np.full(len(rows[-1]), pair | 1 << t))
+    else:
+        moves = np.zeros(n, dtype=np.int64)
+        for s, t in _EDGES:
+            valid = open_ & _bit(own, s) & _bit(empty, t)
+            after = own ^ (1 << s | 1 << t)
+            closing = np.zeros(n, dtype=bool)
+            for mill in MILLS_AT[t]:
+                closing |= after & mill == mill
+            moves += valid & ~closing
+            rows.append(np.flatnonzero(valid & closing))
+            mills.append(after[rows[-1]])
+    count = np.minimum(moves, _UNSOLVABLE - 1).astype(np.uint8)
+
+    least_loss = np.zeros(n, dtype=np.uint8)
+    rows = np.concatenate(rows)
+    after = np.concatenate(mills)
+    if len(rows):
+        best_win = np.full(n, _UNSOLVABLE, dtype=np.int64)
+        if o == 3:
+            best_win[rows] = 1
+        else:
+            victims = opp[rows]
+            free = victims & ~_closed_mills(victims)
+            removable = np.where(free != 0, free, victims)
+            for r in range(CELLS):
+                sel = np.flatnonzero(_bit(removable, r))
+                if not len(sel):
+                    continue
+                target = rows[sel]
+                if (o - 1, m) == (3, 3):
+                    count[target] = _UNSOLVABLE
+                    continue
+                codes = solved[(o - 1, m)][
+                    position_indices(victims[sel] ^ (1 << r), after[sel], o - 1, m)
+                ].astype(np.int64)
+                draws = codes == 0
+                count[target[draws]] = _UNSOLVABLE
+                losses = codes >= LOSS_BASE
+                np.minimum.at(best_win, target[losses], codes[losses] - LOSS_BASE + 1)
+                wins = ~draws & ~losses
+                np.maximum.at(least_loss, target[wins], codes[wins])
+        won = open_ & (best_win != _UNSOLVABLE)
+        result[won] = 1 + best_win[won]
+    lost = (result == 0) & open_ & (count == 0)
+    result[lost] = LOSS_BASE + least_loss[lost]
+    return result, count, least_loss
+
+
+def _predecessors(own: np.ndarray, opp: np.ndarray, m: int, o: int) -> np.ndarray:
+    """Indices in table (o, m) of the positions that move into the given ones.
+
+    The opponent moved last, without closing a mill.
+    """
+    free = FULL ^ own
+    base = rank_subsets(own) * comb(CELLS - m, o)
+    packed = compress_batch(opp, free)
+    closed = _closed_mills(opp)
+    empty = free ^ opp
+    out = []
+    if o == 3:
+        rest = opp.copy()
+        for _ in range(3):
+            t = rest & -rest
+            rest ^= t
+            valid_t = t & closed == 0
+            packed_t = np.int64(1) << popcounts(free & (t - 1))
+            for s in range(CELLS - m):
+                valid = valid_t & (packed >> s & 1 == 0)
+                moved = packed[valid] ^ packed_t[valid] ^ (1 << s)
+                out.append(base[valid] + rank_subsets(moved))
+    else:
+        for s, t in _EDGES:
+            valid = _bit(opp, t) & _bit(empty, s) & ~_bit(closed, t)
+            if not valid.any():
+                continue
+            f = free[valid]
+            moved = (
+                packed[valid]
+                ^ np.int64(1) << popcounts(f & ((1 << t) - 1))
+                ^ np.int64(1) << popcounts(f & ((1 << s) - 1))
+            )
+            out.append(base[valid] + rank_subsets(moved))
+    return np.concatenate(out) if out else np.zeros(0, dtype=np.int64)
+
+
+def solve(
+    group: list[tuple[int, int]],
+    solved: dict[tuple[int, int], np.ndarray],
+    chunk_size: int = 1 << 18,
+    log: Callable[[str], None] = lambda message: None,
+) -> dict[tuple[int, int], np.ndarray]:
+    """Solves the tables of group, which must contain (o, m) for every (m, o).
+
+    Args:
+        group: Tables with the same total number of pieces.
+        solved: Result bytes of the tables with one piece less.
+        chunk_size: Positions handled at once, bounds the memory of the
+            temporary arrays.
+        log: Receives progress messages.
+
+    Returns:
+        The result bytes of every table of group.
+    """
+    if group == [(3, 3)]:
+        return {(3, 3): np.zeros(table_size(3, 3), dtype=np.uint8)}
+
+    results, counts, least_losses = {}, {}, {}
+    for m, o in group:
+        size = table_size(m, o)
+        results[m, o] = np.empty(size, dtype=np.uint8)
+        counts[m, o] = np.empty(size, dtype=np.uint8)
+        least_losses[m, o] = np.empty(size, dtype=np.uint8)
+        for start in range(0, size, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, size))
+            chunk = _initialize(m, o, indices, solved)
+            results[m, o][indices] = chunk[0]
+            counts[m, o][indices] = chunk[1]
+            least_losses[m, o][indices] = chunk[2]
+        log(f"{m}v{o}: {size} positions initialized")
+
+    frontier_size = max(1, chunk_size // 64)
+    for level in range(MAX_DISTANCE):
+        for m, o in group:
+            partner = results[o, m]
+            count = counts[o, m]
+            least_loss = least_losses[o, m]
+            result = results[m, o]
+            for code in (encode(LOSS, level), encode(WIN, level)):
+                frontier = np.flatnonzero(result == code)
+                for start in range(0, len(frontier), frontier_size):
+                    own, opp = positions(frontier[start : start + frontier_size], m, o)
+                    before = _predecessors(own, opp, m, o)
+                    codes = partner[before]
+                    if code >= LOSS_BASE:
+                        # one move into a lost position wins
+                        better = (codes == 0) | (
+                            (codes > 2 + level) & (codes < LOSS_BASE)
+                        )
+                        partner[before[better]] = encode(WIN, level + 1)
+                        continue
+                    # a move into a won position is one less way out
+                    before = before[(codes == 0) & (count[before] != _UNSOLVABLE)]
+                    before, times = np.unique(before, return_counts=True)
+                    count[before] -= times.astype(np.uint8)
+                    lost = before[count[before] == 0]
+                    partner[lost] = LOSS_BASE + np.maximum(level + 1, least_loss[lost])
+        # results of later levels are all set before they are needed
+        if not any(
+            ((r > 1 + level) & (r < LOSS_BASE)).any() or (r > LOSS_BASE + level).any()
+            for r in results.values()
+        ):
+            break
+    else:
+        raise ValueError(f"Distances beyond {MAX_DISTANCE} do not fit the tables")
+
+    for (m, o), result in results.items():
+        wins = int(((result > 0) & (result < LOSS_BASE)).sum())
+        losses = int((result >= LOSS_BASE).sum())
+        log(
+            f"{m}v{o}: {wins} wins, {losses} losses, "
+            f"{len(result) - wins - losses} draws, longest {level} turns"
+        )
+    return results
+
+
+def generate(
+    directory: str | Path,
+    max_pieces: int = 4,
+    chunk_size: int = 1 << 18,
+    log: Callable[[str], None] = lambda message: None,
+) -> list[Path]:
+    """Solves and writes all tables with 3 to max_pieces pieces per player.
+
+    Tables that already exist in directory are loaded instead of solved.
+
+    Returns:
+        The paths of the tables.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    solved: dict[tuple[int, int], np.ndarray] = {}
+    paths = []
+    for total in range(6, 2 * max_pieces + 1):
+        group = [
+            (m, total - m)
+            for m in range(3, max_pieces + 1)
+            if 3 <= total - m <= max_pieces
+        ]
+        missing = [key for key in group if not table_path(directory, *key).exists()]
+        if missing:
+            start = time.perf_counter()
+            for key, result in solve(group, solved, chunk_size, log).items():
+                path = table_path(directory, *key)
+                tmp = path.with_suffix(".tmp")
+                result.tofile(tmp)
+                os.replace(tmp, path)
+            log(f"{group} solved in {time.perf_counter() - start:.1f}s")
+        for key in group:
+            path = table_path(directory, *key)
+            solved[key] = np.memmap(path, dtype=np.uint8, mode="r")
+            paths.append(path)
+    return paths
+
+
+class Tablebase:
+    """Read access to the tables in a directory, see generate."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._tables: dict[tuple[int, int], Optional[np.ndarray]] = {}
+
+    def _table(self, m: int, o: int) -> Optional[np.ndarray]:
+        if (m, o) not in self._tables:
+            path = table_path(self.directory, m, o)
+            table = None
+            if path.exists():
+                table = np.memmap(path, dtype=np.uint8, mode="r")
+                if len(table) != table_size(m, o):
+                    raise ValueError(f"{path} has the wrong size")
+            self._tables[m, o] = table
+        return self._tables[m, o]
+
+    def probe(self, game: Muehle) -> Optional[Probe]:
+        """Result of the position for the player to move, None if not in a table."""
+        p = game.player
+        if game.to_place[1] or game.to_place[-1]:
+            return None
+        own, opp = game.bits[p], game.bits[-p]
+        m, o = own.bit_count(), opp.bit_count()
+        if m < 3 or o < 3:
+            return None
+        table = self._table(m, o)
+        if table is None:
+            return None
+        return decode(int(table[position_index(own, opp)]))
+
+    def best_turn(self, game: Muehle) -> Optional[Turn]:
+        """A turn that keeps the best result, None if the position is not covered.
+
+        Wins are played in the fewest turns, losses dragged out the longest.
+        """
+        if self.probe(game) is None:
+            return None
+        p = game.player
+        best, best_key = None, None
+        for turn in game.generate_turns():
+            game.push(turn)
+            try:
+                if game.is_terminal():
+                    winner = game.done()
+                    value, distance = winner * p, 0
+                else:
+                    reply = self.probe(game)
+                    if reply is None:
+                        return None
+                    value, distance = -reply.value, reply.distance
+            finally:
+                game.pop()
+            key = (value, -distance if value == WIN else distance)
+            if best_key is None or key > best_key:
+                best, best_key = turn, key
+        return best
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Solves the Muehle endgames by retrograde analysis."
+    )
+    parser.add_argument(
+        "--pieces", type=int, default=4, help="Largest number of pieces per player."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("tablebases"), help="Table directory."
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1 << 18,
+        help="Positions handled at once, lower it to save memory.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    paths = generate(args.output, args.pieces, args.chunk_size, log=print)
+    print(f"{len(paths)} tables in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Zobrist keys for Muehle positions.
+
+The hash of a position is the XOR of the keys of all pieces on the board, the
+keys of both to_place counters and SIDE if player -1 is to move. The keys are
+generated from a fixed seed, so hashes are stable across processes and runs.
+"""
+
+import random
+
+from .bitboard import CELLS, iter_bits
+
+_rng = random.Random(0x4D75656865)
+
+PIECE: dict[int, tuple[int, ...]] = {
+    1: tuple(_rng.getrandbits(64) for _ in range(CELLS)),
+    -1: tuple(_rng.getrandbits(64) for _ in range(CELLS)),
+}
+"Key of a piece of a player on every cell."
+
+TO_PLACE: dict[int, tuple[int, ...]] = {
+    1: tuple(_rng.getrandbits(64) for _ in range(10)),
+    -1: tuple(_rng.getrandbits(64) for _ in range(10)),
+}
+"Key of every to_place count (0-9) of a player."
+
+SIDE: int = _rng.getrandbits(64)
+"Key that is added when player -1 is to move."
+
+
+def board_hash(bits: dict[int, int]) -> int:
+    """Hash of the pieces on the board only."""
+    h = 0
+    for player in (1, -1):
+        keys = PIECE[player]
+        for cell in iter_bits(bits[player]):
+            h ^= keys[cell]
+    return h
@@ -1,5 +1,11 @@
+from ai.alphabeta import AlphaBetaAgent
+from ai.book import OpeningBook
+from ai.mcts import MCTSAgent
 from ai.play import load_model
+from ai.smp import ParallelAlphaBetaAgent
+from ai.ttable import TranspositionTable
 from imagedetection.detector import Detector
+from muehle_game.tablebase import Tablebase
 from piecewalker.ned2 import Ned2
 from runtime import game_loop
 from imagedetection.detector import Detector
@@ -14,6 +20,39 @@ if __name__ == "__main__":
     args = parse_args()
     ned2 = Ned2()
     ai = load_model(args.model_play)
+    tablebase = Tablebase(args.tablebase) if args.tablebase is not None else None
+    ai.tablebase = tablebase
+    book = OpeningBook.open(args.book) if args.book is not None else None
+    ai.book = book
+    if args.alphabeta_time is not None and args.search_workers > 0:
+        ai = ParallelAlphaBetaAgent(
+            ai.model,
+            workers=args.search_workers,
+            time_limit=args.alphabeta_time,
+            table_file=args.table_file,
+            book=book,
+            tablebase=tablebase,
+        )
+    elif args.alphabeta_time is not None:
+        ai = AlphaBetaAgent(
+            ai.model,
+            time_limit=args.alphabeta_time,
+            table=(
+                TranspositionTable.open(args.table_file)
+                if args.table_file is not None
+                else None
+            ),
+            book=book,
+            tablebase=tablebase,
+        )
+    elif args.mcts_simulations is not None or args.mcts_time is not None:
+        ai = MCTSAgent(
+            ai.model,
+            simulations=args.mcts_simulations,
+            time_limit=args.mcts_time,
+            book=book,
+            tablebase=tablebase,
+        )
     detector = Detector(
         board_indices_csv="assets/indices/board_indices.csv",
         board_model_path="assets/models/board_best.pt",
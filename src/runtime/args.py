@@ -1,8 +1,9 @@
 import argparse
 from pathlib import Path
+from typing import Optional
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Runs the robo-muehle project.")
 
     # For calibration/__main__
@@ -27,6 +28,48 @@ def parse_args() -> argparse.Namespace:
         required=True,
         type=Path,
     )
+    parser.add_argument(
+        "--mcts-simulations",
+        default=None,
+        type=int,
+        help="Search every turn with MCTS, with this many simulations.",
+    )
+    parser.add_argument(
+        "--mcts-time",
+        default=None,
+        type=float,
+        help="Search every turn with MCTS for this many seconds.",
+    )
+    parser.add_argument(
+        "--alphabeta-time",
+        default=None,
+        type=float,
+        help="Search every turn with iterative-deepening alpha-beta for this many seconds.",
+    )
+    parser.add_argument(
+        "--search-workers",
+        default=0,
+        type=int,
+        help="Helper processes for the alpha-beta search (lazy SMP).",
+    )
+    parser.add_argument(
+        "--table-file",
+        default=None,
+        type=Path,
+        help="Transposition table file of the alpha-beta search, kept across turns, games and runs.",
+    )
+    parser.add_argument(
+        "--tablebase",
+        default=None,
+        type=Path,
+        help="Endgame table directory (python -m muehle_game.tablebase), covered positions are played from it instead of the policy or search.",
+    )
+    parser.add_argument(
+        "--book",
+        default=None,
+        type=Path,
+        help="Opening book file (python -m ai.book), its turns are played without inference or search.",
+    )
     parser.add_argument(
         "--human-start",
         default=True,
@@ -38,4 +81,13 @@ def parse_args() -> argparse.Namespace:
         type=bool,
     )
 
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.mcts_simulations is not None or args.mcts_time is not None:
+        from ai.export import is_exported
+
+        if is_exported(args.model_play):
+            parser.error(
+                f"MCTS needs the value head, --model-play {args.model_play} is "
+                "an exported policy without it, use its state dict or checkpoint"
+            )
+    return args
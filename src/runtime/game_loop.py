@@ -1,3 +1,6 @@
+from ai.alphabeta import AlphaBetaAgent
+from ai.mcts import MCTSAgent
+from ai.smp import ParallelAlphaBetaAgent
 from ai.train import SelfPlayAgent
 from imagedetection.detector import Detector
 from muehle_game import Muehle
@@ -7,7 +10,7 @@ from piecewalker.ned2 import Ned2
 def run_game_loop(
     robot: Ned2,
     detector: Detector,
-    ai: SelfPlayAgent,
+    ai: SelfPlayAgent | MCTSAgent | AlphaBetaAgent | ParallelAlphaBetaAgent,
     human_start: bool,
     robot_only=False,
 ):
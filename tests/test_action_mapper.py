@@ -0,0 +1,56 @@
+import numpy as np
+
+from ai.train import ActionMapper
+from muehle_game import Muehle
+
+
+def _expected_mask(game: Muehle, removal_pending: bool) -> np.ndarray:
+    mask = np.zeros(ActionMapper.TOTAL_ACTIONS, dtype=bool)
+    if removal_pending:
+        for target in range(24):
+            mask[ActionMapper.to_index(24, target)] = game.can_remove(
+                target, game.player
+            )
+        return mask
+    for source, target, _ in game.generate_turns():
+        mask[ActionMapper.to_index(24 if source is None else source, target)] = True
+    return mask
+
+
+def _positions(count: int) -> list[tuple[Muehle, bool]]:
+    rng = np.random.default_rng(0)
+    positions = []
+    while len(positions) < count:
+        game = Muehle(no_capture_limit=60)
+        while not game.is_terminal():
+            turns = list(game.generate_turns())
+            source, target, remove = turns[rng.integers(len(turns))]
+            positions.append((game.clone(), False))
+            if remove is not None:
+                game.push((source, target, None))
+                positions.append((game.clone(), True))
+                game.pop()
+            game.push((source, target, remove))
+    return positions
+
+
+def test_get_legal_mask_matches_turns():
+    for game, removal_pending in _positions(1000):
+        mask = ActionMapper.get_legal_mask(game, game.player, removal_pending)
+        assert np.array_equal(mask, _expected_mask(game, removal_pending))
+
+
+def test_get_legal_masks_matches_single():
+    positions = _positions(500)
+    boards = np.stack([game.board for game, _ in positions])
+    to_place = {
+        p: np.array([game.to_place[p] for game, _ in positions]) for p in (1, -1)
+    }
+    players = np.array([game.player for game, _ in positions])
+    pending = np.array([removal_pending for _, removal_pending in positions])
+
+    masks = ActionMapper.get_legal_masks(boards, to_place, players, pending)
+    assert masks.shape == (len(positions), ActionMapper.TOTAL_ACTIONS)
+    for mask, (game, removal_pending) in zip(masks, positions):
+        expected = ActionMapper.get_legal_mask(game, game.player, removal_pending)
+        assert np.array_equal(mask, expected)
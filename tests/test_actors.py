@@ -0,0 +1,46 @@
+import numpy as np
+import torch
+
+from ai.actors import ActorPool, pack_trajectory, unpack_trajectory
+from ai.buffer import _FIELDS
+from ai.policy import ThePolicy
+from ai.train import SelfPlayTrainer
+
+
+def test_pack_trajectory_roundtrip():
+    torch.manual_seed(0)
+    trainer = SelfPlayTrainer(ThePolicy(), device=torch.device("cpu"))
+    trajectory, _ = trainer.collect_episode()
+    restored = unpack_trajectory(pack_trajectory(trajectory))
+    assert len(restored) == len(trajectory)
+    assert restored.episode_ends == trajectory.episode_ends == [len(trajectory)]
+    n = len(trajectory)
+    for name in _FIELDS:
+        assert np.array_equal(
+            getattr(restored, name)[:n], getattr(trajectory, name)[:n]
+        )
+
+
+def test_actor_pool_plays_and_receives_weights():
+    model = ThePolicy()
+    with ActorPool(model, num_workers=2, timeout=120) as pool:
+        pool.request(2, temperature=1.0, epsilon=0.5)
+        episodes = [pool.next_episode() for _ in range(2)]
+        assert pool.pending == 0
+        for trajectory, winner in episodes:
+            assert len(trajectory) and trajectory.num_episodes == 1
+            assert winner in (1, -1, 0)
+            batch = trajectory.tensors()
+            assert batch["legal_mask"].gather(1, batch["action_idx"][:, None]).all()
+
+        with torch.no_grad():
+            for param in model.parameters():
+                param.add_(1.0)
+        pool.broadcast(model)
+        assert pool._version.value == 1
+        for name, tensor in pool._shared.state_dict().items():
+            assert torch.equal(tensor, model.state_dict()[name])
+
+        pool.request(1)
+        trajectory, _ = pool.next_episode()
+        assert len(trajectory)
@@ -0,0 +1,178 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from ai.alphabeta import MATE, AlphaBetaAgent, evaluate
+from ai.arena import ArenaConfig, RandomAgent, make_agent, play_game
+from ai.policy import ThePolicy
+from ai.ttable import (
+    EXACT,
+    LOWER,
+    UPPER,
+    TranspositionTable,
+    pack_turn,
+    unpack_turn,
+)
+from muehle_game import Muehle
+from muehle_game.bitboard import BIT
+from muehle_game.game import REPETITION_LIMIT
+from muehle_game.packing import pack
+
+
+def _openings(count: int, turns: int) -> list[Muehle]:
+    rng = random.Random(2)
+    games = []
+    for _ in range(count):
+        game = Muehle()
+        for _ in range(rng.randrange(turns)):
+            game.push(rng.choice(list(game.generate_turns())))
+        games.append(game)
+    return games
+
+
+def _minimax(game: Muehle, depth: int) -> int:
+    if depth == 0:
+        return evaluate(game)
+    player = game.player
+    best = -MATE
+    for turn in game.generate_turns():
+        game.push(turn)
+        if game.is_terminal():
+            winner = game.done()
+            score = (MATE - 1) * winner * player
+        else:
+            score = -_minimax(game, depth - 1)
+        game.pop()
+        best = max(best, score)
+    return best
+
+
+def test_turn_packing_roundtrip():
+    for game in _openings(10, 16):
+        for turn in game.generate_turns():
+            assert unpack_turn(pack_turn(turn)) == turn
+
+
+def test_table_keeps_the_deeper_entry():
+    table = TranspositionTable(1000)
+    assert len(table) == 512
+    key = 0xDEADBEEF12345678
+    table.store(key, 5, EXACT, -1234, (None, 3, 7))
+    table.store(key, 2, LOWER, 99, (1, 2, None))
+    entry = table.probe(key)
+    assert (entry.depth, entry.bound, entry.score, entry.turn) == (
+        5,
+        EXACT,
+        -1234,
+        (None, 3, 7),
+    )
+    assert table.probe(key ^ 1 << 40) is None
+
+
+def test_old_generations_are_replaced_first():
+    table = TranspositionTable(2)
+    table.store(1 << 8, 9, EXACT, 1, None)
+    table.new_search()
+    table.store(2 << 8, 2, EXACT, 2, None)
+    table.store(3 << 8, 1, EXACT, 3, None)
+    assert table.probe(1 << 8) is None
+    assert table.probe(2 << 8).score == 2
+    assert table.probe(3 << 8).score == 3
+
+
+def test_table_file_persists(tmp_path):
+    path = tmp_path / "tables" / "tt.bin"
+    table = TranspositionTable.open(path, size=1000)
+    table.new_search()
+    table.store(12345, 4, UPPER, -7, (3, 4, None))
+    table.flush()
+    del table
+
+    reopened = TranspositionTable.open(path, size=1 << 16)
+    assert len(reopened) == 512
+    assert reopened.generation == 1
+    assert reopened.probe(12345) == (4, UPPER, -7, (3, 4, None))
+
+    agent = AlphaBetaAgent(time_limit=None, max_depth=2, table=reopened)
+    agent.search(Muehle())
+    assert (
+        AlphaBetaAgent(
+            time_limit=None, max_depth=1, table=TranspositionTable.open(path)
+        )
+        .table.probe(Muehle().hash)
+        .depth
+        == 2
+    )
+
+
+def test_rule_draws_stay_out_of_the_table_file(tmp_path):
+    path = tmp_path / "tt.bin"
+    key = pack(10786, 4117, 0, 0, 1)
+    game = Muehle.from_key(key, REPETITION_LIMIT)
+    # back to the start, one more time is a repetition draw
+    for turn in [(11, 6, None), (2, 14, None), (6, 11, None), (14, 2, None)]:
+        game.push(turn)
+    assert game.hash == Muehle.from_key(key).hash
+    table = TranspositionTable.open(path, size=1 << 12)
+    AlphaBetaAgent(time_limit=None, max_depth=4, table=table).search(game)
+    table.flush()
+    del table
+
+    # the same position without history must score as with an empty table
+    reused = AlphaBetaAgent(
+        time_limit=None, max_depth=4, table=TranspositionTable.open(path)
+    ).search(Muehle.from_key(key, REPETITION_LIMIT))
+    fresh = AlphaBetaAgent(time_limit=None, max_depth=4).search(
+        Muehle.from_key(key, REPETITION_LIMIT)
+    )
+    assert reused[1] == fresh[1]
+
+
+def test_rejects_foreign_table_files(tmp_path):
+    path = tmp_path / "tt.bin"
+    np.arange(64, dtype=np.uint64).tofile(path)
+    with pytest.raises(ValueError):
+        TranspositionTable.open(path)
+
+
+def test_search_score_matches_minimax():
+    for game in _openings(12, 10):
+        agent = AlphaBetaAgent(time_limit=None, max_depth=2)
+        _, score = agent.search(game)
+        assert score == _minimax(game, 2)
+
+
+def test_finds_the_winning_mill():
+    white = BIT[0] | BIT[1] | BIT[14] | BIT[19]
+    black = BIT[6] | BIT[8] | BIT[21]
+    game = Muehle.from_key(pack(white, black, 0, 0, 1))
+    agent = AlphaBetaAgent(time_limit=None, max_depth=4)
+    turn, score = agent.search(game)
+    assert turn[:2] == (14, 2)
+    assert score == MATE - 1
+
+
+def test_policy_ordering_and_time_limit():
+    torch.manual_seed(0)
+    agent = AlphaBetaAgent(ThePolicy(), time_limit=0.1, policy_depth=1)
+    game = Muehle()
+    key = game.to_key()
+    assert agent.get_complete_move(game) in set(game.generate_turns())
+    assert game.to_key() == key
+    assert agent.stats["depth"] >= 1
+    assert agent.stats["seconds"] < 1.0
+
+
+def test_beats_random():
+    agent = AlphaBetaAgent(time_limit=None, max_depth=2)
+    config = ArenaConfig(max_turns=200)
+    assert play_game(agent, RandomAgent(0), config, seed=0) == 1
+    assert play_game(RandomAgent(0), agent, config, seed=0) == -1
+
+
+def test_arena_spec():
+    agent = make_agent("alphabeta:0.05")
+    assert isinstance(agent, AlphaBetaAgent)
+    assert agent.time_limit == 0.05
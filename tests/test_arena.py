@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from ai.arena import (
+    AGENTS,
+    ArenaConfig,
+    PairResult,
+    RandomAgent,
+    fit_ratings,
+    main,
+    make_agent,
+    play_game,
+    ratings_table,
+    register_agent,
+    round_robin,
+)
+
+
+class IllegalAgent:
+    def get_complete_move(self, game):
+        return None, 99, None
+
+
+def test_illegal_turn_loses():
+    config = ArenaConfig(opening_turns=0)
+    assert play_game(IllegalAgent(), RandomAgent(0), config, seed=0) == -1
+    assert play_game(RandomAgent(0), IllegalAgent(), config, seed=0) == 1
+
+
+def test_games_end_within_max_turns():
+    config = ArenaConfig(max_turns=5)
+    for seed in range(5):
+        assert play_game(RandomAgent(seed), RandomAgent(seed), config, seed) in (
+            -1,
+            0,
+            1,
+        )
+
+
+def test_fit_ratings_recovers_elo_differences():
+    rng = np.random.default_rng(0)
+    true = np.array([0.0, 200.0, 400.0])
+    results = []
+    for a, b in [(0, 1), (0, 2), (1, 2)]:
+        p = 1 / (1 + 10 ** ((true[b] - true[a]) / 400))
+        scores = list(rng.binomial(2, p, size=4000).astype(float))
+        results.append(PairResult(a, b, scores))
+    ratings = fit_ratings(3, results, anchor=0)
+    assert ratings[0] == 0
+    assert np.allclose(ratings, true, atol=25)
+
+
+def test_round_robin_with_registered_agent(tmp_path):
+    @register_agent("test-random")
+    def _factory(arg):
+        return RandomAgent(int(arg))
+
+    try:
+        specs = ["random:1", "test-random:2", "test-random:3"]
+        results = round_robin(specs, games=4, config=ArenaConfig(max_turns=60))
+        assert len(results) == 3
+        assert all(result.games == 4 for result in results)
+        rows = ratings_table(specs, results, anchor=0, samples=20)
+        assert {row["agent"] for row in rows} == set(specs)
+        assert all(row["ci_low"] <= row["elo"] <= row["ci_high"] for row in rows)
+        assert all(
+            row["wins"] + row["draws"] + row["losses"] == row["games"] for row in rows
+        )
+
+        output = tmp_path / "ratings.csv"
+        main(
+            [
+                "random:1",
+                "test-random:2",
+                "--games",
+                "2",
+                "--workers",
+                "1",
+                "--output",
+                str(output),
+            ]
+        )
+        assert output.read_text().startswith("agent,elo,ci_low,ci_high")
+    finally:
+        del AGENTS["test-random"]
+
+
+def test_make_agent_rejects_unknown_spec():
+    with pytest.raises(ValueError):
+        make_agent("does-not-exist")
+
+
+def test_unknown_anchor_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["random", "random:1", "--anchor", "mcts"])
+    assert exit_info.value.code == 2
+    assert "--anchor 'mcts' is not one of the agents" in capsys.readouterr().err
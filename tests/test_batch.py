@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from ai.train import ActionMapper
+from muehle_game import Muehle, MuehleBatch
+
+
+def _play(game: Muehle, action: int, removal_pending: bool) -> bool:
+    """Plays an action on a single game, returns if a removal is pending."""
+    source, target = ActionMapper.from_index(action)
+    if removal_pending:
+        game.remove_piece(target)
+        return False
+    return game.move(None if source == 24 else source, target) == "remove"
+
+
+def test_initial_legal_mask():
+    batch = MuehleBatch(3)
+    mask = batch.legal_mask()
+    assert mask.shape == (3, 600)
+    assert mask.sum(axis=1).tolist() == [24, 24, 24]
+    assert mask[:, 24 * 24 :].all()
+
+
+def test_matches_single_games():
+    rng = np.random.default_rng(0)
+    n = 16
+    batch = MuehleBatch(n)
+    games = [Muehle(repetition_limit=None) for _ in range(n)]
+    pending = [False] * n
+    finished = 0
+
+    for _ in range(400):
+        mask = batch.legal_mask()
+        for i, game in enumerate(games):
+            expected = ActionMapper.get_legal_mask(game, game.player, pending[i])
+            assert np.array_equal(mask[i], expected)
+            assert np.array_equal(batch.board[i], game.board)
+            assert batch.player[i] == game.player
+
+        actions = np.array([rng.choice(np.flatnonzero(row)) for row in mask])
+        done, winner = batch.step(actions)
+
+        for i, game in enumerate(games):
+            pending[i] = _play(game, int(actions[i]), pending[i])
+            if pending[i] and not game.is_terminal():
+                continue
+            assert done[i] == game.is_terminal()
+            if done[i]:
+                assert winner[i] == game.done()
+                games[i] = Muehle(repetition_limit=None)
+                pending[i] = False
+                finished += 1
+    assert finished > 0
+
+
+def test_step_rejects_illegal_action():
+    batch = MuehleBatch(2)
+    batch.step(np.array([24 * 24 + 0, 24 * 24 + 1]))
+    with pytest.raises(ValueError):
+        batch.step(np.array([24 * 24 + 0, 24 * 24 + 2]))
+    assert batch.board[:, :3].tolist() == [[1, 0, 0], [0, 1, 0]]
@@ -0,0 +1,26 @@
+from collections import Counter
+
+from muehle_game.bitboard import ADJACENT, BIT, CELLS, MILLS, VALID_MOVES
+
+
+def test_adjacency_is_symmetric():
+    for cell, targets in VALID_MOVES.items():
+        for target in targets:
+            assert cell in VALID_MOVES[target], (cell, target)
+
+
+def test_every_point_has_the_degree_of_the_board():
+    degrees = Counter(len(VALID_MOVES[cell]) for cell in range(CELLS))
+    # corners, middles of the inner and outer ring, middles of the middle ring
+    assert degrees == {2: 12, 3: 8, 4: 4}
+    crossings = [cell for cell in range(CELLS) if len(VALID_MOVES[cell]) == 4]
+    assert crossings == [4, 10, 13, 19]
+
+
+def test_adjacency_follows_the_lines_of_the_mills():
+    edges = {frozenset((a, b)) for a, targets in VALID_MOVES.items() for b in targets}
+    lines = {frozenset(pair) for mill in MILLS for pair in zip(mill, mill[1:])}
+    assert edges == lines and len(edges) == 32
+    assert VALID_MOVES[23] == [14, 22]
+    for cell in range(CELLS):
+        assert ADJACENT[cell] == sum(BIT[t] for t in VALID_MOVES[cell])
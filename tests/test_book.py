@@ -0,0 +1,118 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from ai.alphabeta import AlphaBetaAgent
+from ai.arena import RandomAgent
+from ai.book import (
+    BookEntry,
+    OpeningBook,
+    SearchScorer,
+    SelfPlayScorer,
+    build_book,
+    placing_positions,
+    write_book,
+)
+from ai.policy import ThePolicy
+from ai.train import SelfPlayAgent
+from muehle_game import Muehle
+from muehle_game.packing import pack
+from muehle_game.symmetry import (
+    NUM_SYMMETRIES,
+    canonical_key,
+    transform_cell,
+    transform_mask,
+)
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    path = tmp_path_factory.mktemp("book") / "book.bin"
+    return build_book(path, 3, SearchScorer(time_limit=None, max_depth=1))
+
+
+def _transformed(game: Muehle, k: int) -> Muehle:
+    return Muehle.from_key(
+        pack(
+            transform_mask(game.bits[1], k),
+            transform_mask(game.bits[-1], k),
+            game.to_place[1],
+            game.to_place[-1],
+            game.player,
+        )
+    )
+
+
+def test_placing_positions_are_canonical_and_distinct():
+    levels = placing_positions(3)
+    assert [len(level) for level in levels] == [1, 4, 46]
+    for level in levels:
+        assert len(set(level)) == len(level)
+        for key in level:
+            assert canonical_key(Muehle.from_key(key))[0] == key
+
+
+def test_book_covers_all_symmetric_positions(book):
+    assert len(book) == 51 and book.plies == 3
+    assert np.all(np.diff(book.keys.astype(np.int64)) > 0)
+    rng = random.Random(0)
+    for _ in range(20):
+        game = Muehle()
+        for _ in range(rng.randrange(3)):
+            game.push(rng.choice(list(game.generate_turns())))
+        turn = book.lookup(game)
+        assert turn in set(game.generate_turns())
+        for k in range(NUM_SYMMETRIES):
+            image = _transformed(game, k)
+            other = book.lookup(image)
+            assert other in set(image.generate_turns())
+            # symmetric positions get the same turn, up to the symmetry
+            game.push(turn)
+            image.push(other)
+            assert canonical_key(game)[0] == canonical_key(image)[0]
+            game.pop()
+
+
+def test_book_misses_positions_beyond_its_plies(book):
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 1, None), (None, 2, None)]:
+        game.push(turn)
+    assert book.lookup(game) is None
+    game = Muehle.from_key(pack(0b111, 0b111 << 8, 0, 0, 1))
+    assert book.probe(game) is None
+
+
+def test_write_and_open_roundtrip(tmp_path):
+    game = Muehle()
+    game.push((None, 4, None))
+    key, k = canonical_key(game)
+    turn = (None, transform_cell(10, k), None)
+    write_book(tmp_path / "book.bin", {key: BookEntry(turn, -42)}, plies=2)
+    book = OpeningBook.open(tmp_path / "book.bin")
+    assert len(book) == 1 and book.plies == 2
+    assert book.probe(game) == BookEntry((None, 10, None), -42)
+
+    (tmp_path / "other.bin").write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        OpeningBook.open(tmp_path / "other.bin")
+
+
+def test_agents_play_the_book(book):
+    game = Muehle()
+    game.push((None, 0, None))
+    expected = book.lookup(game)
+    agent = SelfPlayAgent(ThePolicy(), torch.device("cpu"), book=book)
+    assert agent.get_complete_move(game) == expected
+    search = AlphaBetaAgent(None, time_limit=None, max_depth=3, book=book)
+    assert search.get_complete_move(game) == expected
+    assert search.stats == {}
+
+
+def test_self_play_scorer_picks_a_legal_turn():
+    game = Muehle.from_key(pack(0b11, 0b11 << 9, 7, 7, 1))
+    scorer = SelfPlayScorer(RandomAgent(1), games=4, max_turns=60, seed=1)
+    turn, score = scorer(game)
+    assert turn in set(game.generate_turns())
+    assert -1000 <= score <= 1000
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+import torch
+
+from ai.buffer import RolloutBuffer, discounted_suffix_sums
+from ai.policy import ThePolicy
+from ai.train import SelfPlayTrainer
+
+
+def _reference_gae(rewards, values, gamma, lam):
+    advantages = np.zeros(len(rewards))
+    gae = 0.0
+    for t in reversed(range(len(rewards))):
+        next_value = values[t + 1] if t < len(rewards) - 1 else 0.0
+        delta = rewards[t] + gamma * next_value - values[t]
+        gae = delta + gamma * lam * gae
+        advantages[t] = gae
+    return advantages
+
+
+def _random_episode(rng, steps):
+    masks = rng.random((steps, 600)) < 0.05
+    return dict(
+        players=rng.choice([1, -1], steps),
+        boards=rng.integers(0, 2, (steps, 3, 24)),
+        global_features=rng.random((steps, 11)),
+        actions=rng.integers(0, 600, steps),
+        rewards=rng.normal(size=steps),
+        values=rng.uniform(-1, 1, (steps, 1)),
+        legal_masks=masks,
+    )
+
+
+@pytest.mark.parametrize("discount", [0.0, 0.5, 0.9405, 1.0])
+def test_discounted_suffix_sums_matches_loop(discount):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(3, 700))
+    expected = np.zeros_like(x)
+    acc = np.zeros(3)
+    for t in reversed(range(x.shape[1])):
+        acc = x[:, t] + discount * acc
+        expected[:, t] = acc
+    assert np.allclose(discounted_suffix_sums(x, discount), expected)
+
+
+def test_buffer_gae_restarts_at_episode_boundaries():
+    rng = np.random.default_rng(1)
+    buffer = RolloutBuffer(capacity=8)
+    episodes = [_random_episode(rng, steps) for steps in (5, 1, 300, 17)]
+    for episode in episodes:
+        buffer.add_episode(**episode)
+    assert len(buffer) == 323
+    assert buffer.num_episodes == 4
+
+    advantages, returns = buffer.compute_advantages(0.99, 0.95)
+    start = 0
+    for episode in episodes:
+        end = start + len(episode["players"])
+        rewards = episode["rewards"].astype(np.float32)
+        values = episode["values"].ravel().astype(np.float32)
+        expected = _reference_gae(rewards, values, 0.99, 0.95)
+        assert np.allclose(advantages[start:end], expected, atol=1e-4)
+        assert np.allclose(returns[start:end], expected + values, atol=1e-4)
+        start = end
+
+
+def test_buffer_tensors_roundtrip():
+    rng = np.random.default_rng(2)
+    episode = _random_episode(rng, 40)
+    buffer = RolloutBuffer(capacity=16)
+    buffer.add_episode(**episode)
+    batch = buffer.tensors()
+    assert torch.equal(batch["legal_mask"], torch.from_numpy(episode["legal_masks"]))
+    assert torch.equal(
+        batch["board_tensor"], torch.from_numpy(episode["boards"]).float()
+    )
+    assert torch.equal(batch["action_idx"], torch.from_numpy(episode["actions"]))
+    assert torch.allclose(
+        batch["global_features"],
+        torch.from_numpy(episode["global_features"]).float(),
+        atol=1e-3,
+    )
+
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.num_episodes == 0
+
+
+def test_add_step_matches_add_episode():
+    rng = np.random.default_rng(3)
+    episodes = [_random_episode(rng, steps) for steps in (3, 20)]
+    stepped = RolloutBuffer(capacity=4)
+    for episode in episodes:
+        for t in range(len(episode["players"])):
+            i = stepped.add_step(
+                episode["players"][t],
+                episode["boards"][t],
+                episode["global_features"][t],
+                episode["actions"][t],
+                episode["values"][t, 0],
+                episode["legal_masks"][t],
+            )
+            stepped.rewards[i] = episode["rewards"][t]
+        stepped.end_episode()
+    expected = RolloutBuffer()
+    for episode in episodes:
+        expected.add_episode(**episode)
+    assert stepped.episode_ends == expected.episode_ends == [3, 23]
+    batch = stepped.tensors()
+    for key, tensor in expected.tensors().items():
+        assert torch.equal(batch[key].nan_to_num(), tensor.nan_to_num())
+
+    combined = RolloutBuffer(capacity=2)
+    combined.extend(expected)
+    combined.extend(stepped)
+    assert combined.episode_ends == [3, 23, 26, 46]
+    assert np.array_equal(combined.actions[23:46], expected.actions[:23])
+
+
+def test_update_model_accepts_episode_and_buffer():
+    torch.manual_seed(0)
+    trainer = SelfPlayTrainer(ThePolicy(), device=torch.device("cpu"))
+    trajectory, _ = trainer.collect_episode()
+    assert trajectory.num_episodes == 1
+    trainer.buffer.extend(trajectory)
+    from_buffer, _ = trainer.compute_advantages(trainer.buffer)
+    from_episode, _ = trainer.compute_advantages(trajectory)
+    assert torch.allclose(from_buffer, from_episode)
+    assert "total_loss" in trainer.update_model(trainer.buffer)
+    assert "total_loss" in trainer.update_model(trajectory)
+
+
+def test_state_dict_without_sampling_settings_loads():
+    rng = np.random.default_rng(4)
+    buffer = RolloutBuffer()
+    buffer.add_episode(**_random_episode(rng, 6), temperature=2.0, epsilon=0.5)
+    state = buffer.state_dict()
+    assert state["temperatures"].eq(2.0).all() and state["epsilons"].eq(0.5).all()
+    del state["temperatures"], state["epsilons"]
+    restored = RolloutBuffer(capacity=2)
+    restored.load_state_dict(state)
+    batch = restored.tensors()
+    assert batch["temperature"].eq(1.0).all() and batch["epsilon"].eq(0.0).all()
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import torch
+
+from ai.checkpoint import (
+    CheckpointWriter,
+    checkpoint_path,
+    list_checkpoints,
+    load_checkpoint,
+    rng_state,
+    set_rng_state,
+)
+from ai.policy import ThePolicy
+from ai.train import SelfPlayTrainer
+
+
+def test_writer_rotates_and_keeps_multiples(tmp_path):
+    base = tmp_path / "ckpt.pth"
+    with CheckpointWriter(base, keep_last=2, keep_every=2) as writer:
+        for episode in range(1, 6):
+            writer.save(episode, {"episode": episode})
+        writer.wait()
+    assert [episode for episode, _ in list_checkpoints(base)] == [2, 4, 5]
+    assert not list(tmp_path.glob("*.tmp"))
+    assert load_checkpoint(checkpoint_path(base, 5))["episode"] == 5
+
+
+def test_writer_saves_a_snapshot(tmp_path):
+    base = tmp_path / "ckpt.pth"
+    tensor = torch.zeros(4)
+    with CheckpointWriter(base) as writer:
+        writer.save(1, {"tensor": tensor})
+        tensor += 1
+    assert torch.equal(
+        load_checkpoint(checkpoint_path(base, 1))["tensor"], torch.zeros(4)
+    )
+
+
+def test_rng_state_roundtrip(tmp_path):
+    state = rng_state()
+    torch.save(state, tmp_path / "rng.pth")
+    expected = (random.random(), np.random.random(), torch.rand(1))
+    set_rng_state(torch.load(tmp_path / "rng.pth", weights_only=True))
+    assert (random.random(), np.random.random(), torch.rand(1)) == expected
+
+
+def _train(tmp_path, num_episodes, resume_from=None):
+    torch.manual_seed(0)
+    random.seed(0)
+    trainer = SelfPlayTrainer(ThePolicy(), device=torch.device("cpu"))
+    trainer.train(
+        num_episodes=num_episodes,
+        episodes_per_update=2,
+        save_every=3,
+        save_path=str(tmp_path / "policy_checkpoint.pth"),
+        resume_from=resume_from,
+    )
+    return trainer
+
+
+def test_resume_continues_the_run_exactly(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    full = _train(tmp_path / "full", 4)
+
+    _train(tmp_path / "split", 3)
+    base = tmp_path / "split" / "policy_checkpoint.pth"
+    assert [episode for episode, _ in list_checkpoints(base)] == [3]
+    resumed = _train(tmp_path / "split", 4, resume_from=base)
+
+    for name, tensor in full.model.state_dict().items():
+        assert torch.equal(tensor, resumed.model.state_dict()[name])
+    assert (tmp_path / "policy_final.pth").exists()
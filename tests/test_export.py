@@ -0,0 +1,86 @@
+import random
+
+import pytest
+import torch
+
+from ai.export import export_policy, is_exported, load_policy
+from ai.play import load_model
+from ai.policy import ThePolicy
+from muehle_game import Muehle
+
+
+def _positions(count: int = 60) -> list[Muehle]:
+    rng = random.Random(0)
+    game = Muehle()
+    positions = []
+    for _ in range(count):
+        if game.is_terminal():
+            game = Muehle()
+        game.push(rng.choice(list(game.generate_turns())))
+        positions.append(game.clone())
+    return positions
+
+
+def _model(tmp_path):
+    torch.manual_seed(0)
+    model = ThePolicy()
+    path = tmp_path / "policy.pth"
+    torch.save(model.state_dict(), path)
+    return model, path
+
+
+@pytest.mark.parametrize("suffix", [".pt", ".onnx"])
+def test_exported_policy_matches_eager(tmp_path, suffix):
+    if suffix == ".onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    model, _ = _model(tmp_path)
+    policy = load_policy(export_policy(model, tmp_path / f"policy{suffix}"))
+    board = torch.rand(5, 3, 24)
+    global_features = torch.rand(5, 11)
+    with torch.no_grad():
+        expected, _ = model(board, global_features)
+    assert torch.allclose(policy(board, global_features), expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("suffix", [".pt", ".onnx"])
+def test_load_model_selects_exported_backend(tmp_path, suffix):
+    if suffix == ".onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    model, state_path = _model(tmp_path)
+    eager = load_model(state_path)
+    exported = load_model(export_policy(model, tmp_path / f"policy{suffix}"))
+    quantized = load_model(
+        export_policy(model, tmp_path / f"quantized{suffix}", quantize=True)
+    )
+    assert not isinstance(exported.model, ThePolicy)
+
+    for game in _positions():
+        if game.is_terminal():
+            continue
+        assert exported.get_complete_move(game) == eager.get_complete_move(game)
+        turn = quantized.get_complete_move(game)
+        assert turn in set(game.generate_turns())
+
+
+def test_load_model_reads_state_dicts_saved_as_pt(tmp_path):
+    model, _ = _model(tmp_path)
+    torch.save(model.state_dict(), tmp_path / "weights.pt")
+    torch.save({"model_state_dict": model.state_dict()}, tmp_path / "checkpoint.pt")
+    exported = export_policy(model, tmp_path / "policy.pt")
+    assert not is_exported(tmp_path / "weights.pt")
+    assert is_exported(exported)
+    with pytest.raises(ValueError):
+        load_policy(tmp_path / "weights.pt")
+
+    for name in ("weights.pt", "checkpoint.pt"):
+        agent = load_model(tmp_path / name)
+        assert isinstance(agent.model, ThePolicy)
+        for key, tensor in model.state_dict().items():
+            assert torch.equal(agent.model.state_dict()[key].cpu(), tensor)
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_policy(ThePolicy(), tmp_path / "policy.bin")
@@ -1,7 +1,10 @@
+import copy
+
 import numpy as np
 import pytest
 
 from muehle_game import Muehle
+from muehle_game.game import REPETITION_LIMIT
 
 
 def test_initial_state():
@@ -86,3 +89,128 @@ def test_game_completion():
     game = Muehle()
     game.board[0:3] = 1
     assert game.done() in [0, 1, -1]
+
+
+def test_board_writes_update_bitboards():
+    game = Muehle()
+    game.board[0:3] = -1
+    assert game.bits[-1] == 0b111
+    assert game.is_mill(1, -1) is True
+    game.board[1] = 0
+    assert game.bits[-1] == 0b101
+    assert game.is_mill(1, -1) is False
+
+
+def test_legal_actions_mask_moving():
+    game = Muehle()
+    game.to_place = {1: 0, -1: 0}
+    game.board[[0, 4, 9, 21]] = 1
+    game.board[[1, 2, 3, 5]] = -1
+    mask = game.legal_actions_mask()
+    assert set(np.flatnonzero(mask)) == {7, 10, 22}
+
+
+def test_deepcopy_is_independent():
+    game = Muehle()
+    game.move(None, 0)
+    clone = copy.deepcopy(game)
+    clone.move(None, 1)
+    clone.board[2] = 1
+    assert game.board[1] == 0 and game.board[2] == 0
+    assert game.bits == {1: 0b1, -1: 0}
+    assert clone.bits == {1: 0b101, -1: 0b10}
+
+
+def test_push_pop_restores_position():
+    game = Muehle()
+    for target in (0, 9, 1, 10):
+        game.push((None, target, None))
+    before = (game.board.copy(), dict(game.bits), dict(game.to_place), game.player)
+
+    assert game.push((None, 2, 9)) == "ok"
+    assert game.board[9] == 0 and game.player == -1
+    assert game.pop() == (None, 2, 9)
+
+    assert np.array_equal(game.board, before[0])
+    assert (game.bits, game.to_place, game.player) == before[1:]
+
+
+def test_push_rejects_illegal_turn():
+    game = Muehle()
+    game.push((None, 0, None))
+    with pytest.raises(ValueError):
+        game.push((None, 0, None))
+    with pytest.raises(ValueError):
+        game.push((None, 1, 0))
+    assert game.board[1] == 0 and game.to_place == {1: 8, -1: 9}
+    assert game.player == -1
+
+
+def test_clone_shares_topology():
+    game = Muehle()
+    game.push((None, 4, None))
+    clone = game.clone()
+    assert clone.vm is game.vm and clone.mills is game.mills
+    clone.push((None, 5, None))
+    assert game.board[5] == 0 and clone.board[5] == -1
+    clone.pop()
+    clone.pop()
+    assert not clone.board.any()
+    assert game.board[4] == 1
+
+
+def _shuffle_position() -> Muehle:
+    game = Muehle()
+    game.board[[0, 4, 9, 21]] = 1
+    game.board[[2, 13, 19, 23]] = -1
+    game.to_place = {1: 0, -1: 0}
+    game.history = [game.hash]
+    return game
+
+
+def test_hash_is_incremental():
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 9, None), (None, 1, None), (None, 10, None)]:
+        game.push(turn)
+    game.push((None, 2, 9))
+
+    fresh = Muehle()
+    fresh.board = game.board
+    fresh.to_place = dict(game.to_place)
+    fresh.player = game.player
+    assert game.hash == fresh.hash == game.history[-1]
+
+    game.pop()
+    assert game.hash == game.history[-1]
+    assert len(game.history) == 5
+
+
+def test_repetition_draw():
+    game = _shuffle_position()
+    game.repetition_limit = REPETITION_LIMIT
+    assert not game.is_draw()
+    for _ in range(2):
+        game.move(4, 7)
+        game.move(13, 12)
+        game.move(7, 4)
+        game.move(12, 13)
+    assert game.history.count(game.hash) == 3
+    assert game.is_draw() and game.is_terminal()
+    assert game.done() == 0
+
+    # the rule is off unless a limit is given
+    game.repetition_limit = Muehle().repetition_limit
+    assert game.repetition_limit is None
+    assert not game.is_draw() and not game.is_terminal()
+
+
+def test_no_capture_draw():
+    game = _shuffle_position()
+    game.repetition_limit = None
+    game.no_capture_limit = 6
+    for source, target in [(4, 7), (13, 12), (7, 4), (12, 13), (4, 7)]:
+        game.move(source, target)
+        assert not game.is_terminal()
+    game.move(13, 12)
+    assert game.quiet_turns == 6
+    assert game.is_draw()
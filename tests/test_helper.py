@@ -0,0 +1,64 @@
+import numpy as np
+import torch
+
+from ai.helper import allocate_encoding, encode_batch, encode_data, encode_into
+from muehle_game import Muehle, MuehleBatch
+
+
+def test_encode_batch_matches_encode_data():
+    rng = np.random.default_rng(0)
+    batch = MuehleBatch(64)
+    out = allocate_encoding(64)
+    for _ in range(120):
+        board_tensor, global_features = encode_batch(
+            batch.board,
+            batch.to_place,
+            batch.player,
+            batch.removal_pending,
+            out=out,
+        )
+        assert board_tensor.data_ptr() == out[0].data_ptr()
+        for i in range(batch.num_games):
+            game = Muehle()
+            game.board = batch.board[i]
+            game.to_place = {p: int(batch.to_place[p][i]) for p in (1, -1)}
+            game.player = int(batch.player[i])
+            expected_board, expected_global = encode_data(
+                game, game.player, bool(batch.removal_pending[i])
+            )
+            assert torch.equal(board_tensor[i], expected_board)
+            assert torch.equal(global_features[i], expected_global)
+
+        mask = batch.legal_mask()
+        batch.step(np.array([rng.choice(np.flatnonzero(row)) for row in mask]))
+
+
+def test_encode_batch_views_smaller_batches():
+    out = allocate_encoding(8)
+    batch = MuehleBatch(3)
+    board_tensor, global_features = encode_batch(
+        batch.board, batch.to_place, batch.player, batch.removal_pending, out=out
+    )
+    assert board_tensor.shape == (3, 3, 24)
+    assert global_features.shape == (3, 11)
+
+
+def test_encode_into_matches_encode_data():
+    rng = np.random.default_rng(1)
+    out = allocate_encoding(1)
+    game = Muehle()
+    for _ in range(300):
+        if game.is_terminal():
+            game = Muehle()
+        turns = list(game.generate_turns())
+        game.push(turns[rng.integers(len(turns))])
+        for player in (1, -1):
+            for removal_pending in (False, True):
+                board_tensor, global_features = encode_into(
+                    game, player, removal_pending, out
+                )
+                expected_board, expected_global = encode_data(
+                    game, player, removal_pending
+                )
+                assert torch.equal(board_tensor[0], expected_board)
+                assert torch.equal(global_features[0], expected_global)
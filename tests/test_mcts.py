@@ -0,0 +1,105 @@
+import random
+
+import pytest
+import torch
+
+from ai.arena import ArenaConfig, RandomAgent, make_agent, play_game
+from ai.mcts import MCTSAgent
+from ai.policy import ThePolicy
+from muehle_game import Muehle
+
+
+class MaterialPolicy(ThePolicy):
+    """Uniform priors, values from the piece difference of the player to move."""
+
+    def forward(self, board, global_features):
+        mine = board[:, 0].sum(1) + 9 * global_features[:, 6]
+        opp = board[:, 1].sum(1) + 9 * global_features[:, 7]
+        value = torch.tanh((mine - opp) / 3)[:, None]
+        return torch.zeros(len(board), 600), value
+
+
+def _positions(count: int = 40) -> list[Muehle]:
+    rng = random.Random(1)
+    game = Muehle()
+    positions = []
+    for _ in range(count):
+        if game.is_terminal():
+            game = Muehle()
+        game.push(rng.choice(list(game.generate_turns())))
+        positions.append(game.clone())
+    return positions
+
+
+def test_search_returns_legal_turns_and_restores_the_game():
+    torch.manual_seed(0)
+    agent = MCTSAgent(ThePolicy(), simulations=48, batch_size=8)
+    for game in _positions():
+        if game.is_terminal():
+            continue
+        key, history = game.to_key(), list(game.history)
+        turn = agent.get_complete_move(game)
+        assert turn in set(game.generate_turns())
+        assert game.to_key() == key and game.history == history
+
+
+def test_root_visits_match_the_simulations():
+    agent = MCTSAgent(MaterialPolicy(), simulations=100, batch_size=16)
+    root = agent.search(Muehle())
+    assert agent.stats["simulations"] == 100
+    assert root.visits.sum() == 100
+    assert abs(root.priors.sum() - 1) < 1e-9
+
+
+def test_closes_a_mill_and_removes_a_piece():
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 10, None), (None, 1, None), (None, 11, None)]:
+        game.push(turn)
+    agent = MCTSAgent(MaterialPolicy(), simulations=200)
+    assert agent.get_complete_move(game) in {(None, 2, 10), (None, 2, 11)}
+
+
+def test_time_limit_stops_the_search():
+    agent = MCTSAgent(MaterialPolicy(), simulations=None, time_limit=0.05)
+    agent.search(Muehle())
+    assert agent.stats["simulations"] > 0
+    assert agent.stats["seconds"] < 1.0
+
+
+def test_beats_random_with_a_material_value():
+    agent = MCTSAgent(MaterialPolicy(), simulations=100)
+    config = ArenaConfig(max_turns=200)
+    assert play_game(agent, RandomAgent(0), config, seed=0) == 1
+    assert play_game(RandomAgent(0), agent, config, seed=0) == -1
+
+
+def test_arena_spec(tmp_path):
+    path = tmp_path / "policy.pth"
+    torch.save(ThePolicy().state_dict(), path)
+    agent = make_agent(f"mcts:{path},32")
+    assert isinstance(agent, MCTSAgent)
+    assert agent.simulations == 32
+
+
+def test_rejects_policy_without_value_head():
+    with pytest.raises(TypeError):
+        MCTSAgent(lambda board, global_features: board)
+
+
+def test_exported_policy_is_a_usage_error(tmp_path, capsys):
+    from ai.arena import parse_args
+    from ai.export import export_policy
+    from runtime.args import parse_args as runtime_args
+
+    path = export_policy(ThePolicy(), tmp_path / "policy.pt")
+    with pytest.raises(ValueError, match="exported policy"):
+        make_agent(f"mcts:{path},8")
+    with pytest.raises(SystemExit) as error:
+        parse_args([f"mcts:{path},8", "random"])
+    assert error.value.code == 2
+    assert "exported policy" in capsys.readouterr().err
+    with pytest.raises(SystemExit) as error:
+        runtime_args(["--model-play", str(path), "--mcts-simulations", "8"])
+    assert error.value.code == 2
+    assert "exported policy" in capsys.readouterr().err
+    assert runtime_args(["--model-play", str(path)]).model_play == path
@@ -0,0 +1,53 @@
+import numpy as np
+
+from muehle_game import Muehle, MuehleBatch
+from muehle_game.packing import pack_boards, unpack_keys
+
+
+def _game() -> Muehle:
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 9, None), (None, 1, None), (None, 10, None)]:
+        game.push(turn)
+    game.push((None, 2, 9))
+    return game
+
+
+def test_key_round_trip():
+    game = _game()
+    key = game.to_key()
+    assert key < 1 << 64
+    other = Muehle.from_key(key)
+    assert np.array_equal(other.board, game.board)
+    assert other.to_place == game.to_place
+    assert other.player == game.player
+    assert other.hash == game.hash
+    assert other.to_key() == key
+
+
+def test_start_positions_differ_by_side():
+    game = Muehle()
+    key = game.to_key()
+    game.player = -1
+    assert game.to_key() != key
+
+
+def test_vectorized_matches_single_games():
+    rng = np.random.default_rng(0)
+    batch = MuehleBatch(32)
+    for _ in range(40):
+        mask = batch.legal_mask()
+        batch.step(np.array([rng.choice(np.flatnonzero(row)) for row in mask]))
+
+    keys = batch.to_keys()
+    assert keys.dtype == np.uint64
+    for i, key in enumerate(keys):
+        game = Muehle.from_key(int(key))
+        assert np.array_equal(game.board, batch.board[i])
+        assert game.player == batch.player[i]
+
+    boards, to_place, player = unpack_keys(keys)
+    assert np.array_equal(boards, batch.board)
+    assert np.array_equal(to_place[1], batch.to_place[1])
+    assert np.array_equal(to_place[-1], batch.to_place[-1])
+    assert np.array_equal(player, batch.player)
+    assert np.array_equal(pack_boards(boards, to_place, player), keys)
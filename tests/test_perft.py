@@ -0,0 +1,30 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from muehle_game import Muehle
+from muehle_game.perft import fast_turns, perft, reference_turns
+
+CASES = json.loads((Path(__file__).parent / "fixtures" / "perft.json").read_text())
+
+
+@pytest.mark.parametrize("generator", [reference_turns, fast_turns])
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_perft(case, generator):
+    game = Muehle.from_key(int(case["key"], 16), repetition_limit=None)
+    key = game.to_key()
+    for depth, nodes in enumerate(case["nodes"], start=1):
+        assert perft(game, depth, generator) == nodes
+    assert game.to_key() == key
+
+
+def test_generate_turns_matches_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        game = Muehle(no_capture_limit=100)
+        while not game.is_terminal():
+            turns = reference_turns(game)
+            assert sorted(game.generate_turns(), key=str) == sorted(turns, key=str)
+            game.push(turns[rng.integers(len(turns))])
@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+
+from muehle_game import Muehle
+from muehle_game.packing import pack
+from muehle_game.ranking import (
+    PositionClass,
+    class_size,
+    position_class,
+    position_classes,
+    rank_key,
+    rank_keys,
+    unrank_key,
+    unrank_keys,
+)
+from muehle_game.symmetry import NUM_SYMMETRIES, transform_mask, transform_masks
+
+
+def _random_keys(count: int, seed: int = 0) -> list[int]:
+    rng = random.Random(seed)
+    keys = []
+    for _ in range(count):
+        white, black = rng.randrange(10), rng.randrange(10)
+        cells = rng.sample(range(24), white + black)
+        keys.append(
+            pack(
+                sum(1 << c for c in cells[:white]),
+                sum(1 << c for c in cells[white:]),
+                rng.randrange(10),
+                rng.randrange(10),
+                rng.choice((1, -1)),
+            )
+        )
+    return keys
+
+
+def _image(key: int, k: int) -> int:
+    return key & ~((1 << 48) - 1) | (
+        transform_mask(key >> 24 & 0xFFFFFF, k) << 24
+        | transform_mask(key & 0xFFFFFF, k)
+    )
+
+
+def test_rank_key_roundtrip():
+    for key in _random_keys(500):
+        cls, index = rank_key(key)
+        assert cls == position_class(key)
+        assert 0 <= index < class_size(cls)
+        assert unrank_key(cls, index) == key
+
+
+def test_small_class_is_a_bijection():
+    cls = PositionClass(2, 1, 7, 8, -1)
+    indices = np.arange(class_size(cls))
+    keys = unrank_keys(cls, indices)
+    assert len(set(keys.tolist())) == len(keys)
+    assert np.array_equal(rank_keys(keys), indices)
+    assert all(rank_key(int(key)) == (cls, i) for i, key in enumerate(keys))
+
+
+def test_batch_matches_single_positions():
+    keys = _random_keys(300, seed=1)
+    array = np.array(keys, dtype=np.uint64)
+    classes = position_classes(array)
+    for symmetric in (False, True):
+        indices = rank_keys(array, symmetric)
+        for key, cls, index in zip(keys, classes, indices):
+            expected_cls, expected = rank_key(key, symmetric)
+            assert tuple(cls) == expected_cls and index == expected
+            assert unrank_keys(expected_cls, [index], symmetric)[0] == unrank_key(
+                expected_cls, expected, symmetric
+            )
+
+
+def test_symmetric_rank_is_shared_by_all_images():
+    for key in _random_keys(100, seed=2):
+        cls, index = rank_key(key, symmetric=True)
+        assert 0 <= index < class_size(cls, symmetric=True)
+        images = [_image(key, k) for k in range(NUM_SYMMETRIES)]
+        assert set(rank_keys(np.array(images, dtype=np.uint64), True)) == {index}
+        assert rank_key(unrank_key(cls, index, True), True) == (cls, index)
+
+
+def test_symmetric_class_is_much_smaller():
+    cls = PositionClass(3, 2, 0, 0, 1)
+    keys = unrank_keys(cls, np.arange(class_size(cls)))
+    used = np.unique(rank_keys(keys, symmetric=True))
+    assert used[-1] < class_size(cls, symmetric=True)
+    assert 0.8 * class_size(cls, True) < len(used)
+    assert class_size(cls) / class_size(cls, True) > 12
+    # the orbits are counted exactly by the distinct symmetric indices
+    canonical = np.min(
+        [
+            transform_masks(keys.astype(np.int64) & 0xFFFFFF, k) << 24
+            | transform_masks(keys.astype(np.int64) >> 24 & 0xFFFFFF, k)
+            for k in range(NUM_SYMMETRIES)
+        ],
+        axis=0,
+    )
+    assert len(np.unique(canonical)) == len(used)
+
+
+def test_game_keys_rank():
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 4, None), (None, 1, None)]:
+        game.push(turn)
+    cls, index = rank_key(game.to_key())
+    assert cls == PositionClass(2, 1, 7, 8, -1)
+    assert Muehle.from_key(unrank_key(cls, index)).hash == game.hash
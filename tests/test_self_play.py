@@ -0,0 +1,198 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from ai.policy import ThePolicy
+from ai.train import SelfPlayAgent, SelfPlayTrainer, _sampling_log_probs
+
+
+def _trainer() -> SelfPlayTrainer:
+    torch.manual_seed(0)
+    return SelfPlayTrainer(ThePolicy(), device=torch.device("cpu"))
+
+
+def test_select_actions_only_picks_legal_actions():
+    agent = SelfPlayAgent(ThePolicy(), torch.device("cpu"))
+    rng = np.random.default_rng(0)
+    masks = rng.random((32, 600)) < 0.02
+    masks[np.arange(32), rng.integers(600, size=32)] = True
+    boards = torch.rand(32, 3, 24)
+    globals_ = torch.rand(32, 11)
+    for epsilon in (0.0, 0.5, 1.0):
+        actions, logits, values = agent.select_actions(
+            boards, globals_, masks, temperature=1.0, epsilon=epsilon
+        )
+        assert all(masks[i, a] for i, a in enumerate(actions))
+    assert logits.shape == (32, 600)
+    assert values.shape == (32, 1)
+
+
+def test_select_actions_matches_select_action_outputs():
+    agent = SelfPlayAgent(ThePolicy(), torch.device("cpu"))
+    boards = torch.rand(4, 3, 24)
+    globals_ = torch.rand(4, 11)
+    masks = np.zeros((4, 600), dtype=bool)
+    masks[:, 5] = True
+    actions, logits, values = agent.select_actions(boards, globals_, masks)
+    assert actions == [5, 5, 5, 5]
+    for i in range(4):
+        action, single_logits, single_value = agent.select_action(
+            boards[i], globals_[i], masks[i]
+        )
+        assert action == 5
+        assert torch.allclose(single_logits, logits[i], atol=1e-6)
+        assert torch.allclose(single_value, values[i], atol=1e-6)
+
+
+def test_collect_episodes_plays_complete_episodes():
+    trainer = _trainer()
+    episodes = trainer.collect_episodes(5, num_games=3, temperature=1.0, epsilon=0.3)
+    assert len(episodes) == 5
+    for trajectory, winner in episodes:
+        assert len(trajectory) and trajectory.num_episodes == 1
+        assert winner in (1, -1, 0)
+        batch = trajectory.tensors()
+        assert batch["legal_mask"].gather(1, batch["action_idx"][:, None]).all()
+
+
+def test_ppo_update_runs_minibatch_epochs():
+    torch.manual_seed(0)
+    trainer = SelfPlayTrainer(
+        ThePolicy(),
+        device=torch.device("cpu"),
+        algorithm="ppo",
+        ppo_epochs=3,
+        minibatch_size=32,
+        target_kl=None,
+    )
+    for _ in range(2):
+        trajectory, _ = trainer.collect_episode()
+        trainer.buffer.extend(trajectory)
+    assert not np.isnan(trainer.buffer.log_probs[: len(trainer.buffer)]).any()
+
+    info = trainer.update_model(trainer.buffer)
+    batches = -(-len(trainer.buffer) // 32)
+    assert info["epochs"] == 3
+    assert info["updates"] == 3 * batches
+    assert not info["early_stop"]
+    assert info["clip_fraction"] >= 0.0
+
+
+def test_ppo_ratio_starts_at_one_with_exploration():
+    random.seed(0)
+    torch.manual_seed(0)
+    trainer = SelfPlayTrainer(
+        ThePolicy(), device=torch.device("cpu"), algorithm="ppo", ppo_epochs=1
+    )
+    with torch.no_grad():
+        trainer.model.policy_head.weight.mul_(200.0)
+    temperature, epsilon = 2.0, 0.3
+    trajectory, _ = trainer.collect_episode(temperature, epsilon)
+
+    batch = trajectory.tensors()
+    with torch.no_grad():
+        logits, _ = trainer.model.eval()(
+            batch["board_tensor"], batch["global_features"]
+        )
+    masked = logits.masked_fill(~batch["legal_mask"], -1e9)
+    plain = torch.log_softmax(masked, dim=-1)
+    assert plain.exp().max(dim=1).values.mean() > 0.6
+    recomputed = _sampling_log_probs(
+        masked,
+        batch["legal_mask"],
+        batch["action_idx"],
+        batch["temperature"],
+        batch["epsilon"],
+    )
+    assert torch.allclose(recomputed, batch["log_prob"], atol=1e-3)
+    # the plain policy gives the explored actions a far smaller probability
+    plain = plain.gather(1, batch["action_idx"][:, None]).squeeze(1)
+    assert (batch["log_prob"] - plain).max() > 1.0
+
+    # one minibatch, its ratio is taken before the gradient step
+    trainer.minibatch_size = len(trajectory)
+    info = trainer.update_model(trajectory)
+    assert info["updates"] == 1
+    assert abs(info["approx_kl"]) < 1e-6
+    assert info["clip_fraction"] == 0.0
+
+    trajectory.log_probs[:] = np.nan
+    info = trainer.update_model(trajectory)
+    assert abs(info["approx_kl"]) < 1e-6
+
+
+def test_ppo_stops_early_on_kl():
+    torch.manual_seed(0)
+    trainer = SelfPlayTrainer(
+        ThePolicy(),
+        learning_rate=1e-1,
+        device=torch.device("cpu"),
+        algorithm="ppo",
+        ppo_epochs=10,
+        minibatch_size=8,
+        target_kl=1e-6,
+    )
+    trajectory, _ = trainer.collect_episode()
+    info = trainer.update_model(trajectory)
+    assert info["early_stop"]
+    assert info["updates"] < 10 * -(-len(trajectory) // 8)
+
+
+def test_next_move_is_masked_argmax():
+    from ai.helper import encode_data
+    from ai.train import ActionMapper
+    from muehle_game import Muehle
+
+    torch.manual_seed(0)
+    model = ThePolicy()
+    agent = SelfPlayAgent(model, torch.device("cpu"))
+    agent.prepare_inference()
+    rng = np.random.default_rng(0)
+    game = Muehle()
+    for _ in range(200):
+        if game.is_terminal():
+            game = Muehle()
+        for removal_pending in (False, True):
+            mask = ActionMapper.get_legal_mask(game, game.player, removal_pending)
+            move = agent.next_move(game, removal_pending)
+            if not mask.any():
+                assert move == (None, None, None)
+                continue
+            board, global_features = encode_data(game, game.player, removal_pending)
+            with torch.no_grad():
+                logits, _ = model(board[None], global_features[None])
+            logits[0, ~torch.from_numpy(mask)] = -1e9
+            source, target = ActionMapper.from_index(int(logits.argmax()))
+            if removal_pending:
+                assert move == (None, None, target)
+            elif source == 24:
+                assert move == (None, target, None)
+            else:
+                assert move == (source, target, None)
+        turns = list(game.generate_turns())
+        game.push(turns[rng.integers(len(turns))])
+
+
+def test_device_stays_the_eighth_positional_argument():
+    device = torch.device("cpu")
+    trainer = SelfPlayTrainer(ThePolicy(), 1e-4, 0.99, 0.95, 0.01, 0.5, 0.5, device)
+    assert trainer.device == device
+    assert trainer.no_capture_limit == 100
+
+
+def test_log_probs_are_those_of_the_sampling_distribution():
+    trainer = _trainer()
+    temperature, epsilon = 2.0, 0.2
+    trajectory, _ = trainer.collect_episode(temperature, epsilon)
+    batch = trajectory.tensors()
+    with torch.no_grad():
+        logits, _ = trainer.model.eval()(
+            batch["board_tensor"], batch["global_features"]
+        )
+    steps = zip(logits, batch["legal_mask"], batch["action_idx"], batch["log_prob"])
+    for row, legal, action, log_prob in steps:
+        probs = torch.softmax(row.masked_fill(~legal, -1e9) / temperature, dim=-1)
+        mixture = (1 - epsilon) * probs[action] + epsilon / legal.sum()
+        assert log_prob.item() == pytest.approx(np.log(mixture.item()), abs=1e-5)
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+from ai.smp import ParallelAlphaBetaAgent
+from ai.ttable import TranspositionTable, table_bytes
+from muehle_game import Muehle
+
+
+def test_torn_slot_reads_as_empty():
+    buffer = bytearray(table_bytes(64))
+    table = TranspositionTable(64, buffer)
+    other = TranspositionTable(64, buffer)
+    table.store(5, 3, 1, 42, (None, 4, None))
+    assert other.probe(5).score == 42
+    (slot,) = np.flatnonzero(other.table[:, 1])
+    other.table[slot, 1] ^= 1 << 30
+    assert table.probe(5) is None
+
+
+def test_parallel_search_plays_legal_turns():
+    rng = random.Random(4)
+    game = Muehle()
+    with ParallelAlphaBetaAgent(workers=2, time_limit=0.2) as agent:
+        processes = list(agent._processes)
+        for _ in range(4):
+            key = game.to_key()
+            turn = agent.get_complete_move(game)
+            assert game.to_key() == key
+            assert turn in set(game.generate_turns())
+            assert len(agent.stats["helper_depths"]) == 2
+            assert agent.stats["depth"] >= max(agent.stats["helper_depths"])
+            game.push(turn)
+            game.push(rng.choice(list(game.generate_turns())))
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_helpers_share_a_table_file(tmp_path):
+    path = tmp_path / "tt.bin"
+    game = Muehle()
+    with ParallelAlphaBetaAgent(workers=1, time_limit=0.2, table_file=path) as agent:
+        agent.search(game)
+    assert TranspositionTable.open(path).probe(game.hash).depth >= 1
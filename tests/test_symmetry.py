@@ -0,0 +1,62 @@
+import numpy as np
+
+from muehle_game import Muehle, MuehleBatch
+from muehle_game.bitboard import MILLS, VALID_MOVES
+from muehle_game.symmetry import (
+    ACTION_INVERSE_PERMS,
+    CELL_PERMS,
+    INVERSE,
+    canonical_key,
+    transform_board,
+    transform_cell,
+)
+
+
+def _transformed(game: Muehle, k: int) -> Muehle:
+    other = Muehle()
+    other.board = transform_board(game.board, k)
+    other.to_place = dict(game.to_place)
+    other.player = game.player
+    return other
+
+
+def test_permutations_preserve_topology():
+    edges = {(s, t) for s, targets in VALID_MOVES.items() for t in targets}
+    mills = {frozenset(mill) for mill in MILLS}
+    assert len({tuple(perm) for perm in CELL_PERMS}) == 16
+    for perm in CELL_PERMS:
+        assert {(perm[s], perm[t]) for s, t in edges} == edges
+        assert {frozenset(perm[mill]) for mill in MILLS} == mills
+
+
+def test_inverse():
+    cells = np.arange(24)
+    for k, inv in enumerate(INVERSE):
+        assert np.array_equal(CELL_PERMS[inv][CELL_PERMS[k]], cells)
+
+
+def test_action_perms_map_legal_masks():
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 4, None), (None, 1, None), (None, 7, None)]:
+        game.push(turn)
+    for k in range(16):
+        other = _transformed(game, k)
+        batch = MuehleBatch(2)
+        batch.board[0] = game.board
+        batch.board[1] = other.board
+        batch.to_place[1][:] = 7
+        batch.to_place[-1][:] = 7
+        masks = batch.legal_mask()
+        assert np.array_equal(masks[0][ACTION_INVERSE_PERMS[k]], masks[1])
+
+
+def test_canonical_key_is_invariant():
+    game = Muehle()
+    for turn in [(None, 0, None), (None, 13, None), (None, 9, None)]:
+        game.push(turn)
+    key, k = canonical_key(game)
+    for j in range(16):
+        assert canonical_key(_transformed(game, j))[0] == key
+    canonical = _transformed(game, k)
+    assert canonical.bits[-1] << 24 | canonical.bits[1] == key & (1 << 48) - 1
+    assert canonical.board[transform_cell(0, k)] == 1
@@ -0,0 +1,165 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from ai.alphabeta import AlphaBetaAgent
+from ai.mcts import MCTSAgent
+from ai.policy import ThePolicy
+from ai.smp import ParallelAlphaBetaAgent
+from ai.train import SelfPlayAgent, SelfPlayTrainer
+from muehle_game import Muehle
+from muehle_game.packing import pack
+from muehle_game.ranking import compress, expand, rank_subset, unrank_subset
+from muehle_game.tablebase import (
+    DRAW,
+    WIN,
+    Probe,
+    Tablebase,
+    _predecessors,
+    generate,
+    position_index,
+    positions,
+    solve,
+    table_path,
+    table_size,
+)
+
+
+def _game(own: int, opp: int) -> Muehle:
+    return Muehle.from_key(pack(own, opp, 0, 0, 1))
+
+
+def _sample(m: int, o: int, count: int, seed: int = 0) -> np.ndarray:
+    rng = random.Random(seed)
+    return np.array([rng.randrange(table_size(m, o)) for _ in range(count)])
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    """Tables up to 4 against 3, the 4 against 4 table takes too long here."""
+    directory = tmp_path_factory.mktemp("tablebase")
+    generate(directory, max_pieces=3)
+    solved = {(3, 3): np.fromfile(table_path(directory, 3, 3), dtype=np.uint8)}
+    for key, result in solve([(3, 4), (4, 3)], solved).items():
+        result.tofile(table_path(directory, *key))
+    return Tablebase(directory)
+
+
+def test_subset_ranking_roundtrip():
+    rng = random.Random(1)
+    for k in (3, 4):
+        for _ in range(200):
+            cells = rng.sample(range(24), k + 6)
+            mask = sum(1 << c for c in cells[:k])
+            free = sum(1 << c for c in cells)
+            assert unrank_subset(rank_subset(mask), k) == mask
+            assert expand(compress(mask, free), free) == mask
+
+
+def test_position_index_is_a_bijection():
+    for m, o in ((3, 3), (4, 3), (3, 4), (4, 4)):
+        indices = _sample(m, o, 500)
+        own, opp = positions(indices, m, o)
+        assert not np.any(own & opp)
+        for i, a, b in zip(indices, own, opp):
+            assert (int(a).bit_count(), int(b).bit_count()) == (m, o)
+            assert position_index(int(a), int(b)) == i
+
+
+@pytest.mark.parametrize("m, o", [(4, 4), (4, 3), (3, 4)])
+def test_predecessors_are_the_quiet_moves_into_a_position(m, o):
+    own, opp = positions(_sample(m, o, 20), m, o)
+    for a, b in zip(own.tolist(), opp.tolist()):
+        expected = set()
+        for t in range(24):
+            if not b >> t & 1:
+                continue
+            for s in range(24):
+                if (a | b) >> s & 1:
+                    continue
+                before = b ^ 1 << t ^ 1 << s
+                if (s, t, None) in _game(before, a).generate_turns():
+                    expected.add(position_index(before, a))
+        found = _predecessors(np.array([a]), np.array([b]), m, o).tolist()
+        assert sorted(found) == sorted(expected)
+
+
+def test_tables_agree_with_the_successors(tables):
+    """Every position has the best result over its turns, one turn further away."""
+    checked = {WIN: 0, DRAW: 0}
+    for m, o in ((4, 3), (3, 4)):
+        codes = tables._table(m, o)
+        wins = np.flatnonzero(codes)[:: max(1, np.count_nonzero(codes) // 100)]
+        indices = np.concatenate([_sample(m, o, 100), wins])
+        own, opp = positions(indices, m, o)
+        for a, b in zip(own.tolist(), opp.tolist()):
+            game = _game(a, b)
+            if game.is_terminal():
+                continue
+            best = None
+            for turn in game.generate_turns():
+                game.push(turn)
+                if game.is_terminal():
+                    outcome = Probe(game.done(), 0)
+                else:
+                    reply = tables.probe(game)
+                    outcome = Probe(-reply.value, reply.distance)
+                game.pop()
+                key = (outcome.value, -outcome.distance * outcome.value)
+                if best is None or key > best[0]:
+                    best = key, outcome
+            outcome = best[1]
+            expected = Probe(
+                outcome.value, 0 if outcome.value == DRAW else outcome.distance + 1
+            )
+            probe = tables.probe(game)
+            assert probe == expected
+            checked[probe.value] = checked.get(probe.value, 0) + 1
+    assert checked[WIN] > 0 and checked[DRAW] > 0
+
+
+def test_best_turn_wins_in_one(tables):
+    codes = tables._table(4, 3)
+    index = int(np.flatnonzero(codes == 2)[0])
+    own, opp = positions(np.array([index]), 4, 3)
+    game = _game(int(own[0]), int(opp[0]))
+    assert tables.probe(game) == Probe(WIN, 1)
+    turn = tables.best_turn(game)
+    game.push(turn)
+    assert game.done() == 1
+
+    game.pop()
+    agents = [
+        SelfPlayAgent(ThePolicy(), torch.device("cpu"), tablebase=tables),
+        AlphaBetaAgent(time_limit=None, max_depth=1, tablebase=tables),
+        MCTSAgent(ThePolicy(), simulations=2, tablebase=tables),
+    ]
+    for agent in agents:
+        assert agent.get_complete_move(game) == turn
+    # played from the tables, without a search
+    assert agents[1].stats == {} and agents[2].stats == {}
+    with ParallelAlphaBetaAgent(workers=1, time_limit=0.1, tablebase=tables) as agent:
+        assert agent.get_complete_move(game) == turn
+        assert agent.stats == {}
+
+
+def test_probe_outside_the_tables(tables):
+    assert tables.probe(Muehle()) is None
+    game = _game(0b1111, 0b1111 << 8)
+    assert tables.probe(game) is None
+    assert tables.best_turn(game) is None
+    truce = _game(0b111 << 3, 0b111 << 16)
+    assert tables.probe(truce) == Probe(DRAW, 0)
+
+
+def test_trainer_opens_the_tables(tables):
+    trainer = SelfPlayTrainer(
+        ThePolicy(), device=torch.device("cpu"), tablebase=tables.directory
+    )
+    assert trainer.agent.tablebase is trainer.tablebase
+    truce = _game(0b111 << 3, 0b111 << 16)
+    assert trainer.tablebase.probe(truce) == Probe(DRAW, 0)
+    _, winner = trainer.collect_episode()
+    assert winner in (-1, 0, 1)